@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+DataWareHouse登録 ベンチマーク
+
+代替DataWareHouse（synthetic_dwh）のSQLite DBに対し、呼び出しごとに接続・commitする従来方式
+（datawarehouse API）と、engine.warehouse.DWHBulkWriter による単一接続・単一トランザクション方式の登録時間を比較する。
+代替APIは datawarehouse と同様に呼び出しごとに sqlite3.connect → INSERT → commit → close を行う。
+
+使い方:
+    python benchmarks/bench_dwh_registration.py [--videos 1000] [--db /tmp/bench_dwh.db]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synthetic_dwh  # noqa: E402
+
+synthetic_dwh.install()
+
+from engine import warehouse  # noqa: E402
+
+
+def init_db(db_path: str):
+    Path(db_path).unlink(missing_ok=True)
+    synthetic_dwh.init_database(db_path)
+
+
+def register_per_call(db_path: str, num_videos: int):
+    for i in range(num_videos):
+        synthetic_dwh.create_algorithm_output(1, i + 1, "03_algorithm_output/vX/run", db_path=db_path)
+
+
+def register_batched(db_path: str, num_videos: int):
+    with warehouse.DWHBulkWriter(db_path, ('algorithm_output_table',)) as writer:
+        for i in range(num_videos):
+            writer.create_algorithm_output(1, i + 1, "03_algorithm_output/vX/run")
+
+
+def count_rows(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM algorithm_output_table").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="DataWareHouse登録 ベンチマーク")
+    parser.add_argument('--videos', type=int, default=1000)
+    parser.add_argument('--db', type=str, default=None, help="代替DBのパス（省略時は一時ディレクトリ）")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="bench_dwh_"), "database.db")
+    print(f"代替DB: {db_path}")
+    print(f"ビデオ数: {args.videos:,}")
+
+    timings = {}
+    for name, func in (("per_call", register_per_call), ("batched", register_batched)):
+        init_db(db_path)
+        start = time.perf_counter()
+        func(db_path, args.videos)
+        timings[name] = time.perf_counter() - start
+        assert count_rows(db_path) == args.videos
+        print(f"  {name:9s}: {timings[name]:8.3f} s")
+
+    print(f"  高速化率 : {timings['per_call'] / timings['batched']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+評価エンジン エンドツーエンド ベンチマーク
+
+実DBや開発データなしで評価エンジン全体のスループットを計測する。
+core_lib_output_sample.csv と同じ列構成の合成コアCSVと、代替DataWareHouse（synthetic_dwh）の
+SQLite DBを生成し、EvaluationEngine.run_evaluation を別プロセスで実行して
+実行時間・frames/sec・ピークRSS・ステージ別時間（エンジンの metrics.json）を記録する。
+結果はJSONで保存でき、--baseline で過去の結果と比較して劣化を検出する。
+drowsy_detection が未インストールの場合は代替検出器（synthetic_detector）で実行する。
+
+シナリオ:
+    smoke       10ビデオ × 3,000フレーム（動作確認用）
+    long_video  1ビデオ × 1,000,000フレーム
+    many_short  10,000ビデオ × 300フレーム
+    custom      --videos / --frames / --tags で指定
+
+使い方:
+    python benchmarks/bench_engine.py [--scenario long_video --scenario many_short] [--workers 4]
+        [--repeat 2] [--output results.json] [--baseline baseline.json] [--tolerance 0.15]
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synthetic_detector  # noqa: E402
+import synthetic_dwh  # noqa: E402
+
+SCENARIOS = {
+    'smoke': {'videos': 10, 'frames': 3_000, 'tags': 5},
+    'long_video': {'videos': 1, 'frames': 1_000_000, 'tags': 200},
+    'many_short': {'videos': 10_000, 'frames': 300, 'tags': 1},
+}
+
+# 比較対象の指標と、値が大きいほど良いか
+COMPARED_METRICS = {
+    'elapsed_seconds': False,
+    'frames_per_second': True,
+    'peak_rss_mb': False,
+}
+
+
+def generate_dataset(root: Path, num_videos: int, num_frames: int, num_tags: int, seed: int = 0):
+    """代替DBと合成コアCSVを生成（同じパラメータで生成済みの場合は再利用）"""
+    params = {'videos': num_videos, 'frames': num_frames, 'tags': num_tags, 'seed': seed}
+    marker = root / "dataset.json"
+    if marker.exists() and json.loads(marker.read_text(encoding='utf-8')) == params:
+        print(f"  生成済みデータを再利用: {root}")
+        return
+
+    root.mkdir(parents=True, exist_ok=True)
+    db_path = root / "database.db"
+    db_path.unlink(missing_ok=True)
+    synthetic_dwh.init_database(str(db_path))
+
+    # 必須4列以外は core_lib_output_sample.csv の先頭行の値で埋める
+    sample_path = REPO_DIR / "core_lib_output_sample.csv"
+    with open(sample_path, 'r', encoding='utf-8') as f:
+        header = f.readline().strip()
+        first_row = f.readline().strip().split(',')
+    tail = "," + ",".join(first_row[4:])
+
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    conn = sqlite3.connect(str(db_path))
+    try:
+        for video_index in range(num_videos):
+            video_id = conn.execute("INSERT INTO video_table (video_dir) VALUES (?)", (f"video_{video_index}",)).lastrowid
+            core_dir = Path("02_core_lib_output") / f"{video_id:06d}"
+            (root / core_dir).mkdir(parents=True, exist_ok=True)
+
+            # 開眼状態に、平均90フレームの閉眼区間を散在させる
+            closed = np.zeros(num_frames, dtype=bool)
+            num_closures = max(1, num_frames // 600)
+            starts = rng.integers(0, num_frames, num_closures)
+            lengths = rng.integers(15, 165, num_closures)
+            for start, length in zip(starts, lengths):
+                closed[start:start + length] = True
+            frame_df = pd.DataFrame({
+                'frame': np.arange(1, num_frames + 1),
+                'leye_openness': np.where(closed, rng.uniform(0.02, 0.09, num_frames), rng.uniform(0.15, 0.35, num_frames)),
+                'reye_openness': np.where(closed, rng.uniform(0.02, 0.09, num_frames), rng.uniform(0.15, 0.35, num_frames)),
+                'confidence': np.where(rng.random(num_frames) < 0.02, 0.3, 1.0),
+            })
+            body = frame_df.to_csv(index=False, header=False)
+            with open(root / core_dir / "core_lib_output.csv", 'w', encoding='utf-8') as f:
+                f.write(header + "\n")
+                f.write("\n".join(line + tail for line in body.splitlines()))
+                f.write("\n")
+
+            conn.execute(
+                "INSERT INTO core_lib_output_table (core_lib_ID, video_ID, core_lib_output_dir) VALUES (?, ?, ?)",
+                (1, video_id, str(core_dir))
+            )
+            # タグの半数は閉眼区間の周辺、残りは任意の位置に配置
+            for tag_index in range(num_tags):
+                length = int(rng.integers(min(30, num_frames), min(300, num_frames) + 1))
+                if tag_index % 2 == 0:
+                    center = int(starts[tag_index % num_closures])
+                    start = min(max(1, center - length // 2), num_frames - length + 1)
+                else:
+                    start = int(rng.integers(1, num_frames - length + 2))
+                conn.execute(
+                    'INSERT INTO tag_table (video_ID, task_ID, start, "end") VALUES (?, ?, ?, ?)',
+                    (video_id, tag_index + 1, start, start + length - 1)
+                )
+        conn.commit()
+    finally:
+        conn.close()
+
+    marker.write_text(json.dumps(params), encoding='utf-8')
+    print(f"  データ生成: {num_videos:,}ビデオ × {num_frames:,}フレーム ({time.perf_counter() - started:.1f}秒)")
+
+
+def write_engine_config(root: Path, args: argparse.Namespace) -> Path:
+    """リポジトリの config.yaml を基に、合成データを指すベンチマーク用設定を作成"""
+    with open(REPO_DIR / "config.yaml", 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    config['datawarehouse']['database_path'] = str(root / "database.db")
+    config['output']['base_dir'] = str(root / "03_algorithm_output")
+    config['output']['evaluation_dir'] = str(root / "04_evaluation_output")
+    if args.output_format:
+        config['output']['format'] = args.output_format
+    config['algorithm']['git_repo'] = "synthetic"
+    config['algorithm']['version_check'] = {'offline': True}
+    config['logging']['file'] = str(root / "log.md")
+    config['parallel'] = {'workers': args.workers}
+    # 推論スループットを計測するため推論キャッシュは使用しない
+    config['cache'] = {'enabled': False}
+    if 'core_store' in config:
+        config['core_store']['dir'] = str(root / ".core_input_store")
+    if args.replay:
+        config.setdefault('replay', {})['mode'] = args.replay
+
+    config_path = root / "bench_config.yaml"
+    with open(config_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+    return config_path
+
+
+def run_engine(config_path: str) -> int:
+    """（子プロセス）代替DWHを差し込んで評価エンジンを実行"""
+    synthetic_dwh.install()
+    if synthetic_detector.install_if_missing():
+        print("drowsy_detection が未インストールのため、代替検出器（benchmarks/synthetic_detector.py）で計測します")
+    # spawn で起動したワーカーは代替DWHを引き継げないため、可能なら fork を使用
+    if 'fork' in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method('fork', force=True)
+    import main
+    engine = main.EvaluationEngine(config_path, use_cache=False)
+    return 0 if engine.run_evaluation() else 1
+
+
+def generate_dataset_in_subprocess(root: Path, shape: Dict[str, int]):
+    """合成データを別プロセスで生成
+
+    Linux の ru_maxrss は fork・exec 後も引き継がれるため、生成時のメモリ使用量が
+    評価エンジンのピークRSSに混入しないよう、本プロセスでは大きな配列を扱わない。
+    """
+    result = subprocess.run([
+        sys.executable, str(Path(__file__).resolve()), '--generate', str(root),
+        '--videos', str(shape['videos']), '--frames', str(shape['frames']), '--tags', str(shape['tags'])
+    ])
+    if result.returncode != 0:
+        raise RuntimeError("合成データの生成に失敗しました")
+
+
+def run_scenario(root: Path, config_path: Path) -> Dict[str, Any]:
+    """評価エンジンを別プロセスで1回実行し、実行時間とエンジンの metrics.json を返す"""
+    log_path = root / "engine_stdout.log"
+    started = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), '--run-engine', str(config_path)],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            cwd=str(root)
+        )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"評価エンジンの実行に失敗しました（ログ: {log_path}）")
+
+    metrics_files = glob.glob(str(root / "04_evaluation_output" / "*" / "*" / "metrics.json"))
+    if not metrics_files:
+        raise RuntimeError(f"metrics.json が見つかりません（ログ: {log_path}）")
+    with open(max(metrics_files, key=os.path.getmtime), 'r', encoding='utf-8') as f:
+        metrics = json.load(f)['metrics']
+
+    peak_rss = metrics['peak_rss_mb']
+    return {
+        'elapsed_seconds': elapsed,
+        'engine_elapsed_seconds': metrics['elapsed_seconds'],
+        'frames': metrics['throughput']['frames'],
+        'frames_per_second': metrics['throughput']['frames'] / elapsed if elapsed > 0 else 0.0,
+        'detector_frames_per_second': metrics['throughput']['detector_frames_per_second'],
+        'peak_rss_mb': max(value for value in (peak_rss['parent'], peak_rss['workers'], 0.0) if value is not None),
+        'stages': {name: stage['wall_seconds'] for name, stage in metrics['stages'].items()},
+    }
+
+
+def get_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=str(REPO_DIR), capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() if result.returncode == 0 else None
+    except Exception:
+        return None
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """ベースラインと比較し、許容範囲を超えて劣化した指標の一覧を返す"""
+    regressions = []
+    print(f"\nベースライン比較 (commit: {str(baseline.get('commit'))[:8]}, 許容 {tolerance * 100:.0f}%)")
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            print(f"  {name}: ベースラインなし")
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not previous.get(metric):
+                continue
+            ratio = current[metric] / previous[metric]
+            regressed = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+            mark = "NG" if regressed else "OK"
+            print(f"  {name:11s} {metric:18s}: {previous[metric]:14,.2f} -> {current[metric]:14,.2f} ({ratio:5.2f}x) {mark}")
+            if regressed:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="評価エンジン エンドツーエンド ベンチマーク")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS) + ['custom'],
+                        help="計測シナリオ（複数指定可。省略時は smoke）")
+    parser.add_argument('--videos', type=int, default=100, help="custom シナリオのビデオ数")
+    parser.add_argument('--frames', type=int, default=3_000, help="custom シナリオのビデオあたりフレーム数")
+    parser.add_argument('--tags', type=int, default=5, help="custom シナリオのビデオあたりタグ数")
+    parser.add_argument('--workers', type=int, default=1, help="parallel.workers")
+    parser.add_argument('--replay', type=str, default=None, choices=['reference', 'verify'], help="replay.mode")
+    parser.add_argument('--output-format', type=str, default=None, choices=['csv', 'parquet', 'feather'], help="output.format")
+    parser.add_argument('--repeat', type=int, default=1, help="シナリオごとの実行回数（最良値を採用。1回目はコア入力ストアの取り込みを含む）")
+    parser.add_argument('--work-dir', type=str, default=None, help="合成データの作成先（省略時は一時ディレクトリ。指定時は生成済みデータを再利用）")
+    parser.add_argument('--output', type=str, default=None, help="結果JSONの保存先")
+    parser.add_argument('--baseline', type=str, default=None, help="比較するベースライン結果JSON")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="劣化とみなす比率（0.15 = 15%%）")
+    parser.add_argument('--run-engine', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--generate', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_engine:
+        return run_engine(args.run_engine)
+    if args.generate:
+        generate_dataset(Path(args.generate), args.videos, args.frames, args.tags)
+        return 0
+
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="bench_engine_"))
+    print(f"作業ディレクトリ: {work_dir}")
+
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'commit': get_commit(),
+        'settings': {'workers': args.workers, 'replay': args.replay, 'output_format': args.output_format, 'repeat': args.repeat},
+        'scenarios': {}
+    }
+    for name in args.scenario or ['smoke']:
+        shape = SCENARIOS.get(name) or {'videos': args.videos, 'frames': args.frames, 'tags': args.tags}
+        print(f"\n[{name}] {shape['videos']:,}ビデオ × {shape['frames']:,}フレーム, タグ {shape['tags']}件/ビデオ")
+        root = work_dir / f"{name}_{shape['videos']}x{shape['frames']}x{shape['tags']}"
+        generate_dataset_in_subprocess(root, shape)
+        config_path = write_engine_config(root, args)
+
+        runs = []
+        for index in range(args.repeat):
+            run = run_scenario(root, config_path)
+            runs.append(run)
+            print(f"  実行{index + 1}: {run['elapsed_seconds']:8.2f} s  {run['frames_per_second']:12,.0f} frames/sec  "
+                  f"(推論 {run['detector_frames_per_second']:12,.0f} frames/sec)  ピークRSS {run['peak_rss_mb']:,.0f} MB")
+
+        best = min(runs, key=lambda run: run['elapsed_seconds'])
+        for stage, seconds in sorted(best['stages'].items(), key=lambda item: -item[1])[:6]:
+            print(f"    {stage:26s}: {seconds:8.2f} s")
+        results['scenarios'][name] = {**shape, **best, 'runs': [run['elapsed_seconds'] for run in runs]}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n結果保存: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"  劣化: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+フレームループ ベンチマーク
+
+df.iterrows() による従来の入力経路、列配列による高速経路（engine.detector._run_detector_columnar）、
+NumPyによるバッチ再生（engine.detector._replay_detector_batch）のスループット（frames/sec）を比較する。
+drowsy_detection が未インストールの場合は代替検出器（synthetic_detector）で計測する。
+
+使い方:
+    python benchmarks/bench_frame_loop.py [--frames 100000] [--csv path/to/core.csv] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synthetic_detector  # noqa: E402
+
+if synthetic_detector.install_if_missing():
+    print("drowsy_detection が未インストールのため、代替検出器（benchmarks/synthetic_detector.py）で計測します")
+
+from drowsy_detection import DrowsyDetector, InputData, Config  # noqa: E402
+from engine import detector as engine_detector  # noqa: E402
+
+
+def make_synthetic_core_df(num_frames: int, seed: int = 0) -> pd.DataFrame:
+    """core_lib_output_sample.csv と同じ列構成の合成データを生成"""
+    sample_path = Path(__file__).resolve().parent.parent / "core_lib_output_sample.csv"
+    columns = pd.read_csv(sample_path, nrows=0).columns
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(0.0, index=np.arange(num_frames), columns=columns)
+    df['frame'] = np.arange(1, num_frames + 1)
+    # 開眼と閉眼区間を交互に生成
+    closed = (np.arange(num_frames) // 150) % 4 == 3
+    df['leye_openness'] = np.where(closed, rng.uniform(0.02, 0.08, num_frames), rng.uniform(0.15, 0.35, num_frames))
+    df['reye_openness'] = np.where(closed, rng.uniform(0.02, 0.08, num_frames), rng.uniform(0.15, 0.35, num_frames))
+    df['confidence'] = np.where(rng.random(num_frames) < 0.02, 0.3, 1.0)
+    df['sunglasses_detected'] = False
+    return df
+
+
+def new_detector(frame_rate: float) -> DrowsyDetector:
+    detector = DrowsyDetector(Config())
+    detector.set_frame_rate(frame_rate)
+    return detector
+
+
+def run_iterrows(df: pd.DataFrame, frame_rate: float) -> pd.DataFrame:
+    """従来実装（iterrows + dictのリスト）"""
+    detector = new_detector(frame_rate)
+    algo_results = []
+    for _, row in df.iterrows():
+        input_data = InputData(
+            frame_num=int(row['frame']),
+            left_eye_open=float(row['leye_openness']),
+            right_eye_open=float(row['reye_openness']),
+            face_confidence=float(row['confidence'])
+        )
+        output = detector.update(input_data)
+        algo_results.append({
+            'frame_num': output.frame_num,
+            'is_drowsy': int(output.is_drowsy),
+            'left_eye_closed': output.left_eye_closed,
+            'right_eye_closed': output.right_eye_closed,
+            'continuous_time': output.continuous_time,
+            'error_code': output.error_code or ''
+        })
+    return pd.DataFrame(algo_results)
+
+
+def run_columnar(df: pd.DataFrame, frame_rate: float) -> pd.DataFrame:
+    """列配列による高速経路"""
+    return engine_detector._run_detector_columnar(
+        new_detector(frame_rate),
+        df['frame'].to_numpy(),
+        df['leye_openness'].to_numpy(),
+        df['reye_openness'].to_numpy(),
+        df['confidence'].to_numpy()
+    )
+
+
+def run_batch(df: pd.DataFrame, frame_rate: float) -> pd.DataFrame:
+    """バッチ再生（Config が対応していない場合は None）"""
+    return engine_detector._replay_detector_batch(
+        Config(),
+        frame_rate,
+        df['frame'].to_numpy(),
+        df['leye_openness'].to_numpy(),
+        df['reye_openness'].to_numpy(),
+        df['confidence'].to_numpy()
+    )
+
+
+def measure(func, df: pd.DataFrame, frame_rate: float, repeat: int):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df, frame_rate)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="フレームループ ベンチマーク")
+    parser.add_argument('--frames', type=int, default=100_000, help="合成データのフレーム数")
+    parser.add_argument('--csv', type=str, default=None, help="実データのコアCSV（指定時は合成データを使わない）")
+    parser.add_argument('--frame-rate', type=float, default=30.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv) if args.csv else make_synthetic_core_df(args.frames)
+    num_frames = len(df)
+    print(f"フレーム数: {num_frames:,}")
+
+    t_old, old_df = measure(run_iterrows, df, args.frame_rate, args.repeat)
+    t_new, new_df = measure(run_columnar, df, args.frame_rate, args.repeat)
+
+    # 出力CSVが同一であることを確認
+    identical = old_df.to_csv(index=False) == new_df.to_csv(index=False)
+
+    print(f"  iterrows : {t_old:8.3f} s  {num_frames / t_old:12,.0f} frames/sec")
+    print(f"  columnar : {t_new:8.3f} s  {num_frames / t_new:12,.0f} frames/sec")
+    print(f"  高速化率 : {t_old / t_new:.2f}x")
+    print(f"  出力一致 : {'OK' if identical else 'NG'}")
+
+    t_batch, batch_df = measure(run_batch, df, args.frame_rate, args.repeat)
+    if batch_df is None:
+        print("  batch    : Config が未対応のため計測なし")
+    else:
+        mismatch = engine_detector._first_mismatch(new_df, batch_df)
+        print(f"  batch    : {t_batch:8.3f} s  {num_frames / t_batch:12,.0f} frames/sec")
+        print(f"  高速化率 : {t_old / t_batch:.2f}x (対iterrows)")
+        print(f"  参照一致 : {'OK' if mismatch is None else f'NG ({mismatch}行目から不一致)'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
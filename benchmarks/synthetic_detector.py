@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク・テスト用 drowsy_detection 代替モジュール
+
+drowsy_detection が未インストールの環境でもベンチマークとテストを実行できるよう、
+評価エンジンが使用する Config / InputData / OutputData / DrowsyDetector のみを再現する。
+判定ロジックは単純化した代替実装であり、実アルゴリズムの性能評価には使用できない
+（実アルゴリズムとバッチ再生の一致確認は tests/test_replay.py が実パッケージに対して行い、CI では必須）。
+
+判定仕様:
+    - face_confidence < face_conf_threshold のフレームは エラーコード E001 を返し、連続閉眼をリセット
+    - 開眼度 < 閉眼閾値 で閉眼、両眼閉眼が連続したフレーム数 / フレームレート を continuous_time とする
+    - continuous_time >= continuous_close_time で居眠りと判定
+
+使い方（main・engine のインポート前に差し替える）:
+    import synthetic_detector
+    synthetic_detector.install()
+    import main
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+__version__ = "0.0.0+synthetic"
+
+# 低信頼度フレームのエラーコード
+LOW_CONFIDENCE_ERROR_CODE = "E001"
+
+
+@dataclass
+class Config:
+    """判定パラメータ（drowsy_detection.Config 相当）"""
+    left_eye_close_threshold: float = 0.105
+    right_eye_close_threshold: float = 0.105
+    continuous_close_time: float = 1.0
+    face_conf_threshold: float = 0.75
+
+
+@dataclass
+class InputData:
+    """1フレーム分の入力（drowsy_detection.InputData 相当）"""
+    frame_num: int
+    left_eye_open: float
+    right_eye_open: float
+    face_confidence: float
+
+
+@dataclass
+class OutputData:
+    """1フレーム分の判定結果（drowsy_detection.OutputData 相当）"""
+    is_drowsy: bool
+    frame_num: int
+    left_eye_closed: bool
+    right_eye_closed: bool
+    continuous_time: float
+    error_code: Optional[str] = None
+
+
+class DrowsyDetector:
+    """連続閉眼時間による居眠り判定（drowsy_detection.DrowsyDetector 相当）"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.frame_rate = 30.0
+        self.closed_frames = 0
+
+    def set_frame_rate(self, frame_rate: float):
+        self.frame_rate = frame_rate
+
+    def update(self, input_data: InputData) -> OutputData:
+        if input_data.face_confidence < self.config.face_conf_threshold:
+            self.closed_frames = 0
+            return OutputData(False, input_data.frame_num, False, False, 0.0, LOW_CONFIDENCE_ERROR_CODE)
+
+        left_closed = input_data.left_eye_open < self.config.left_eye_close_threshold
+        right_closed = input_data.right_eye_open < self.config.right_eye_close_threshold
+        self.closed_frames = self.closed_frames + 1 if (left_closed and right_closed) else 0
+        continuous_time = self.closed_frames / self.frame_rate
+        return OutputData(
+            continuous_time >= self.config.continuous_close_time,
+            input_data.frame_num,
+            left_closed,
+            right_closed,
+            continuous_time
+        )
+
+
+def install():
+    """sys.modules['drowsy_detection'] をこのモジュールに差し替える"""
+    sys.modules['drowsy_detection'] = sys.modules[__name__]
+
+
+def install_if_missing() -> bool:
+    """drowsy_detection がインポートできない場合のみ差し替える（差し替えた場合 True）"""
+    try:
+        import drowsy_detection  # noqa: F401
+        return False
+    except ImportError:
+        install()
+        return True
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用 DataWareHouse 代替モジュール
+
+評価エンジンが使用する datawarehouse のAPIのみを、ローカルのSQLite DBで再現する。
+各APIは datawarehouse と同様に呼び出しごとに sqlite3.connect → 実行 → commit → close を行う。
+テーブル定義（SCHEMA）は engine.warehouse.DWH_BULK_TABLES の列を含むため、engine.warehouse.DWHBulkWriter による
+一括登録・タグの一括取得の経路もそのまま計測できる。
+
+使い方（main・engine のインポート前に差し替える）:
+    import synthetic_dwh
+    synthetic_dwh.install()
+    import main
+"""
+
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional
+
+
+class DWHError(Exception):
+    """代替DWHの基底例外"""
+
+
+class DWHUniqueConstraintError(DWHError):
+    """一意制約違反（datawarehouse.DWHUniqueConstraintError 相当）"""
+
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS video_table (
+        video_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_dir TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS tag_table (
+        tag_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_ID INTEGER NOT NULL,
+        task_ID INTEGER NOT NULL,
+        start INTEGER NOT NULL,
+        "end" INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS tag_video_index ON tag_table (video_ID);
+    CREATE TABLE IF NOT EXISTS core_lib_output_table (
+        core_lib_output_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        core_lib_ID INTEGER NOT NULL,
+        video_ID INTEGER NOT NULL,
+        core_lib_output_dir TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS algorithm_table (
+        algorithm_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        version TEXT NOT NULL,
+        update_info TEXT,
+        commit_hash TEXT UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS algorithm_output_table (
+        algorithm_output_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        algorithm_ID INTEGER NOT NULL,
+        core_lib_output_ID INTEGER NOT NULL,
+        algorithm_output_dir TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS evaluation_result_table (
+        evaluation_result_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        version TEXT NOT NULL,
+        algorithm_ID INTEGER NOT NULL,
+        true_positive REAL,
+        false_positive REAL,
+        evaluation_result_dir TEXT NOT NULL,
+        evaluation_timestamp TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS evaluation_data_table (
+        evaluation_data_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        evaluation_result_ID INTEGER NOT NULL,
+        algorithm_output_ID INTEGER NOT NULL,
+        correct_task_num INTEGER NOT NULL,
+        total_task_num INTEGER NOT NULL,
+        evaluation_data_path TEXT NOT NULL
+    );
+"""
+
+
+def install():
+    """sys.modules['datawarehouse'] をこのモジュールに差し替える"""
+    sys.modules['datawarehouse'] = sys.modules[__name__]
+
+
+def init_database(db_path: str):
+    """代替DBのテーブルを作成"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _execute(db_path: str, sql: str, params: tuple = ()) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        return cursor.lastrowid
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        raise DWHUniqueConstraintError(str(e)) from e
+    finally:
+        conn.close()
+
+
+def _query(db_path: str, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute(sql, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def list_core_lib_outputs(video_id: Optional[int] = None, db_path: str = "database.db") -> List[Dict[str, Any]]:
+    if video_id is None:
+        return _query(db_path, "SELECT * FROM core_lib_output_table ORDER BY core_lib_output_ID")
+    return _query(db_path, "SELECT * FROM core_lib_output_table WHERE video_ID = ? ORDER BY core_lib_output_ID", (video_id,))
+
+
+def get_video_tags(video_id: int, db_path: str = "database.db") -> List[Dict[str, Any]]:
+    return _query(db_path, "SELECT * FROM tag_table WHERE video_ID = ? ORDER BY tag_ID", (video_id,))
+
+
+def create_algorithm_version(version: str, update_info: str, commit_hash: str, db_path: str = "database.db") -> int:
+    return _execute(
+        db_path,
+        "INSERT INTO algorithm_table (version, update_info, commit_hash) VALUES (?, ?, ?)",
+        (version, update_info, commit_hash)
+    )
+
+
+def find_algorithm_by_commit_hash(commit_hash: str, db_path: str = "database.db") -> Optional[Dict[str, Any]]:
+    rows = _query(db_path, "SELECT * FROM algorithm_table WHERE commit_hash = ?", (commit_hash,))
+    return rows[0] if rows else None
+
+
+def create_algorithm_output(algorithm_id: int, core_lib_output_id: int, output_dir: str, db_path: str = "database.db") -> int:
+    return _execute(
+        db_path,
+        "INSERT INTO algorithm_output_table (algorithm_ID, core_lib_output_ID, algorithm_output_dir) VALUES (?, ?, ?)",
+        (algorithm_id, core_lib_output_id, output_dir)
+    )
+
+
+def create_evaluation_result(version: str, algorithm_id: int, true_positive: Optional[float], false_positive: Optional[float],
+                             evaluation_result_dir: str, evaluation_timestamp: str, db_path: str = "database.db") -> int:
+    return _execute(
+        db_path,
+        "INSERT INTO evaluation_result_table (version, algorithm_ID, true_positive, false_positive, "
+        "evaluation_result_dir, evaluation_timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+        (version, algorithm_id, true_positive, false_positive, evaluation_result_dir, evaluation_timestamp)
+    )
+
+
+def create_evaluation_data(evaluation_result_id: int, algorithm_output_id: int, correct_task_num: int,
+                           total_task_num: int, evaluation_data_path: str, db_path: str = "database.db") -> int:
+    return _execute(
+        db_path,
+        "INSERT INTO evaluation_data_table (evaluation_result_ID, algorithm_output_ID, correct_task_num, "
+        "total_task_num, evaluation_data_path) VALUES (?, ?, ?, ?, ?)",
+        (evaluation_result_id, algorithm_output_id, correct_task_num, total_task_num, evaluation_data_path)
+    )
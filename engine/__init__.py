@@ -0,0 +1,6 @@
+"""
+drowsy_detection 評価エンジンの実装モジュール
+
+main.py（CLI・EvaluationEngine）から使用する。遅延インポートするモジュール（pandas・drowsy_detection・
+datawarehouse 等）は engine.deps 経由で参照する。
+"""
@@ -0,0 +1,289 @@
+"""
+評価対象アルゴリズム（drowsy_detection）のバージョン管理
+
+リモートリポジトリの最新コミット確認（バックグラウンド・キャッシュ付き）と更新、インストール済みパッケージの
+コミット・ソースの識別、分離インストールしたバージョンの読み込み。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import importlib.metadata
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from engine import deps
+from engine.hashing import _hash_file
+
+
+def _get_installed_commit_hash() -> Optional[str]:
+    """インストール済み drowsy_detection のコミットハッシュ（パッケージメタデータ direct_url.json の vcs_info）"""
+    for name in ('drowsy_detection', 'drowsy-detection'):
+        try:
+            direct_url = importlib.metadata.distribution(name).read_text('direct_url.json')
+        except importlib.metadata.PackageNotFoundError:
+            continue
+        if not direct_url:
+            return None
+        try:
+            return json.loads(direct_url).get('vcs_info', {}).get('commit_id')
+        except ValueError:
+            return None
+    return None
+
+
+def _get_installed_version() -> Optional[str]:
+    """インストール済み drowsy_detection のパッケージバージョン（パッケージメタデータ。未インストールの場合 None）"""
+    for name in ('drowsy_detection', 'drowsy-detection'):
+        try:
+            return importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            continue
+    return None
+
+
+def _hash_module_source(module) -> Optional[str]:
+    """モジュールのソース（パッケージの場合は配下の .py / 拡張モジュールすべて）の内容ハッシュ（ファイルが無い場合 None）"""
+    module_file = getattr(module, '__file__', None)
+    if not module_file or not Path(module_file).is_file():
+        return None
+    module_path = Path(module_file)
+    if module_path.name != '__init__.py':
+        return _hash_file(module_path)
+    package_dir = module_path.parent
+    digest = hashlib.sha256()
+    for path in sorted(package_dir.rglob('*')):
+        if path.suffix not in ('.py', '.so', '.pyd') or '__pycache__' in path.parts or not path.is_file():
+            continue
+        digest.update(f"{path.relative_to(package_dir).as_posix()}\0{_hash_file(path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _get_loaded_algorithm_identity() -> Optional[Dict[str, Any]]:
+    """読み込まれている drowsy_detection の識別情報（推論キャッシュ・差分評価の推論条件に使用）
+
+    __version__・インストール元のコミット（direct_url.json。無い場合 None）・ソースの内容ハッシュからなり、
+    リモートのHEADやバージョンキャッシュのコミットには依存しない。コミットもソースも特定できない場合は None。
+    """
+    commit = _get_installed_commit_hash()
+    source_hash = _hash_module_source(deps.drowsy_detection)
+    if commit is None and source_hash is None:
+        return None
+    return {
+        'version': str(getattr(deps.drowsy_detection, '__version__', '')),
+        'commit': commit,
+        'source_hash': source_hash,
+    }
+
+
+def _reload_drowsy_detection():
+    """drowsy_detection をサブモジュールごと sys.modules から除去して再インポートし、モジュール内の参照を差し替える"""
+    for name in [name for name in sys.modules if name == 'drowsy_detection' or name.startswith('drowsy_detection.')]:
+        del sys.modules[name]
+    importlib.invalidate_caches()
+    deps.drowsy_detection = importlib.import_module('drowsy_detection')
+
+
+def _activate_algorithm_site(site_dir: Optional[str]):
+    """ワーカープロセスの初期化: site_dir に分離インストールした drowsy_detection を読み込む（None はインストール済みを使用）"""
+    if site_dir:
+        sys.path.insert(0, site_dir)
+        _reload_drowsy_detection()
+
+
+def _get_algorithm_base_version() -> str:
+    """ワーカープロセスで読み込まれている drowsy_detection の __version__"""
+    return deps.drowsy_detection.__version__
+
+
+class AlgorithmVersionMixin:
+    """EvaluationEngine のアルゴリズムバージョン確認・更新
+
+    リモートのコミット確認は起動時にバックグラウンドで開始し、実行準備（_resolve_algorithm_version）で
+    1つのバージョンに確定する。config / run_id / resume_state / algorithm_* 属性は EvaluationEngine が保持する。
+    """
+
+    def _get_algorithm_commit_hash(self) -> str:
+        """リモートリポジトリ（algorithm.git_repo）のHEADコミットハッシュを取得"""
+        try:
+            result = subprocess.run(
+                ["git", "ls-remote", self.config['algorithm']['git_repo'], "HEAD"],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            if result.returncode == 0:
+                return result.stdout.strip().split('\t')[0]
+            else:
+                return "unknown"
+        except Exception:
+            return "unknown"
+
+    def _get_version_check_config(self) -> Dict[str, Any]:
+        """バージョン確認設定（algorithm.version_check）"""
+        return self.config['algorithm'].get('version_check') or {}
+
+    def _load_version_cache(self) -> Dict[str, Any]:
+        """バージョン解決キャッシュから git_repo のエントリ（リモート・インストール済みのコミットとバージョン、確認時刻）を読み込む"""
+        cache_file = self._get_version_check_config().get('cache_file')
+        if not cache_file or not Path(cache_file).exists():
+            return {}
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get(self.config['algorithm']['git_repo']) or {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_version_cache(self, entry: Dict[str, Any]):
+        """バージョン解決キャッシュへ git_repo のエントリを保存"""
+        cache_file = self._get_version_check_config().get('cache_file')
+        if not cache_file:
+            return
+        cache_path = Path(cache_file)
+        try:
+            data = {}
+            if cache_path.exists():
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            data[self.config['algorithm']['git_repo']] = entry
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, cache_path)
+        except (OSError, ValueError) as e:
+            print(f"[{self.run_id}] バージョン解決キャッシュ保存エラー: {e}")
+
+    def _is_version_cache_current(self, cached: Dict[str, Any]) -> bool:
+        """キャッシュ保存時からインストール済みの drowsy_detection（コミット・バージョン）が変わっていないか"""
+        return (
+            'installed_commit' in cached and 'installed_version' in cached
+            and cached['installed_commit'] == _get_installed_commit_hash()
+            and cached['installed_version'] == _get_installed_version()
+        )
+
+    def _start_algorithm_version_check(self) -> Optional[Future]:
+        """リモートのコミット確認をバックグラウンドで開始
+
+        オフラインモード、再開時、またはバージョン解決キャッシュが有効期限（ttl_minutes）内かつ保存時から
+        インストール済みのバージョンが変わっていない場合は確認しない（None）。
+        """
+        check_config = self._get_version_check_config()
+        if check_config.get('offline', False) or self.resume_state:
+            return None
+        cached = self._load_version_cache()
+        ttl_seconds = float(check_config.get('ttl_minutes', 60)) * 60
+        if (cached.get('remote_commit') and time.time() - cached.get('checked_at', 0) < ttl_seconds
+                and self._is_version_cache_current(cached)):
+            return None
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self._get_algorithm_commit_hash)
+        executor.shutdown(wait=False)
+        return future
+
+    def _resolve_algorithm_version(self) -> str:
+        """drowsy_detectionのバージョンを確定し、コミットハッシュを返す
+
+        リモートの最新コミット（バックグラウンド確認またはキャッシュ）とインストール済みパッケージの
+        コミットが異なる場合は更新する。確定後は実行中に変更しない。
+        """
+        if self.algorithm_version_source is not None:
+            return self.algorithm_commit_hash
+        if self.resume_state:
+            return self._resolve_resumed_version()
+        
+        print(f"[{self.run_id}] drowsy_detectionのバージョン確定中...")
+        check_config = self._get_version_check_config()
+        offline = check_config.get('offline', False)
+        installed_commit = _get_installed_commit_hash()
+        cached = self._load_version_cache()
+        if not self._is_version_cache_current(cached):
+            cached = {}
+        
+        remote_commit = None
+        remote_checked = False
+        if offline:
+            self.algorithm_version_source = "オフライン（インストール済みパッケージ）"
+        elif self._remote_commit_check is None:
+            remote_commit = cached.get('remote_commit')
+            self.algorithm_version_source = "キャッシュ"
+        else:
+            remote_commit = self._remote_commit_check.result()
+            self._remote_commit_check = None
+            if remote_commit == "unknown":
+                print(f"[{self.run_id}] リモートコミット取得失敗、現在のバージョンを使用")
+                remote_commit = None
+                self.algorithm_version_source = "リモート確認失敗"
+            else:
+                remote_checked = True
+                self.algorithm_version_source = "リモート確認"
+        
+        # インストール済みのコミットが判明し、リモートと異なる場合のみ更新
+        if remote_commit and installed_commit and remote_commit != installed_commit:
+            print(f"[{self.run_id}] 新しいコミットが見つかりました: {remote_commit[:8]} (現在: {installed_commit[:8]})")
+            if check_config.get('auto_update', True) and self._install_algorithm():
+                installed_commit = _get_installed_commit_hash() or remote_commit
+        elif remote_commit and remote_commit == installed_commit:
+            print(f"[{self.run_id}] drowsy_detectionは最新版です (commit: {remote_commit[:8]})")
+        if remote_checked:
+            # 更新後のインストール済みバージョンと合わせて保存（インストール済みが変わった場合は次回に再確認）
+            self._save_version_cache({
+                'remote_commit': remote_commit,
+                'installed_commit': _get_installed_commit_hash(),
+                'installed_version': _get_installed_version(),
+                'checked_at': time.time(),
+                'checked_at_iso': datetime.now().isoformat()
+            })
+        
+        commit = installed_commit or remote_commit or cached.get('remote_commit') or "unknown"
+        if offline and not installed_commit:
+            self.algorithm_version_source = "オフライン（キャッシュ）" if cached.get('remote_commit') else "オフライン（不明）"
+        self.algorithm_commit_hash = commit
+        self.algorithm_version = self._get_dynamic_version(deps.drowsy_detection.__version__, commit)
+        print(f"[{self.run_id}] バージョン確定: {self.algorithm_version} ({self.algorithm_version_source})")
+        return commit
+
+    def _install_algorithm(self) -> bool:
+        """drowsy_detectionの最新版をインストールし、サブモジュールを含めて再読込"""
+        print(f"[{self.run_id}] drowsy_detectionを更新中...")
+        try:
+            install_result = subprocess.run(
+                ["uv", "pip", "install", f"git+{self.config['algorithm']['git_repo']}", "--quiet"],
+                capture_output=True,
+                text=True,
+                timeout=300  # 5分タイムアウト
+            )
+        except Exception as e:
+            print(f"[{self.run_id}] drowsy_detection更新エラー: {e}")
+            return False
+        
+        if install_result.returncode != 0:
+            print(f"[{self.run_id}] 更新失敗、インストール済みのバージョンを使用")
+            return False
+        
+        _reload_drowsy_detection()
+        print(f"[{self.run_id}] drowsy_detection更新完了")
+        return True
+
+    def _get_dynamic_version(self, base_version: str, commit_hash: str) -> str:
+        """コミットハッシュベースで動的バージョンを生成"""
+        if commit_hash == "unknown" or not commit_hash:
+            return base_version
+        
+        # コミットハッシュの最初の8文字を使用
+        short_hash = commit_hash[:8]
+        
+        # ベースバージョンが0.1.0で、新しいコミットがある場合は0.1.1として扱う
+        if base_version == "0.1.0" and commit_hash != "e3803bb59fc690e096f82af4e7ba4aff235537ac":
+            return f"0.1.1+{short_hash}"
+        
+        return f"{base_version}+{short_hash}"
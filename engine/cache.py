@@ -0,0 +1,101 @@
+"""
+推論キャッシュ
+
+コアCSVの内容ハッシュと推論条件をキーに、アルゴリズム出力ファイルを再利用する。
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from engine.deps import pd
+from engine.hashing import _hash_text
+from engine.writer import ALGO_OUTPUT_SUFFIXES, _read_algo_output, _write_algo_output
+
+
+class InferenceCache:
+    """アルゴリズム出力ファイルのコンテンツアドレス型キャッシュ
+
+    キーはコアCSVの内容ハッシュと、コミットハッシュ・フレームレート・Config等の
+    推論条件（key_material）から生成する。エントリは保存形式（output_format）ごとに拡張子で区別する。
+    ワーカープロセスへ渡せるようパスと文字列のみを保持する。
+    """
+
+    def __init__(self, cache_dir: Path, key_material: str, output_format: str = 'csv'):
+        self.cache_dir = Path(cache_dir)
+        self.key_material = key_material
+        self.output_format = output_format
+
+    def make_key(self, input_hash: str) -> str:
+        """コアCSVの内容ハッシュと推論条件からキャッシュキーを生成"""
+        return _hash_text(self.key_material + input_hash)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{ALGO_OUTPUT_SUFFIXES[self.output_format]}"
+
+    def restore(self, key: str, algo_csv_path: Path) -> Optional[pd.DataFrame]:
+        """キャッシュヒット時はアルゴ出力を出力先へコピーし、その内容を返す"""
+        entry = self._entry_path(key)
+        if not entry.exists():
+            return None
+        shutil.copyfile(entry, algo_csv_path)
+        # 最終利用時刻を更新（容量超過時は古いものから削除）
+        os.utime(entry)
+        return _read_algo_output(algo_csv_path)
+
+    def store(self, key: str, algo_csv_path: Path):
+        """アルゴ出力をキャッシュへ保存（並列ワーカー間で競合しないよう一時ファイル経由）"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry_path(key)
+        tmp_path = entry.with_suffix(f".{os.getpid()}.tmp")
+        shutil.copyfile(algo_csv_path, tmp_path)
+        os.replace(tmp_path, entry)
+
+    def evict(self, max_size_mb: Optional[float] = None, max_age_days: Optional[float] = None) -> int:
+        """期限切れのエントリを削除し、容量上限を超える場合は最終利用が古い順に削除"""
+        if not self.cache_dir.exists():
+            return 0
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix not in ALGO_OUTPUT_SUFFIXES.values():
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        
+        removed = 0
+        now = time.time()
+        if max_age_days is not None:
+            expire_before = now - float(max_age_days) * 86400
+            while entries and entries[0][0] < expire_before:
+                entries.pop(0)[2].unlink(missing_ok=True)
+                removed += 1
+        if max_size_mb is not None:
+            total_size = sum(size for _, size, _ in entries)
+            max_size = float(max_size_mb) * 1024 * 1024
+            while entries and total_size > max_size:
+                _, size, path = entries.pop(0)
+                path.unlink(missing_ok=True)
+                total_size -= size
+                removed += 1
+        return removed
+
+
+def _store_inference_cache(cache: Optional['InferenceCache'], cache_key: Optional[str], algo_csv_path: Path):
+    """保存済みのアルゴ出力を推論キャッシュへ登録（失敗しても推論結果は有効なため警告のみ）"""
+    if cache and cache_key:
+        try:
+            cache.store(cache_key, algo_csv_path)
+        except Exception as e:
+            print(f"      推論キャッシュ保存エラー: {e}")
+
+
+def _save_algo_output(algo_df: pd.DataFrame, path: Path, output_format: str,
+                      cache: Optional['InferenceCache'], cache_key: Optional[str]):
+    """アルゴ出力の保存と推論キャッシュへの登録（非同期ライタから呼び出す）"""
+    _write_algo_output(algo_df, path, output_format)
+    _store_inference_cache(cache, cache_key, path)
@@ -0,0 +1,352 @@
+"""
+バージョン比較
+
+複数バージョンの drowsy_detection をコミットごとに分離インストールし、同じ入力で推論・評価して
+基準バージョンとのビデオ別正解率の差分・タスク単位の正誤の変化を出力する（--compare）。
+"""
+
+from __future__ import annotations
+
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from engine.algorithm import _activate_algorithm_site, _get_algorithm_base_version, _get_installed_commit_hash
+from engine.deps import pd
+from engine.evaluation import _untagged_timelines
+from engine.inference import _iter_bounded
+from engine.store import DEFAULT_FLOAT_DTYPE, CoreInputStore
+from engine.sweep import _sweep_single_video_job
+from engine.writer import _write_json, _write_text
+
+
+# バージョン比較レポートに表示する正誤変化タスクの上限（全件は task_flips.csv）
+COMPARE_REPORT_MAX_FLIPS = 200
+
+
+class CompareMixin:
+    """EvaluationEngine のバージョン比較
+
+    対象データ・タグ・コア入力の読み込みは全バージョンで共有し、DataWareHouse への登録は行わない。
+    config / run_id / evaluation_output_dir 等の属性は EvaluationEngine が保持する。
+    """
+
+    def run_comparison(self, refs: List[str]) -> bool:
+        """複数バージョンの比較評価
+
+        対象データ・タグの取得とコア入力の読み込みは全バージョンで1回のみ行い、各バージョンの drowsy_detection は
+        コミットごとに分離インストールして専用のワーカープロセスで読み込む。DataWareHouseへの登録は行わない。
+        先頭のバージョンを基準に、ビデオ別正解率の差分とタスク単位の正誤の変化を出力する。
+        """
+        temporary_store = None
+        try:
+            print(f"\n[{self.run_id}] バージョン比較開始")
+            
+            versions = self._prepare_compare_versions(refs)
+            if len(versions) < 2:
+                raise ValueError("比較には2つ以上のバージョンが必要です")
+            
+            core_outputs = self._get_target_data()
+            video_tags = self._prefetch_video_tags([core_output['video_ID'] for core_output in core_outputs])
+            targets = [core_output for core_output in core_outputs if core_output['video_ID'] in video_tags]
+            
+            self.evaluation_output_dir = self.evaluation_dir / f"compare_{self.run_id}"
+            self.evaluation_output_dir.mkdir(parents=True, exist_ok=True)
+            print(f"  比較出力ディレクトリ: {self.evaluation_output_dir}")
+            if self.core_input_store is None:
+                # 入力の読み込みをバージョン間で共有するため、比較中のみ一時ストアを使用
+                core_csv_config = self.config.get('core_csv') or {}
+                temporary_store = self.evaluation_output_dir / ".core_input_store"
+                self.core_input_store = CoreInputStore(
+                    temporary_store,
+                    float_dtype=core_csv_config.get('float_dtype', DEFAULT_FLOAT_DTYPE),
+                    csv_engine=core_csv_config.get('engine', 'c')
+                )
+            
+            per_version_results = {}
+            for version in versions:
+                per_version_results[version['name']] = self._run_compare_version(version, targets, video_tags)
+            
+            comparison = self._build_comparison(versions, per_version_results)
+            report_path = self._write_comparison_report(comparison)
+            print(f"  比較レポート保存: {report_path}")
+            for item in comparison['versions']:
+                print(f"  {item['name']}: 正解率 {item['accuracy']:.3f} "
+                      f"({item['total_num_correct']}/{item['total_num_tasks']}), "
+                      f"改善 {item['num_improved']}件, 劣化 {item['num_regressed']}件")
+            
+            print(f"\n[{self.run_id}] バージョン比較完了")
+            return True
+        
+        except Exception as e:
+            print(f"\n[{self.run_id}] バージョン比較エラー: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+        
+        finally:
+            if temporary_store:
+                shutil.rmtree(temporary_store, ignore_errors=True)
+
+    def _prepare_compare_versions(self, refs: List[str]) -> List[Dict[str, Any]]:
+        """比較対象の ref（コミット・ブランチ・タグ、または installed）をコミットに解決し、分離インストールを用意
+
+        installed は現在の環境にインストール済みの drowsy_detection を使用する。
+        解決・インストールに失敗したバージョンは比較対象から除外する。
+        """
+        versions = []
+        seen_commits = set()
+        for ref in refs:
+            if ref == 'installed':
+                commit = _get_installed_commit_hash() or "unknown"
+                site_dir = None
+            else:
+                commit = self._resolve_compare_ref(ref)
+                if commit is None:
+                    print(f"  ref を解決できないため比較対象から除外します: {ref}")
+                    continue
+                site_dir = self._install_compare_version(commit)
+                if site_dir is None:
+                    continue
+            if commit != "unknown" and commit in seen_commits:
+                print(f"  同一コミットのため除外します: {ref} ({commit[:8]})")
+                continue
+            seen_commits.add(commit)
+            versions.append({'ref': ref, 'commit': commit, 'site_dir': site_dir, 'name': ref})
+            print(f"  比較対象: {ref} (commit: {commit[:8]})")
+        return versions
+
+    def _resolve_compare_ref(self, ref: str) -> Optional[str]:
+        """ref をコミットハッシュに解決（40桁の16進数はそのまま、それ以外は git ls-remote で解決）"""
+        if len(ref) == 40 and all(char in '0123456789abcdef' for char in ref.lower()):
+            return ref.lower()
+        try:
+            result = subprocess.run(
+                ["git", "ls-remote", self.config['algorithm']['git_repo'], ref],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+        except Exception as e:
+            print(f"  git ls-remote エラー ({ref}): {e}")
+            return None
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        return result.stdout.strip().split('\n')[0].split('\t')[0]
+
+    def _install_compare_version(self, commit: str) -> Optional[str]:
+        """指定コミットの drowsy_detection を compare.install_dir/<commit> へ分離インストール（インストール済みなら再利用）"""
+        install_dir = Path((self.config.get('compare') or {}).get('install_dir', '.algorithm_versions'))
+        site_dir = install_dir / commit
+        marker = site_dir / ".installed"
+        if marker.exists():
+            return str(site_dir.resolve())
+        
+        print(f"  drowsy_detection {commit[:8]} を分離インストール中...")
+        shutil.rmtree(site_dir, ignore_errors=True)
+        try:
+            install_result = subprocess.run(
+                ["uv", "pip", "install", "--target", str(site_dir), "--no-deps",
+                 f"git+{self.config['algorithm']['git_repo']}@{commit}", "--quiet"],
+                capture_output=True,
+                text=True,
+                timeout=300  # 5分タイムアウト
+            )
+        except Exception as e:
+            print(f"  分離インストールエラー ({commit[:8]}): {e}")
+            return None
+        if install_result.returncode != 0:
+            print(f"  分離インストール失敗 ({commit[:8]}): {install_result.stderr.strip()}")
+            return None
+        marker.write_text(datetime.now().isoformat(), encoding='utf-8')
+        return str(site_dir.resolve())
+
+    def _run_compare_version(self, version: Dict[str, Any], targets: List[Dict[str, Any]],
+                             video_tags: Dict[Any, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """1バージョン分の推論・評価（バージョンを読み込んだ専用のワーカープロセスで実行）
+
+        各ビデオの評価CSVとサマリはバージョンごとのディレクトリへ保存し、
+        比較用にビデオ別結果とタスクごとの正誤のみを返す。
+        """
+        # バッチ再生の照合結果は親プロセスで読み込んだバージョンのものであり、比較対象のバージョンには使用しない
+        settings = dict(self._get_worker_settings(), batch_replay=False)
+        workers = max(1, self._get_parallel_workers())
+        default_variant = {'name': 'default', 'frame_rate': settings['frame_rate'], 'config_overrides': {}}
+        results = []
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_activate_algorithm_site,
+                                 initargs=(version['site_dir'],)) as executor:
+            base_version = executor.submit(_get_algorithm_base_version).result()
+            version['algorithm_version'] = self._get_dynamic_version(base_version, version['commit'])
+            version['name'] = f"v{version['algorithm_version']}"
+            version_dir = self.evaluation_output_dir / version['name']
+            version_dir.mkdir(parents=True, exist_ok=True)
+            print(f"[{self.run_id}] {version['name']} ({version['ref']}) 推論実行中... ワーカー数={workers}")
+            
+            jobs = [(core_output, video_tags[core_output['video_ID']]) for core_output in targets]
+            for (core_output, _), future in _iter_bounded(
+                    executor, _sweep_single_video_job, jobs, ([default_variant], settings), workers * 2):
+                try:
+                    variant_results = future.result()
+                except Exception as e:
+                    print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e}")
+                    continue
+                if not variant_results:
+                    continue
+                result = variant_results['default']
+                if result['video_result']:
+                    pd.DataFrame(result['evaluation_result']).to_csv(
+                        version_dir / result['video_result']['result_file_path'], index=False)
+                results.append({
+                    'video_id': core_output['video_ID'],
+                    'video_result': result['video_result'],
+                    'timeline': result['timeline'],
+                    'task_correct': {task['task_id']: task['correct'] for task in result['evaluation_result']},
+                    'total_frames': result['total_frames'],
+                    'drowsy_frames': result['drowsy_frames']
+                })
+        
+        summary = self._build_evaluation_summary(
+            [dict(result['video_result'], total_frames=result['total_frames'], drowsy_frames=result['drowsy_frames'])
+             for result in results if result['video_result']],
+            untagged_videos=_untagged_timelines(results))
+        summary['evaluation_summary']['algorithm_version'] = version['algorithm_version']
+        summary['evaluation_summary']['algorithm_commit_hash'] = version['commit']
+        _write_json(version_dir / "evaluation_summary.json", summary)
+        version['overall_results'] = summary['evaluation_summary']['overall_results']
+        version['elapsed_seconds'] = time.perf_counter() - started
+        print(f"  処理完了: {len(results)}ビデオ ({version['elapsed_seconds']:.1f}秒)")
+        return results
+
+    def _build_comparison(self, versions: List[Dict[str, Any]],
+                          per_version_results: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """先頭バージョンを基準に、バージョン別の全体結果・ビデオ別正解率の差分・タスクの正誤の変化を集計"""
+        baseline = versions[0]['name']
+        baseline_results = {result['video_id']: result for result in per_version_results[baseline]}
+        
+        version_items = []
+        flips = []
+        per_video: Dict[Any, Dict[str, Any]] = {}
+        for version in versions:
+            results = per_version_results[version['name']]
+            total_frames = sum(result['total_frames'] for result in results)
+            drowsy_frames = sum(result['drowsy_frames'] for result in results)
+            num_improved = num_regressed = 0
+            for result in results:
+                video_id = result['video_id']
+                entry = per_video.setdefault(video_id, {'video_id': video_id, 'accuracy': {}, 'delta': {}})
+                if not result['video_result']:
+                    continue
+                entry['accuracy'][version['name']] = result['video_result']['accuracy']
+                base = baseline_results.get(video_id)
+                if version['name'] == baseline or not base or not base['video_result']:
+                    continue
+                entry['delta'][version['name']] = result['video_result']['accuracy'] - base['video_result']['accuracy']
+                for task_id, correct in result['task_correct'].items():
+                    base_correct = base['task_correct'].get(task_id)
+                    if base_correct is None or base_correct == correct:
+                        continue
+                    change = 'improved' if correct else 'regressed'
+                    if correct:
+                        num_improved += 1
+                    else:
+                        num_regressed += 1
+                    flips.append({'version': version['name'], 'video_id': video_id, 'task_id': task_id,
+                                  'baseline_correct': base_correct, 'correct': correct, 'change': change})
+            version_items.append({
+                'name': version['name'],
+                'ref': version['ref'],
+                'commit': version['commit'],
+                'algorithm_version': version['algorithm_version'],
+                'accuracy': version['overall_results']['accuracy'],
+                'total_num_correct': version['overall_results']['total_num_correct'],
+                'total_num_tasks': version['overall_results']['total_num_tasks'],
+                'detection_rate': drowsy_frames / total_frames if total_frames > 0 else 0.0,
+                'num_improved': num_improved,
+                'num_regressed': num_regressed,
+                'elapsed_seconds': version['elapsed_seconds']
+            })
+        
+        return {
+            'run_id': self.run_id,
+            'created_at': datetime.now().isoformat(),
+            'baseline': baseline,
+            'versions': version_items,
+            'per_video': list(per_video.values()),
+            'task_flips': flips
+        }
+
+    def _write_comparison_report(self, comparison: Dict[str, Any]) -> str:
+        """バージョン比較結果（comparison_summary.json / task_flips.csv / comparison_report.md）の保存"""
+        _write_json(self.evaluation_output_dir / "comparison_summary.json", {
+            'comparison_summary': {key: value for key, value in comparison.items() if key != 'task_flips'}
+        })
+        pd.DataFrame(
+            comparison['task_flips'],
+            columns=['version', 'video_id', 'task_id', 'baseline_correct', 'correct', 'change']
+        ).to_csv(self.evaluation_output_dir / "task_flips.csv", index=False)
+        
+        baseline = comparison['baseline']
+        names = [item['name'] for item in comparison['versions']]
+        lines = [
+            "# drowsy_detection バージョン比較レポート",
+            "",
+            f"**実行日時**: {comparison['created_at']}",
+            f"**実行ID**: `{self.run_id}`",
+            f"**基準バージョン**: `{baseline}`",
+            "",
+            "## 📊 バージョン別結果",
+            "",
+            "| バージョン | ref | 正解率 | 正解数/総数 | 検出率 | 改善 | 劣化 |",
+            "|-----------|-----|--------|------------|--------|------|------|",
+        ]
+        for item in comparison['versions']:
+            lines.append(
+                f"| [{item['name']}]({item['name']}/evaluation_summary.json) | `{item['ref']}` | "
+                f"{item['accuracy'] * 100:.1f}% | {item['total_num_correct']}/{item['total_num_tasks']} | "
+                f"{item['detection_rate'] * 100:.2f}% | {item['num_improved']} | {item['num_regressed']} |"
+            )
+        
+        lines.extend([
+            "",
+            "## 📹 ビデオ別正解率（基準との差分）",
+            "",
+            "| ビデオID | " + " | ".join(names) + " |",
+            "|----------|" + "|".join("------" for _ in names) + "|",
+        ])
+        for entry in comparison['per_video']:
+            cells = []
+            for name in names:
+                accuracy = entry['accuracy'].get(name)
+                if accuracy is None:
+                    cells.append("-")
+                elif name in entry['delta']:
+                    cells.append(f"{accuracy * 100:.1f}% ({entry['delta'][name] * 100:+.1f})")
+                else:
+                    cells.append(f"{accuracy * 100:.1f}%")
+            lines.append(f"| {entry['video_id']} | " + " | ".join(cells) + " |")
+        
+        lines.extend(["", "## 🔁 タスク単位の正誤の変化", ""])
+        if comparison['task_flips']:
+            lines.extend([
+                f"全 {len(comparison['task_flips'])}件（一覧は [task_flips.csv](task_flips.csv)）",
+                "",
+                "| バージョン | ビデオID | タスクID | 変化 |",
+                "|-----------|----------|----------|------|",
+            ])
+            for flip in comparison['task_flips'][:COMPARE_REPORT_MAX_FLIPS]:
+                change = "✅ 改善" if flip['change'] == 'improved' else "❌ 劣化"
+                lines.append(f"| {flip['version']} | {flip['video_id']} | {flip['task_id']} | {change} |")
+            if len(comparison['task_flips']) > COMPARE_REPORT_MAX_FLIPS:
+                lines.append(f"| ... | | | 他 {len(comparison['task_flips']) - COMPARE_REPORT_MAX_FLIPS}件 |")
+        else:
+            lines.append("基準バージョンと正誤が変化したタスクはありません。")
+        lines.extend(["", "---", "*このレポートは自動生成されました*"])
+        
+        report_path = self.evaluation_output_dir / "comparison_report.md"
+        _write_text(report_path, "\n".join(lines))
+        return str(report_path)
@@ -0,0 +1,49 @@
+"""
+遅延インポートするモジュール
+
+report / summary など推論を行わないサブコマンドの起動を速くするため、pandas・numpy・yaml と
+DataWareHouseパッケージ・アルゴリズム（drowsy_detection）は属性への初回アクセス時に読み込む。
+dwh / drowsy_detection はベンチマーク・テストでの差し替えや、アルゴリズム更新時の再読込
+（_reload_drowsy_detection）でモジュール属性ごと差し替えるため、
+各モジュールからは deps.dwh / deps.drowsy_detection として参照する。
+"""
+
+import importlib.util
+import sys
+
+
+class _MissingModule:
+    """未インストールのモジュールの代わりに束縛し、属性への初回アクセス時に ModuleNotFoundError を送出する"""
+
+    def __init__(self, name: str):
+        self.__name__ = name
+
+    def __getattr__(self, attr: str):
+        raise ModuleNotFoundError(f"No module named '{self.__name__}'", name=self.__name__)
+
+
+def _lazy_import(name: str):
+    """モジュールを遅延インポート（importlib.util.LazyLoader により、属性への初回アクセス時に読み込む）
+
+    report / summary など推論を行わないサブコマンドの起動時に pandas・drowsy_detection 等を読み込まないために使用する。
+    読み込み済み（ベンチマークで差し替えた datawarehouse 等）の場合はそのモジュールを返す。
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return _MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+yaml = _lazy_import('yaml')
+np = _lazy_import('numpy')
+pd = _lazy_import('pandas')
+# DataWareHouseパッケージ・アルゴリズム（推論・DB登録を行うサブコマンドでのみ読み込まれる）
+dwh = _lazy_import('datawarehouse')
+drowsy_detection = _lazy_import('drowsy_detection')
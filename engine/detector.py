@@ -0,0 +1,326 @@
+"""
+DrowsyDetector による推論
+
+列配列から DrowsyDetector.update を呼び出す参照実装、バッチ再生エンジンと参照実装との照合、
+チャンク分割推論（ウォームアップ付き）と、設定に応じたそれらの切り替え（_run_detector）。
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import math
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from engine import deps
+from engine.deps import np, pd
+
+if TYPE_CHECKING:
+    import drowsy_detection
+
+
+# 本番の推論（保存・登録・キャッシュ対象）で使用できる再生モード
+REPLAY_MODES = ('reference', 'verify')
+# バッチ再生エンジンが参照する Config の属性（揃わない場合は参照実装で推論）
+BATCH_REPLAY_CONFIG_FIELDS = (
+    'left_eye_close_threshold',
+    'right_eye_close_threshold',
+    'face_conf_threshold',
+    'continuous_close_time',
+)
+# 顔検出信頼度が閾値未満のフレームに DrowsyDetector が出力するエラーコード
+LOW_CONFIDENCE_ERROR_CODE = 'E001'
+# バッチ再生の照合に使用するビデオ数の既定値（replay.verify_samples）
+DEFAULT_REPLAY_VERIFY_SAMPLES = 1
+
+
+def _make_detector_config(config_overrides: Optional[Dict[str, Any]] = None) -> drowsy_detection.Config:
+    """既定の Config を生成し、config_overrides の属性を上書き（パラメータスイープ用）"""
+    config = deps.drowsy_detection.Config()
+    for name, value in (config_overrides or {}).items():
+        setattr(config, name, value)
+    return config
+
+
+def _detector_columns(df) -> Tuple[np.ndarray, ...]:
+    """コアCSVのDataFrame、または入力ストアの列名 -> 配列の辞書から推論入力の列配列を取り出す"""
+    return (
+        np.asarray(df['frame']),
+        np.asarray(df['leye_openness']),
+        np.asarray(df['reye_openness']),
+        np.asarray(df['confidence'])
+    )
+
+
+def _describe_detector_config(config: drowsy_detection.Config) -> Dict[str, Any]:
+    """Configの内容を辞書化（キャッシュキー生成用）"""
+    if dataclasses.is_dataclass(config):
+        return dataclasses.asdict(config)
+    return dict(vars(config))
+
+
+def _run_detector_columnar(detector: drowsy_detection.DrowsyDetector,
+                           frame_nums: np.ndarray,
+                           left_eye_open: np.ndarray,
+                           right_eye_open: np.ndarray,
+                           face_confidence: np.ndarray) -> pd.DataFrame:
+    """列配列をDrowsyDetectorへ逐次入力し、アルゴリズム出力をDataFrameで返す
+
+    行ごとのSeries生成を避けるため、入力は列ごとにPythonスカラーのリストへ一括変換し、
+    出力は事前確保した型付き配列へ格納する。DataFrameは最後に一度だけ構築する。
+    """
+    num_frames = len(frame_nums)
+    out_frame_num = np.empty(num_frames, dtype=np.int64)
+    out_is_drowsy = np.empty(num_frames, dtype=np.int64)
+    out_left_closed = np.empty(num_frames, dtype=bool)
+    out_right_closed = np.empty(num_frames, dtype=bool)
+    out_continuous_time = np.empty(num_frames, dtype=np.float64)
+    out_error_code = np.empty(num_frames, dtype=object)
+    
+    update = detector.update
+    input_data = deps.drowsy_detection.InputData
+    inputs = zip(
+        np.asarray(frame_nums).astype(np.int64).tolist(),
+        np.asarray(left_eye_open, dtype=np.float64).tolist(),
+        np.asarray(right_eye_open, dtype=np.float64).tolist(),
+        np.asarray(face_confidence, dtype=np.float64).tolist()
+    )
+    for i, (frame_num, left_open, right_open, confidence) in enumerate(inputs):
+        output = update(input_data(
+            frame_num=frame_num,
+            left_eye_open=left_open,
+            right_eye_open=right_open,
+            face_confidence=confidence
+        ))
+        out_frame_num[i] = output.frame_num
+        out_is_drowsy[i] = output.is_drowsy
+        out_left_closed[i] = output.left_eye_closed
+        out_right_closed[i] = output.right_eye_closed
+        out_continuous_time[i] = output.continuous_time
+        out_error_code[i] = output.error_code or ''
+    
+    return pd.DataFrame({
+        'frame_num': out_frame_num,
+        'is_drowsy': out_is_drowsy,
+        'left_eye_closed': out_left_closed,
+        'right_eye_closed': out_right_closed,
+        'continuous_time': out_continuous_time,
+        'error_code': out_error_code
+    })
+
+
+def _run_reference_detector(frame_rate: float, columns: Tuple[np.ndarray, ...], config: Optional[drowsy_detection.Config] = None) -> pd.DataFrame:
+    """参照実装（DrowsyDetector.update の逐次呼び出し）で推論"""
+    detector = deps.drowsy_detection.DrowsyDetector(config if config is not None else deps.drowsy_detection.Config())
+    detector.set_frame_rate(frame_rate)
+    return _run_detector_columnar(detector, *columns)
+
+
+def _consecutive_counts(mask: np.ndarray) -> np.ndarray:
+    """各フレーム時点での mask の連続True数（Falseのフレームは0）"""
+    index = np.arange(len(mask))
+    last_false = np.where(mask, -1, index)
+    np.maximum.accumulate(last_false, out=last_false)
+    return np.where(mask, index - last_false, 0)
+
+
+def _replay_detector_batch(config: drowsy_detection.Config,
+                           frame_rate: float,
+                           frame_nums: np.ndarray,
+                           left_eye_open: np.ndarray,
+                           right_eye_open: np.ndarray,
+                           face_confidence: np.ndarray) -> Optional[pd.DataFrame]:
+    """DrowsyDetector の状態遷移を NumPy の累積演算で一括再現
+
+    - 顔検出信頼度が閾値未満のフレームは判定不能（閉眼なし、連続閉眼時間リセット、エラーコード付与）
+    - 両眼が閾値未満の閉眼フレームが連続した時間を continuous_time とし、閾値以上で is_drowsy
+    Config に必要な属性が無い場合は None を返す。エラーコード・比較演算子・リセット条件は実装に依存するため、
+    結果は _find_batch_replay_mismatch で参照実装と一致を確認した Config・アルゴリズムでのみ使用すること。
+    """
+    if not all(hasattr(config, field) for field in BATCH_REPLAY_CONFIG_FIELDS):
+        return None
+    
+    # 参照実装と同じく float64 で比較する
+    left_eye_open = np.asarray(left_eye_open, dtype=np.float64)
+    right_eye_open = np.asarray(right_eye_open, dtype=np.float64)
+    face_confidence = np.asarray(face_confidence, dtype=np.float64)
+    
+    valid = face_confidence >= config.face_conf_threshold
+    left_closed = valid & (left_eye_open < config.left_eye_close_threshold)
+    right_closed = valid & (right_eye_open < config.right_eye_close_threshold)
+    continuous_time = _consecutive_counts(left_closed & right_closed) / frame_rate
+    
+    return pd.DataFrame({
+        'frame_num': np.asarray(frame_nums).astype(np.int64),
+        'is_drowsy': (continuous_time >= config.continuous_close_time).astype(np.int64),
+        'left_eye_closed': left_closed,
+        'right_eye_closed': right_closed,
+        'continuous_time': continuous_time,
+        'error_code': np.where(valid, '', LOW_CONFIDENCE_ERROR_CODE).astype(object)
+    })
+
+
+def _get_replay_mode(replay_config: Dict[str, Any]) -> str:
+    """replay.mode の検証（照合なしのバッチ再生は使用できない）"""
+    mode = str(replay_config.get('mode', 'reference')).lower()
+    if mode == 'batch':
+        raise ValueError("replay.mode: batch は使用できません（照合なしのバッチ再生出力は保存・登録しません）。"
+                         "バッチ再生は replay.mode: verify で参照実装との一致を確認した場合に使用します")
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"replay.mode が不正です: {mode} ({' / '.join(REPLAY_MODES)})")
+    return mode
+
+
+def _first_mismatch(expected: pd.DataFrame, actual: pd.DataFrame) -> Optional[int]:
+    """2つのアルゴリズム出力で最初に一致しない行番号（一致する場合は None）"""
+    if len(expected) != len(actual):
+        return min(len(expected), len(actual))
+    differs = np.zeros(len(expected), dtype=bool)
+    for column in expected.columns:
+        differs |= expected[column].to_numpy() != actual[column].to_numpy()
+    mismatched = np.flatnonzero(differs)
+    return int(mismatched[0]) if len(mismatched) else None
+
+
+def _probe_columns(left, right, confidence) -> Tuple[np.ndarray, ...]:
+    """左右の開眼度・顔検出信頼度の系列から、フレーム番号を1からの連番とした列配列を作成"""
+    left = np.asarray(left, dtype=np.float64)
+    return (
+        np.arange(1, len(left) + 1, dtype=np.int64),
+        left,
+        np.asarray(right, dtype=np.float64),
+        np.asarray(confidence, dtype=np.float64),
+    )
+
+
+def _replay_probe_sequences(config: drowsy_detection.Config, frame_rate: float) -> Dict[str, Tuple[np.ndarray, ...]]:
+    """バッチ再生の照合用に、閾値・リセット条件の境界を突く入力系列（名前 -> 列配列）を生成
+
+    閾値ちょうど・前後の値、低信頼度フレームによる中断、片目のみの閉眼、continuous_close_time をまたぐ閉眼区間など、
+    比較演算子（< / >=）・エラーコード・リセット条件の取り違えで差が出る系列をビデオの内容によらず検証する。
+    """
+    eye = config.left_eye_close_threshold
+    right_eye = config.right_eye_close_threshold
+    face = config.face_conf_threshold
+    face_below, face_above = np.nextafter(face, -np.inf), np.nextafter(face, np.inf)
+    closed, opened = min(eye, right_eye) / 2, max(eye, right_eye) * 2
+    needed = max(1, math.ceil(config.continuous_close_time * frame_rate))
+    sequences = {}
+    
+    # 閾値ちょうど・前後の値（単精度から拡張した値を含む）
+    left_values = [eye, np.nextafter(eye, -np.inf), np.nextafter(eye, np.inf), float(np.float32(eye)), closed, opened]
+    right_values = [right_eye, np.nextafter(right_eye, -np.inf), np.nextafter(right_eye, np.inf),
+                    float(np.float32(right_eye)), closed, opened]
+    left = [a for a in left_values for _ in right_values] * 4
+    right = [b for _ in left_values for b in right_values] * 4
+    sequences['exact_eye_threshold'] = _probe_columns(left, right, [1.0] * len(left))
+    
+    confidences = [face, face_below, face_above, float(np.float32(face)), 0.0, 1.0]
+    conf = [c for c in confidences for _ in range(needed + 2)]
+    sequences['exact_face_threshold'] = _probe_columns([closed] * len(conf), [closed] * len(conf), conf)
+    
+    # 閉眼区間の途中に低信頼度フレームを挟む（リセットされるか）
+    gap_conf = [1.0] * (needed - 1) + [face_below] + [1.0] * (needed + 1) + [0.0] * 3 + [1.0] * (needed * 2)
+    sequences['low_confidence_gap'] = _probe_columns([closed] * len(gap_conf), [closed] * len(gap_conf), gap_conf)
+    
+    # 片目のみ閉眼のフレームで区間が途切れる
+    one_eye = [closed] * (needed + 1) + [opened] + [closed] * (needed + 1)
+    sequences['one_eye_open'] = _probe_columns([closed] * len(one_eye), one_eye, [1.0] * len(one_eye))
+    
+    # continuous_close_time をまたぐ閉眼区間（必要フレーム数の前後）
+    left = []
+    for length in (needed - 1, needed, needed + 1, 2 * needed):
+        left += [closed] * length + [opened] * 3
+    sequences['straddle_close_time'] = _probe_columns(left, left, [1.0] * len(left))
+    return sequences
+
+
+def _find_batch_replay_mismatch(config: drowsy_detection.Config, frame_rate: float,
+                                samples: Optional[Dict[str, Tuple[np.ndarray, ...]]] = None) -> Optional[str]:
+    """境界値の検証系列（_replay_probe_sequences）と samples（名前 -> 列配列）でバッチ再生を参照実装と全フレーム照合
+
+    全系列が一致する場合は None、それ以外は最初の不一致の内容を返す。
+    """
+    if not all(hasattr(config, field) for field in BATCH_REPLAY_CONFIG_FIELDS):
+        return f"Config に {', '.join(BATCH_REPLAY_CONFIG_FIELDS)} が必要です"
+    for name, columns in {**_replay_probe_sequences(config, frame_rate), **(samples or {})}.items():
+        reference_df = _run_reference_detector(frame_rate, columns, config)
+        mismatch = _first_mismatch(reference_df, _replay_detector_batch(config, frame_rate, *columns))
+        if mismatch is not None:
+            return f"{name} の{mismatch}行目 (frame={reference_df['frame_num'].iloc[min(mismatch, len(reference_df) - 1)]})"
+    return None
+
+
+def _run_reference_chunked(frame_rate: float, columns: Tuple[np.ndarray, ...], config: drowsy_detection.Config,
+                           settings: Dict[str, Any], executor: Executor) -> Tuple[pd.DataFrame, str]:
+    """長いビデオを chunk_frames ごとに分割して参照実装で並列推論し、連結した出力と推論方式を返す
+
+    各チャンクは直前 chunk_warmup_frames フレームから推論を始め、ウォームアップ部分の出力は破棄する。
+    ウォームアップ末尾フレームの出力が前のチャンクの出力と一致しない（検出器の状態が揃っていない）場合は
+    逐次推論の出力を使用する（推論方式 'chunk_fallback'）。
+    chunk_verify 時は全フレームを逐次推論と照合し、一致すれば 'chunked'、不一致なら 'chunk_fallback' として逐次推論の出力を使用する。
+    """
+    num_frames = len(columns[0])
+    chunk_frames = settings['chunk_frames']
+    warmup_frames = settings['chunk_warmup_frames']
+    
+    jobs = []
+    for start in range(0, num_frames, chunk_frames):
+        begin = max(0, start - warmup_frames)
+        stop = min(num_frames, start + chunk_frames)
+        chunk_columns = tuple(np.asarray(column[begin:stop]) for column in columns)
+        jobs.append((start, begin, executor.submit(_run_reference_detector, frame_rate, chunk_columns, config)))
+    
+    parts = []
+    converged = True
+    for start, begin, future in jobs:
+        chunk_df = future.result()
+        warmup = start - begin
+        if parts and _first_mismatch(parts[-1].iloc[-1:].reset_index(drop=True),
+                                     chunk_df.iloc[warmup - 1:warmup].reset_index(drop=True)) is not None:
+            converged = False
+            print(f"      チャンク境界で状態が一致しません (frame={columns[0][start]})、ウォームアップが不足しています")
+        parts.append(chunk_df.iloc[warmup:])
+    stitched = pd.concat(parts, ignore_index=True)
+    print(f"      チャンク分割推論: {len(jobs)}チャンク")
+    
+    if not converged:
+        return _run_reference_detector(frame_rate, columns, config), 'chunk_fallback'
+    if settings.get('chunk_verify'):
+        reference_df = _run_reference_detector(frame_rate, columns, config)
+        mismatch = _first_mismatch(reference_df, stitched)
+        if mismatch is not None:
+            print(f"      チャンク分割推論不一致: {mismatch}行目 (frame={reference_df['frame_num'].iloc[min(mismatch, len(reference_df) - 1)]})")
+            return reference_df, 'chunk_fallback'
+        print(f"      チャンク分割推論照合: 逐次推論と一致 ({len(reference_df)}フレーム)")
+        return reference_df, 'chunked'
+    return stitched, 'chunked'
+
+
+def _run_detector(df: pd.DataFrame, settings: Dict[str, Any], config_overrides: Optional[Dict[str, Any]] = None,
+                  chunk_executor: Optional[Executor] = None) -> Tuple[pd.DataFrame, str]:
+    """設定された再生モードで推論し、(アルゴリズム出力, 推論方式) を返す
+
+    config_overrides を指定した場合は Config の該当属性を上書きして推論する（パラメータスイープ用）。
+    chunk_executor を指定した場合、参照実装で chunk_frames を超えるビデオはチャンクに分割して並列推論する。
+
+    replay_mode:
+      - reference: DrowsyDetector.update を逐次呼び出す（従来どおり）
+      - verify: settings['batch_replay'] が真（実行前の照合で、この Config・アルゴリズムのバッチ再生が
+        参照実装と一致済み）の場合はバッチ再生の出力を使用（推論方式 'batch'）。
+        照合で不一致だった場合は参照実装で推論する（推論方式 'fallback'）
+    df はコアCSVのDataFrame、または入力ストアの列名 -> 配列の辞書。
+    """
+    columns = _detector_columns(df)
+    frame_rate = settings['frame_rate']
+    mode = settings['replay_mode']
+    
+    if mode == 'verify' and settings.get('batch_replay'):
+        batch_df = _replay_detector_batch(_make_detector_config(config_overrides), frame_rate, *columns)
+        if batch_df is not None:
+            return batch_df, 'batch'
+    
+    if chunk_executor is not None and len(columns[0]) > settings['chunk_frames']:
+        return _run_reference_chunked(frame_rate, columns, _make_detector_config(config_overrides), settings, chunk_executor)
+    algo_df = _run_reference_detector(frame_rate, columns, _make_detector_config(config_overrides))
+    return algo_df, 'fallback' if mode == 'verify' else 'reference'
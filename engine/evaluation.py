@@ -0,0 +1,194 @@
+"""
+タグ区間・全フレームの評価
+
+タグ区間ごとの正誤判定、全フレームの真値マスクによる誤検知・イベント単位の評価と検知遅延、
+ビデオ別結果・全体結果の集計。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from engine.deps import np
+
+
+def _count_drowsy_frames_in_intervals(frame_nums: np.ndarray,
+                                      is_drowsy: np.ndarray,
+                                      starts: List[int],
+                                      ends: List[int]) -> np.ndarray:
+    """各区間 [start, end]（両端含む）内で is_drowsy となるフレーム数を返す
+
+    フレーム番号順に並べた is_drowsy の累積和を作り、全区間の境界を
+    searchsorted で一括解決するため、計算量は O((frames + tags) log frames)。
+    """
+    order = np.argsort(frame_nums, kind='stable')
+    sorted_frames = frame_nums[order]
+    cumulative = np.zeros(len(sorted_frames) + 1, dtype=np.int64)
+    np.cumsum(is_drowsy[order], out=cumulative[1:])
+    
+    lower = np.searchsorted(sorted_frames, np.asarray(starts), side='left')
+    upper = np.searchsorted(sorted_frames, np.asarray(ends), side='right')
+    # start > end の区間は該当フレームなし
+    return np.maximum(cumulative[upper] - cumulative[lower], 0)
+
+
+def _evaluate_tags(video_id: Any, frame_nums: np.ndarray, is_drowsy: np.ndarray, tags: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """タグ区間ごとの正誤判定（{video_id}.csv の各行）"""
+    # 全タグ区間内のis_drowsyを累積和で一括集計
+    drowsy_counts = _count_drowsy_frames_in_intervals(
+        frame_nums,
+        is_drowsy,
+        [tag['start'] for tag in tags],
+        [tag['end'] for tag in tags]
+    )
+    
+    video_tasks = []
+    for tag, drowsy_frames in zip(tags, drowsy_counts.tolist()):
+        task_id = f"{video_id}_{tag['tag_ID']}"
+        start_frame = tag['start']
+        end_frame = tag['end']
+        
+        predicted = 1 if drowsy_frames > 0 else 0
+        ground_truth = 1  # 仕様書に基づき、全タグ区間が「連続閉眼あり」
+        correct = int(predicted == ground_truth)
+        
+        video_tasks.append({
+            'task_id': task_id,
+            'predicted': predicted,
+            'ground_truth': ground_truth,
+            'correct': correct,
+            'notes': f"frames {start_frame}-{end_frame}, drowsy_frames={drowsy_frames}"
+        })
+    return video_tasks
+
+
+def _evaluate_timeline(frame_nums: np.ndarray, is_drowsy: np.ndarray, tags: List[Dict[str, Any]],
+                       frame_rate: float) -> Dict[str, Any]:
+    """全フレームの真値マスクと is_drowsy を比較し、誤検知・イベント単位の評価・検知遅延を算出
+
+    真値マスクは全タグ区間 [start, end] の境界を searchsorted で位置に変換し、差分配列の累積和で一度に塗る。
+    アラームイベントは is_drowsy が連続するフレーム列とし、どのタグ区間とも重ならないものを誤検知イベントとする。
+    検知遅延はタグ区間内で最初に is_drowsy となったフレームのタグ開始からの時間（秒）。
+    """
+    order = np.argsort(frame_nums, kind='stable')
+    sorted_frames = np.asarray(frame_nums)[order]
+    drowsy = np.asarray(is_drowsy, dtype=bool)[order]
+    num_frames = len(sorted_frames)
+    starts = np.asarray([tag['start'] for tag in tags], dtype=np.int64)
+    lower = np.searchsorted(sorted_frames, starts, side='left')
+    upper = np.maximum(np.searchsorted(sorted_frames, np.asarray([tag['end'] for tag in tags], dtype=np.int64), side='right'), lower)
+    
+    # 真値マスク（区間の開始位置に +1、終了位置の次に -1 を加えた差分配列の累積和が正のフレーム）
+    boundaries = np.zeros(num_frames + 1, dtype=np.int64)
+    np.add.at(boundaries, lower, 1)
+    np.add.at(boundaries, upper, -1)
+    ground_truth = np.cumsum(boundaries[:-1]) > 0
+    
+    # アラームイベント（is_drowsy の連続区間 [開始, 終了)）とタグ区間内のフレーム数
+    edges = np.diff(drowsy.astype(np.int8), prepend=0, append=0)
+    event_starts = np.flatnonzero(edges == 1)
+    event_ends = np.flatnonzero(edges == -1)
+    hits = np.zeros(num_frames + 1, dtype=np.int64)
+    np.cumsum(drowsy & ground_truth, out=hits[1:])
+    false_positive_events = int(np.count_nonzero(hits[event_ends] == hits[event_starts]))
+    
+    # タグ区間内の最初の検出フレーム（is_drowsy の累積和が区間開始時点から1増える位置）
+    cumulative = np.zeros(num_frames + 1, dtype=np.int64)
+    np.cumsum(drowsy, out=cumulative[1:])
+    detected = cumulative[upper] > cumulative[lower]
+    first = np.searchsorted(cumulative, cumulative[lower[detected]] + 1, side='left') - 1
+    latencies = (sorted_frames[first] - starts[detected]) / frame_rate
+    
+    ground_truth_frames = int(np.count_nonzero(ground_truth))
+    return {
+        'num_frames': num_frames,
+        'duration_seconds': num_frames / frame_rate,
+        'ground_truth_frames': ground_truth_frames,
+        'false_positive_frames': int(np.count_nonzero(drowsy & ~ground_truth)),
+        'alarm_events': len(event_starts),
+        'false_positive_events': false_positive_events,
+        'num_tags': len(tags),
+        'detected_tags': int(np.count_nonzero(detected)),
+        'mean_alarm_latency_seconds': float(latencies.mean()) if len(latencies) else None,
+        'max_alarm_latency_seconds': float(latencies.max()) if len(latencies) else None,
+    }
+
+
+def _timeline_rates(timeline: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """全フレーム評価の件数から率を算出（分母が0の場合は None）"""
+    negative_frames = timeline['num_frames'] - timeline['ground_truth_frames']
+    alarm_events = timeline['alarm_events']
+    hours = timeline['duration_seconds'] / 3600
+    return {
+        'false_positive_rate': timeline['false_positive_frames'] / negative_frames if negative_frames else None,
+        'false_positive_events_per_hour': timeline['false_positive_events'] / hours if hours else None,
+        'event_precision': (alarm_events - timeline['false_positive_events']) / alarm_events if alarm_events else None,
+        'event_recall': timeline['detected_tags'] / timeline['num_tags'] if timeline['num_tags'] else None,
+    }
+
+
+def _overall_timeline(per_video_results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """ビデオ別の全フレーム評価を合算（全フレーム評価の無いビデオは除き、対象ビデオ数を num_videos に記録）"""
+    timelines = [result['timeline'] for result in per_video_results if result.get('timeline')]
+    if not timelines:
+        return None
+    overall = {'num_videos': len(timelines)}
+    for key in ('num_frames', 'duration_seconds', 'ground_truth_frames', 'false_positive_frames',
+                'alarm_events', 'false_positive_events', 'num_tags', 'detected_tags'):
+        overall[key] = sum(timeline[key] for timeline in timelines)
+    # 平均検知遅延は検出タグ数で重み付け
+    detected = [timeline for timeline in timelines if timeline['mean_alarm_latency_seconds'] is not None]
+    num_detected = sum(timeline['detected_tags'] for timeline in detected)
+    overall['mean_alarm_latency_seconds'] = (
+        sum(timeline['mean_alarm_latency_seconds'] * timeline['detected_tags'] for timeline in detected) / num_detected
+        if num_detected else None
+    )
+    overall['max_alarm_latency_seconds'] = max((timeline['max_alarm_latency_seconds'] for timeline in detected), default=None)
+    overall.update(_timeline_rates(overall))
+    return overall
+
+
+def _summarize_video_tasks(video_id: Any, video_tasks: List[Dict[str, Any]],
+                           timeline: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """タスク結果からビデオ別結果（per_dataset の要素）を作成（タスクが無い場合は None）
+
+    timeline（_evaluate_timeline の結果）を指定した場合は率を加えて 'timeline' として含める。
+    """
+    if not video_tasks:
+        return None
+    video_correct = sum(task['correct'] for task in video_tasks)
+    video_result = {
+        'video_id': video_id,
+        'accuracy': video_correct / len(video_tasks),
+        'num_correct': video_correct,
+        'num_tasks': len(video_tasks),
+        'result_file_path': f"{video_id}.csv"
+    }
+    if timeline is not None:
+        video_result['timeline'] = {**timeline, **_timeline_rates(timeline)}
+    return video_result
+
+
+def _overall_results(per_video_results: List[Dict[str, Any]],
+                     untagged_videos: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """ビデオ別結果から全体結果（overall_results）を集計（全フレーム評価はタグの無いビデオも合算）"""
+    total_correct = sum(result['num_correct'] for result in per_video_results)
+    total_tasks = sum(result['num_tasks'] for result in per_video_results)
+    overall = {
+        'accuracy': total_correct / total_tasks if total_tasks > 0 else 0.0,
+        'total_num_correct': total_correct,
+        'total_num_tasks': total_tasks
+    }
+    timeline = _overall_timeline(per_video_results + list(untagged_videos or []))
+    if timeline:
+        overall['timeline'] = timeline
+    return overall
+
+
+def _untagged_timelines(video_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """タスク評価の無い（タグの無い）ビデオの全フレーム評価一覧（{video_id, timeline}）"""
+    return [
+        {'video_id': result['video_id'], 'timeline': result['timeline']}
+        for result in video_results
+        if not result.get('video_result') and result.get('timeline')
+    ]
@@ -0,0 +1,31 @@
+"""
+内容ハッシュ
+
+推論キャッシュ・差分評価・チェックポイントでの入力・タグ・推論条件の同一性判定に使用する SHA-256。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def _hash_file(path: Path) -> str:
+    """ファイル内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_text(text: str) -> str:
+    """文字列のSHA-256"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _hash_tags(tags: Optional[List[Dict[str, Any]]]) -> str:
+    """タグ区間一覧のSHA-256（タグ変更の検出用）"""
+    return _hash_text(json.dumps(tags, sort_keys=True, default=str))
@@ -0,0 +1,138 @@
+"""
+差分評価
+
+前回実行から入力・タグ・推論条件が変わっていないビデオの結果を再利用する差分評価（--incremental）の
+マニフェスト（v{バージョン}/incremental_manifest.json）の読み書き。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from engine.deps import pd
+from engine.hashing import _hash_tags, _hash_text
+from engine.store import _find_core_csv, _hash_core_csv
+
+
+class IncrementalMixin:
+    """EvaluationEngine の差分評価
+
+    ビデオごとの入力・タグ・推論条件のハッシュと結果の所在をマニフェストに記録し、次回の実行で一致したビデオの
+    推論・評価を省略する。config / evaluation_dir / evaluation_output_dir 等の属性は EvaluationEngine が保持する。
+    """
+
+    def _get_incremental_manifest_path(self) -> Path:
+        """差分評価用マニフェストのパス（アルゴリズムバージョンごと）"""
+        return self.evaluation_dir / f"v{self.algorithm_version}" / "incremental_manifest.json"
+
+    def _load_incremental_manifest(self) -> Dict[str, Any]:
+        """差分評価用マニフェストの読み込み（存在しない・破損時は空）"""
+        manifest_path = self._get_incremental_manifest_path()
+        if not manifest_path.exists():
+            return {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('videos', {})
+        except Exception as e:
+            print(f"  差分評価マニフェスト読み込みエラー: {e}")
+            return {}
+
+    def _collect_reusable_results(self, core_outputs: List[Dict[str, Any]], video_tags: Dict[Any, List[Dict[str, Any]]]) -> Dict[Any, Dict[str, Any]]:
+        """前回実行から入力・タグ・推論条件が変わっていないビデオの集計結果を復元
+
+        評価CSVは今回の評価ディレクトリへコピーし、アルゴ出力は登録済みの algorithm_output_id を再利用する。
+        戻り値は core_lib_output_ID -> ビデオ単位の集計結果（_evaluate_video と同形式）。
+        """
+        manifest = self._load_incremental_manifest()
+        if not manifest:
+            return {}
+        
+        conditions_hash = _hash_text(self._inference_conditions())
+        reused = {}
+        for core_output in core_outputs:
+            entry = manifest.get(str(core_output['core_lib_output_ID']))
+            if not entry or entry.get('conditions_hash') != conditions_hash:
+                continue
+            video_id = core_output['video_ID']
+            if entry.get('tags_hash') != _hash_tags(video_tags.get(video_id)):
+                continue
+            core_csv_path = _find_core_csv(self.db_path, core_output)
+            if core_csv_path is None or entry.get('input_hash') != _hash_core_csv(core_csv_path, self.core_input_store):
+                continue
+            if not Path(entry['algo_csv_path']).exists():
+                continue
+            
+            # 全フレーム評価の無い（旧形式の）結果は再評価
+            if 'timeline' not in entry:
+                continue
+            evaluation_result = []
+            if entry.get('video_result'):
+                previous_csv = Path(entry['evaluation_csv_path'])
+                if not previous_csv.exists():
+                    continue
+                csv_path = self.evaluation_output_dir / f"{video_id}.csv"
+                # 同じ run_id（--run-id の再指定）では評価CSVが既に今回の評価ディレクトリにある
+                if previous_csv.resolve() != csv_path.resolve():
+                    shutil.copyfile(previous_csv, csv_path)
+                evaluation_result = self._retain_report_tasks(pd.read_csv(
+                    csv_path, dtype={'task_id': str, 'notes': str}, keep_default_na=False
+                ).to_dict('records'))
+            
+            reused[core_output['core_lib_output_ID']] = {
+                'video_id': video_id,
+                'core_lib_output_id': core_output['core_lib_output_ID'],
+                'algorithm_output_id': entry['algorithm_output_id'],
+                'algo_csv_path': Path(entry['algo_csv_path']),
+                'input_hash': entry['input_hash'],
+                'tags_hash': entry['tags_hash'],
+                'total_frames': entry['total_frames'],
+                'drowsy_frames': entry['drowsy_frames'],
+                'video_result': entry.get('video_result'),
+                'timeline': entry.get('timeline'),
+                'evaluation_result': evaluation_result
+            }
+        return reused
+
+    def _update_incremental_manifest(self, video_results: List[Dict[str, Any]]):
+        """今回の各ビデオの入力・タグハッシュと結果の所在をマニフェストに記録"""
+        manifest = self._load_incremental_manifest()
+        conditions_hash = _hash_text(self._inference_conditions())
+        for result in video_results:
+            if result.get('algorithm_output_id') is None or not result.get('input_hash'):
+                continue
+            evaluation_csv_path = None
+            if result['video_result']:
+                evaluation_csv_path = str((self.evaluation_output_dir / result['video_result']['result_file_path']).resolve())
+            manifest[str(result['core_lib_output_id'])] = {
+                'video_id': result['video_id'],
+                'input_hash': result['input_hash'],
+                'tags_hash': result['tags_hash'],
+                'conditions_hash': conditions_hash,
+                'algorithm_output_id': result['algorithm_output_id'],
+                'algo_csv_path': str(Path(result['algo_csv_path']).resolve()),
+                'evaluation_csv_path': evaluation_csv_path,
+                'total_frames': result['total_frames'],
+                'drowsy_frames': result['drowsy_frames'],
+                'video_result': result['video_result'],
+                'timeline': result.get('timeline'),
+                'run_id': self.run_id
+            }
+        
+        manifest_path = self._get_incremental_manifest_path()
+        try:
+            tmp_path = manifest_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'algorithm_version': self.algorithm_version,
+                    'algorithm_commit_hash': self.algorithm_commit_hash,
+                    'updated_at': datetime.now().isoformat(),
+                    'videos': manifest
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, manifest_path)
+        except Exception as e:
+            print(f"[{self.run_id}] 差分評価マニフェスト更新エラー: {e}")
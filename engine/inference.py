@@ -0,0 +1,151 @@
+"""
+ビデオ単位の推論
+
+単一ビデオの推論とアルゴ出力保存（ワーカープロセスからも呼び出す _infer_single_video）と、
+先行投入数を制限した入力順のワーカー投入（_iter_bounded）。
+"""
+
+from __future__ import annotations
+
+import cProfile
+from collections import deque
+from concurrent.futures import Executor, Future, wait
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from engine.cache import InferenceCache, _save_algo_output, _store_inference_cache
+from engine.detector import _run_detector
+from engine.metrics import _timed
+from engine.store import _find_core_csv, _hash_core_csv, _load_core_inputs
+from engine.writer import ALGO_OUTPUT_SUFFIXES, AsyncOutputWriter, _write_algo_output
+
+
+def _infer_single_video(core_output: Dict[str, Any], settings: Dict[str, Any],
+                        writer: Optional[AsyncOutputWriter] = None,
+                        chunk_executor: Optional[Executor] = None) -> Optional[Dict[str, Any]]:
+    """単一ビデオの推論とアルゴ出力保存
+
+    ワーカープロセスからも呼び出せるようにモジュールレベルで定義し、
+    DrowsyDetectorは呼び出しごとに生成する。DataWareHouseへの書き込みは行わない。
+    settings は EvaluationEngine._get_worker_settings() の戻り値。
+    writer を指定した場合（親プロセスでの直列実行時）はアルゴ出力の保存を非同期ライタへ委ねる。
+    chunk_executor を指定した場合（チャンク分割推論時）は長いビデオをチャンクに分割してワーカーで推論する。
+    """
+    video_id = core_output['video_ID']
+    core_lib_output_id = core_output['core_lib_output_ID']
+    
+    print(f"    ビデオID={video_id} 処理中...")
+    
+    # コアCSVファイルの読み込み
+    core_csv_path = _find_core_csv(settings['db_path'], core_output)
+    if core_csv_path is None:
+        return None
+    output_format = settings.get('output_format', 'csv')
+    algo_csv_path = Path(settings['run_output_dir']) / f"{video_id}{ALGO_OUTPUT_SUFFIXES[output_format]}"
+    
+    try:
+        input_hash = _hash_core_csv(core_csv_path, settings.get('core_input_store'))
+    except Exception as e:
+        print(f"      コアCSV読み込みエラー: {e}")
+        return None
+    
+    # ビデオ別の処理時間・フレーム数・読み込み量（RunMetrics.add_video へ渡す）
+    metrics: Dict[str, Any] = {}
+    
+    # 推論キャッシュの確認（ヒット時は推論をスキップ）
+    cache: Optional[InferenceCache] = settings.get('inference_cache')
+    cache_key = None
+    if cache:
+        try:
+            cache_key = cache.make_key(input_hash)
+            with _timed(metrics, 'read'):
+                algo_df = cache.restore(cache_key, algo_csv_path)
+            if algo_df is not None:
+                print(f"      推論キャッシュヒット: {len(algo_df)}フレーム")
+                metrics.update(frames=len(algo_df), bytes_read=algo_csv_path.stat().st_size, cache_hit=True)
+                return {
+                    'video_id': video_id,
+                    'core_lib_output_id': core_lib_output_id,
+                    'algo_csv_path': algo_csv_path,
+                    'algo_df': algo_df,
+                    'input_hash': input_hash,
+                    'cache_hit': True,
+                    'metrics': metrics
+                }
+        except Exception as e:
+            print(f"      推論キャッシュ参照エラー: {e}")
+            cache_key = None
+    
+    try:
+        with _timed(metrics, 'read'):
+            df = _load_core_inputs(core_csv_path, settings, input_hash)
+        print(f"      コアCSV読み込み: {len(df['frame'])}行")
+    except Exception as e:
+        print(f"      コアCSV読み込みエラー: {e}")
+        return None
+    if isinstance(df, dict):
+        metrics['bytes_read'] = sum(column.nbytes for column in df.values())
+    else:
+        metrics['bytes_read'] = core_csv_path.stat().st_size
+    
+    # アルゴリズム実行（--profile 時は cProfile で計測してビデオ別に保存）
+    profiler = cProfile.Profile() if settings.get('profile_dir') else None
+    try:
+        with _timed(metrics, 'detector'):
+            if profiler:
+                profiler.enable()
+            try:
+                algo_df, replay = _run_detector(df, settings, chunk_executor=chunk_executor)
+            finally:
+                if profiler:
+                    profiler.disable()
+        print(f"      アルゴリズム実行完了: {len(algo_df)}フレーム")
+        
+    except Exception as e:
+        print(f"      アルゴリズム実行エラー: {e}")
+        return None
+    if profiler:
+        profiler.dump_stats(str(Path(settings['profile_dir']) / f"{video_id}.prof"))
+    metrics.update(frames=len(algo_df), cache_hit=False if cache else None, replay=replay)
+    
+    # アルゴ出力の保存（非同期時の書き込み時間は非同期書き込みステージに計上）
+    if writer:
+        writer.submit(f"アルゴ出力 {algo_csv_path}", _save_algo_output, algo_df, algo_csv_path, output_format, cache, cache_key)
+        print(f"      アルゴ出力保存（非同期）: {algo_csv_path}")
+    else:
+        try:
+            with _timed(metrics, 'write'):
+                _write_algo_output(algo_df, algo_csv_path, output_format)
+            print(f"      アルゴ出力保存: {algo_csv_path}")
+        except Exception as e:
+            print(f"      アルゴ出力保存エラー: {e}")
+            return None
+        _store_inference_cache(cache, cache_key, algo_csv_path)
+    
+    return {
+        'video_id': video_id,
+        'core_lib_output_id': core_lib_output_id,
+        'algo_csv_path': algo_csv_path,
+        'algo_df': algo_df,
+        'input_hash': input_hash,
+        'cache_hit': False if cache else None,
+        'replay': replay,
+        'metrics': metrics
+    }
+
+
+def _iter_bounded(executor: Executor, func, items: List[Any], args: Tuple[Any, ...], window: int) -> Iterator[Tuple[Any, Future]]:
+    """items を func(item, *args) として投入し、(item, 完了済みFuture) を入力順に返す
+
+    先行投入数を window までに制限し、呼び出し側の処理中もワーカーが空かないよう
+    Futureを返す前に次の項目を投入する。
+    """
+    remaining = iter(items)
+    pending = deque((item, executor.submit(func, item, *args)) for item in islice(remaining, window))
+    while pending:
+        item, future = pending.popleft()
+        wait([future])
+        for next_item in islice(remaining, 1):
+            pending.append((next_item, executor.submit(func, next_item, *args)))
+        yield item, future
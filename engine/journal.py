@@ -0,0 +1,187 @@
+"""
+チェックポイントと中断した実行の再開
+
+ビデオごとの完了・登録IDを追記するジャーナル（CheckpointJournal）と、EvaluationEngine の
+チェックポイント記録・再開処理（checkpoint.enabled: true で実行した run_id のみ再開可能）。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from engine.algorithm import _get_installed_commit_hash
+from engine.deps import pd
+from engine.hashing import _hash_tags, _hash_text
+
+
+class CheckpointJournal:
+    """実行の進捗（完了したビデオ・登録したID）を記録する追記型ジャーナル（JSON Lines）
+
+    レコードは1行ずつ追記して fsync する。中断時に書きかけだった末尾行は読み込み時に切り詰める。
+    """
+
+    FILE_NAME = "checkpoint.jsonl"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(self, record_type: str, **fields):
+        """レコードを1件追記"""
+        line = json.dumps({'type': record_type, 'recorded_at': datetime.now().isoformat(), **fields},
+                          ensure_ascii=False, default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self) -> Dict[str, Any]:
+        """ジャーナルを読み込み、実行情報・完了済みビデオ・登録済みIDに集約"""
+        state = {'run': None, 'videos': {}, 'algorithm_output_ids': {}, 'evaluation': None, 'completed': False}
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        complete_size = data.rfind(b"\n") + 1
+        if complete_size < len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete_size)
+        
+        for line in data[:complete_size].decode('utf-8').splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            record_type = record.get('type')
+            if record_type == 'run':
+                state['run'] = record
+            elif record_type == 'video':
+                state['videos'][str(record['core_lib_output_id'])] = record
+            elif record_type == 'algorithm_outputs':
+                state['algorithm_output_ids'].update(record['ids'])
+            elif record_type == 'evaluation':
+                state['evaluation'] = record
+            elif record_type == 'completed':
+                state['completed'] = True
+        return state
+
+
+class CheckpointMixin:
+    """EvaluationEngine のチェックポイント記録と再開
+
+    新規実行は実行情報とビデオごとの集計結果をジャーナルへ追記し、再開時は記録済みのバージョン・推論条件に
+    固定して完了済みのビデオを復元する。config / run_id / resume_state / checkpoint 属性は EvaluationEngine が保持する。
+    """
+
+    def _resolve_resumed_version(self) -> str:
+        """再開時は中断した実行のバージョンに固定（インストール済みのコミットが異なる場合は再開しない）"""
+        run_record = self.resume_state['run']
+        installed_commit = _get_installed_commit_hash()
+        if installed_commit and installed_commit != run_record['algorithm_commit_hash']:
+            raise RuntimeError(
+                f"インストール済みの drowsy_detection (commit: {installed_commit[:8]}) が"
+                f"中断した実行 (commit: {run_record['algorithm_commit_hash'][:8]}) と異なるため再開できません"
+            )
+        self.algorithm_commit_hash = run_record['algorithm_commit_hash']
+        self.algorithm_version = run_record['algorithm_version']
+        self.algorithm_version_source = "再開（チェックポイント）"
+        print(f"[{self.run_id}] バージョン確定: {self.algorithm_version} ({self.algorithm_version_source})")
+        return self.algorithm_commit_hash
+
+    def _load_resume_state(self, run_id: str) -> Dict[str, Any]:
+        """再開対象の run_id のチェックポイントジャーナルを探して読み込む"""
+        journal_paths = sorted(self.output_base_dir.glob(f"v*/{run_id}/{self._shard_artifact(CheckpointJournal.FILE_NAME)}"))
+        if not journal_paths:
+            raise FileNotFoundError(f"再開対象のチェックポイントが見つかりません: run_id={run_id} ({self.output_base_dir})。"
+                                    f"再開には checkpoint.enabled: true で実行しておく必要があります")
+        if len(journal_paths) > 1:
+            raise ValueError(f"run_id={run_id} のチェックポイントが複数あります: {[str(path) for path in journal_paths]}")
+        state = CheckpointJournal(journal_paths[0]).load()
+        if not state['run']:
+            raise ValueError(f"チェックポイントに実行情報がありません: {journal_paths[0]}")
+        print(f"[{run_id}] チェックポイント読み込み: 完了済み {len(state['videos'])}件 ({journal_paths[0]})")
+        return state
+
+    def _open_checkpoint(self):
+        """チェックポイントジャーナルを開く（新規実行は実行情報を記録、再開時は推論条件の一致を確認）"""
+        if not (self.config.get('checkpoint') or {}).get('enabled', False):
+            if self.resume_state:
+                raise ValueError("checkpoint.enabled が偽のため再開できません（checkpoint.enabled: true で実行した run_id のみ再開可能）")
+            return
+        
+        run_record = {
+            'algorithm_version': self.algorithm_version,
+            'algorithm_commit_hash': self.algorithm_commit_hash,
+            'conditions_hash': _hash_text(self._inference_conditions()),
+            'output_format': self._get_output_format(),
+        }
+        self.checkpoint = CheckpointJournal(self.run_output_dir / self._shard_artifact(CheckpointJournal.FILE_NAME))
+        if self.resume_state is None:
+            self.checkpoint.append('run', run_id=self.run_id, **run_record)
+            return
+        
+        previous = self.resume_state['run']
+        changed = [key for key, value in run_record.items() if previous.get(key) != value]
+        if changed:
+            raise ValueError(f"推論条件が中断した実行と異なるため再開できません（{', '.join(changed)}）")
+
+    def _checkpoint_video(self, aggregate: Dict[str, Any]):
+        """ビデオの完了をチェックポイントへ記録
+
+        非同期ライタ使用時はキュー経由とし、先に投入したアルゴ出力・評価CSVの書き込み後に記録する。
+        """
+        if not self.checkpoint:
+            return
+        record = {key: value for key, value in aggregate.items() if key != 'evaluation_result'}
+        record['algo_csv_path'] = str(Path(aggregate['algo_csv_path']).resolve())
+        self._write_output(f"チェックポイント ビデオID={aggregate['video_id']}", self._append_checkpoint_video, record)
+
+    def _append_checkpoint_video(self, record: Dict[str, Any]):
+        # 先行する書き込みが失敗している場合は記録しない（再開時に再処理させる）
+        if self.output_writer and self.output_writer.has_errors:
+            return
+        self.checkpoint.append('video', **record)
+
+    def _collect_resumed_results(self, core_outputs: List[Dict[str, Any]], video_tags: Dict[Any, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """中断した実行で完了済みのビデオの集計結果をチェックポイントから復元
+
+        アルゴ出力・評価CSVが残っており、タグが変わっていないビデオのみ対象とし、それ以外は再処理する。
+        """
+        completed = self.resume_state['videos']
+        resumed = []
+        for core_output in core_outputs:
+            record = completed.get(str(core_output['core_lib_output_ID']))
+            if not record or not Path(record['algo_csv_path']).exists():
+                continue
+            video_id = core_output['video_ID']
+            if record.get('tags_hash') != _hash_tags(video_tags.get(video_id)):
+                continue
+            # 全フレーム評価の無い（旧形式の）記録は再処理
+            if 'timeline' not in record:
+                continue
+            
+            evaluation_result = []
+            if record.get('video_result'):
+                csv_path = self.evaluation_output_dir / record['video_result']['result_file_path']
+                if not csv_path.exists():
+                    continue
+                evaluation_result = self._retain_report_tasks(pd.read_csv(
+                    csv_path, dtype={'task_id': str, 'notes': str}, keep_default_na=False
+                ).to_dict('records'))
+            
+            resumed.append({
+                'video_id': video_id,
+                'core_lib_output_id': core_output['core_lib_output_ID'],
+                'algo_csv_path': Path(record['algo_csv_path']),
+                'input_hash': record['input_hash'],
+                'tags_hash': record['tags_hash'],
+                'total_frames': record['total_frames'],
+                'drowsy_frames': record['drowsy_frames'],
+                'video_result': record.get('video_result'),
+                'timeline': record.get('timeline'),
+                'evaluation_result': evaluation_result
+            })
+        return resumed
@@ -0,0 +1,175 @@
+"""
+実行メトリクス
+
+ステージ別・ビデオ別の処理時間の計測（_timed / RunMetrics）と、レポート用の処理時間セクションの生成。
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# 実行メトリクスのステージ名と表示名（video_* はビデオごとの処理時間の合計）
+METRIC_STAGE_LABELS = {
+    'config_load': '設定読み込み',
+    'list_core_lib_outputs': '対象データ取得',
+    'version_check': 'バージョン確認・更新',
+    'tag_fetch': 'タグ一括取得',
+    'replay_verification': 'バッチ再生照合',
+    'inference_loop': '推論・評価ループ',
+    'video_read': 'コア入力読み込み（ビデオ合計）',
+    'video_detector': '推論（ビデオ合計）',
+    'video_write': 'アルゴ出力保存（ビデオ合計）',
+    'video_evaluate': 'タグ区間評価（ビデオ合計）',
+    'async_write': '非同期書き込み',
+    'output_write_wait': '書き込み完了待ち',
+    'algo_output_registration': 'アルゴ出力DB登録',
+    'report_generation': 'サマリ・レポート生成',
+    'evaluation_registration': '評価結果DB登録',
+    'incremental_manifest': '差分評価マニフェスト更新',
+}
+
+
+@contextmanager
+def _timed(record: Dict[str, Any], name: str):
+    """処理の実時間と（呼び出しスレッドの）CPU時間を record の {name}_seconds / {name}_cpu_seconds に加算"""
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
+    try:
+        yield
+    finally:
+        record[f"{name}_seconds"] = record.get(f"{name}_seconds", 0.0) + time.perf_counter() - wall_started
+        record[f"{name}_cpu_seconds"] = record.get(f"{name}_cpu_seconds", 0.0) + time.thread_time() - cpu_started
+
+
+def _peak_rss_mb() -> Tuple[Optional[float], Optional[float]]:
+    """(親プロセス, 終了済みワーカープロセスの最大) のピークRSS [MB]。resource が無い環境では (None, None)"""
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    # ru_maxrss は Linux では KB、macOS では bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor
+    )
+
+
+class RunMetrics:
+    """実行メトリクスの収集
+
+    ステージ別の実時間・CPU時間と、ビデオ別の処理時間・フレーム数・読み込み量を記録する。
+    ステージは別スレッド（タグ一括取得等）からも記録できる。
+    """
+
+    def __init__(self):
+        self.started_wall = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.videos: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """with ブロックの処理時間をステージ name に加算"""
+        timing: Dict[str, float] = {}
+        try:
+            with _timed(timing, 'stage'):
+                yield
+        finally:
+            self.add_stage(name, timing['stage_seconds'], timing['stage_cpu_seconds'])
+
+    def add_stage(self, name: str, wall_seconds: float, cpu_seconds: float = 0.0, count: int = 1):
+        with self._lock:
+            stage = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'count': 0})
+            stage['wall_seconds'] += wall_seconds
+            stage['cpu_seconds'] += cpu_seconds
+            stage['count'] += count
+
+    def add_video(self, record: Dict[str, Any]):
+        """ビデオ別の計測結果（_infer_single_video の metrics ＋ 評価時間）を記録"""
+        detector_seconds = record.get('detector_seconds', 0.0)
+        record['frames_per_second'] = record.get('frames', 0) / detector_seconds if detector_seconds > 0 else None
+        with self._lock:
+            self.videos.append(record)
+
+    def summary(self, bytes_written: Optional[int] = None) -> Dict[str, Any]:
+        """metrics.json の内容（ビデオ別の処理時間は video_* ステージとして合計も含める）"""
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            videos = [dict(record) for record in self.videos]
+        
+        for key in ('read', 'detector', 'write', 'evaluate'):
+            records = [record for record in videos if f"{key}_seconds" in record]
+            if records:
+                stages[f"video_{key}"] = {
+                    'wall_seconds': sum(record[f"{key}_seconds"] for record in records),
+                    'cpu_seconds': sum(record[f"{key}_cpu_seconds"] for record in records),
+                    'count': len(records)
+                }
+        
+        frames = sum(record.get('frames', 0) for record in videos)
+        detector_seconds = sum(record.get('detector_seconds', 0.0) for record in videos)
+        loop_seconds = stages.get('inference_loop', {}).get('wall_seconds', 0.0)
+        parent_rss, worker_rss = _peak_rss_mb()
+        
+        cpu_seconds = {'parent': time.process_time() - self.started_cpu, 'workers': None}
+        try:
+            import resource
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu_seconds['workers'] = children.ru_utime + children.ru_stime
+        except ImportError:
+            pass
+        
+        return {
+            'created_at': datetime.now().isoformat(),
+            'elapsed_seconds': time.perf_counter() - self.started_wall,
+            'cpu_seconds': cpu_seconds,
+            'peak_rss_mb': {'parent': parent_rss, 'workers': worker_rss},
+            'stages': stages,
+            'throughput': {
+                'frames': frames,
+                'detector_frames_per_second': frames / detector_seconds if detector_seconds > 0 else 0.0,
+                'end_to_end_frames_per_second': frames / loop_seconds if loop_seconds > 0 else 0.0
+            },
+            'io': {
+                'bytes_read': sum(record.get('bytes_read', 0) for record in videos),
+                'bytes_written': bytes_written
+            },
+            'videos': videos
+        }
+
+
+def _format_metrics_lines(summary: Dict[str, Any], heading: str = "## ⏱️ 処理時間（レポート生成時点）") -> List[str]:
+    """レポート用の処理時間セクション（summary は RunMetrics.summary() / metrics.json の内容）"""
+    lines = [
+        heading,
+        "",
+        "| ステージ | 実時間 (秒) | CPU時間 (秒) | 回数 |",
+        "|---------|------------|-------------|------|",
+    ]
+    for name, stage in summary['stages'].items():
+        lines.append(
+            f"| {METRIC_STAGE_LABELS.get(name, name)} | {stage['wall_seconds']:.2f} | "
+            f"{stage['cpu_seconds']:.2f} | {stage['count']} |"
+        )
+    lines.append("")
+    throughput = summary['throughput']
+    lines.append(
+        f"- **推論スループット**: {throughput['detector_frames_per_second']:,.0f} frames/sec "
+        f"(推論・評価ループ全体: {throughput['end_to_end_frames_per_second']:,.0f} frames/sec, {throughput['frames']:,}フレーム)"
+    )
+    lines.append(f"- **入力読み込み量**: {summary['io']['bytes_read'] / 1024 / 1024:.1f} MB")
+    peak_rss = summary['peak_rss_mb']
+    if peak_rss['parent'] is not None:
+        lines.append(f"- **ピークRSS**: {peak_rss['parent']:.0f} MB (子プロセス最大 {peak_rss['workers']:.0f} MB)")
+    lines.append("")
+    lines.append("ビデオ別の内訳と評価結果DB登録を含む全ステージは `metrics.json` を参照。")
+    lines.append("")
+    return lines
@@ -0,0 +1,113 @@
+"""
+バッチ再生の照合
+
+replay.mode: verify 時に、バッチ再生（engine.detector._replay_detector_batch）を境界値の検証系列と
+先頭のビデオ（replay.verify_samples 件）で参照実装と全フレーム照合し、一致した Config・アルゴリズムの
+組み合わせでのみ残りのビデオをバッチ再生で推論する。照合結果は v{バージョン}/replay_verification.json に記録し、
+同じ組み合わせの以降の実行では照合を省略する。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from engine.algorithm import _get_loaded_algorithm_identity
+from engine.detector import (DEFAULT_REPLAY_VERIFY_SAMPLES, _describe_detector_config, _detector_columns,
+                             _find_batch_replay_mismatch, _make_detector_config)
+from engine.hashing import _hash_text
+from engine.store import _find_core_csv, _load_core_inputs
+
+
+class ReplayVerificationMixin:
+    """EvaluationEngine のバッチ再生の照合
+
+    照合は親プロセスで実行前に1回だけ行い、結果を settings['batch_replay'] としてワーカーへ渡す。
+    config / db_path / evaluation_dir / algorithm_version 等の属性は EvaluationEngine が保持する。
+    """
+
+    def _get_replay_verification_path(self) -> Path:
+        """バッチ再生の照合結果の記録先（アルゴリズムバージョンごと）"""
+        return self.evaluation_dir / f"v{self.algorithm_version}" / "replay_verification.json"
+
+    def _load_replay_verifications(self) -> Dict[str, Any]:
+        """照合結果の読み込み（存在しない・破損時は空）"""
+        path = self._get_replay_verification_path()
+        if not path.exists():
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('verifications', {})
+        except Exception as e:
+            print(f"  バッチ再生照合結果の読み込みエラー: {e}")
+            return {}
+
+    def _verify_batch_replay(self, core_outputs: List[Dict[str, Any]], config_overrides: Optional[Dict[str, Any]] = None,
+                             frame_rate: Optional[float] = None) -> bool:
+        """Config（config_overrides で上書き）・フレームレート・読み込まれているアルゴリズムの組み合わせで
+        バッチ再生が参照実装と一致するかを照合し、一致する場合 True を返す
+
+        照合済みの組み合わせは記録した結果を返す。アルゴリズムを特定できない場合は照合結果を記録しない。
+        """
+        settings = self._get_worker_settings()
+        frame_rate = settings['frame_rate'] if frame_rate is None else frame_rate
+        config = _make_detector_config(config_overrides)
+        identity = _get_loaded_algorithm_identity()
+        key = _hash_text(json.dumps({
+            'algorithm': identity,
+            'config': _describe_detector_config(config),
+            'frame_rate': frame_rate,
+        }, sort_keys=True, default=str))
+        
+        verifications = self._load_replay_verifications()
+        if identity is not None and key in verifications:
+            record = verifications[key]
+            print(f"  バッチ再生照合: {'一致' if record['equivalent'] else '不一致'}（照合済み {record['verified_at']}）")
+            return record['equivalent']
+        
+        # 照合に使用するビデオの入力（読み込めないビデオは除外）
+        num_samples = int((self.config.get('replay') or {}).get('verify_samples', DEFAULT_REPLAY_VERIFY_SAMPLES))
+        samples = {}
+        for core_output in core_outputs[:max(0, num_samples)]:
+            core_csv_path = _find_core_csv(self.db_path, core_output)
+            if core_csv_path is None:
+                continue
+            try:
+                samples[f"ビデオID={core_output['video_ID']}"] = _detector_columns(_load_core_inputs(core_csv_path, settings))
+            except Exception as e:
+                print(f"  バッチ再生照合: コアCSV読み込みエラー (ビデオID={core_output['video_ID']}): {e}")
+        
+        mismatch = _find_batch_replay_mismatch(config, frame_rate, samples)
+        if mismatch is None:
+            print(f"  バッチ再生照合: 一致（検証系列と{len(samples)}ビデオ）、バッチ再生で推論します")
+        else:
+            print(f"  バッチ再生照合: 不一致 {mismatch}、参照実装で推論します")
+        if identity is None:
+            return mismatch is None
+        
+        verifications[key] = {
+            'equivalent': mismatch is None,
+            'mismatch': mismatch,
+            'config': _describe_detector_config(config),
+            'frame_rate': frame_rate,
+            'samples': list(samples),
+            'verified_at': datetime.now().isoformat(),
+        }
+        path = self._get_replay_verification_path()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # シャード実行では複数のプロセスが同じファイルへ書き込むため、一時ファイルはプロセスごとに分ける
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'algorithm_version': self.algorithm_version,
+                    'algorithm_commit_hash': self.algorithm_commit_hash,
+                    'verifications': verifications
+                }, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"  バッチ再生照合結果の保存エラー: {e}")
+        return mismatch is None
@@ -0,0 +1,397 @@
+"""
+評価レポート
+
+評価サマリ（evaluation_summary.json）とマークダウンレポート（evaluation_report.md）の作成、
+保存済みの評価CSVからのレポート再生成（report サブコマンド）と評価サマリの表示（summary サブコマンド）。
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from engine.deps import np
+from engine.evaluation import _overall_results, _summarize_video_tasks
+from engine.journal import CheckpointJournal
+from engine.metrics import _format_metrics_lines
+from engine.writer import ALGO_OUTPUT_SUFFIXES, _read_algo_output, _write_json
+
+
+# 評価レポートの詳細結果の出力範囲（summary: サマリのみ / failed: 不正解タスクのみ / full: 全タスク）
+REPORT_DETAIL_LEVELS = ('summary', 'failed', 'full')
+# report.shard_details 有効時にビデオ別の詳細結果を出力するディレクトリ（評価ディレクトリ配下）
+REPORT_DETAILS_DIR = "details"
+
+
+def _get_report_settings(config: Dict[str, Any]) -> Tuple[str, bool]:
+    """レポート設定（report.detail: summary / failed / full、report.shard_details）"""
+    report_config = config.get('report') or {}
+    detail = str(report_config.get('detail', 'full')).lower()
+    if detail not in REPORT_DETAIL_LEVELS:
+        raise ValueError(f"report.detail が不正です: {detail} (summary / failed / full)")
+    return detail, bool(report_config.get('shard_details', False))
+
+
+def _format_ratio(value: Optional[float]) -> str:
+    """率の表示（None は「-」）"""
+    return "-" if value is None else f"{value * 100:.1f}%"
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    """秒数の表示（None は「-」）"""
+    return "-" if value is None else f"{value:.2f}秒"
+
+
+def _format_timeline_log(timeline: Optional[Dict[str, Any]]) -> str:
+    """log.md 用の全フレーム評価の行（全フレーム評価が無い場合は空文字列）"""
+    if not timeline:
+        return ""
+    return (
+        f"- **誤検知**: {timeline['false_positive_events']}イベント, {timeline['false_positive_frames']}フレーム "
+        f"(FPR {_format_ratio(timeline['false_positive_rate'])}), "
+        f"イベント適合率 {_format_ratio(timeline['event_precision'])}, "
+        f"平均検知遅延 {_format_seconds(timeline['mean_alarm_latency_seconds'])}\n"
+    )
+
+
+def _write_timeline_section(f, timeline: Dict[str, Any], per_dataset: List[Dict[str, Any]],
+                            untagged_videos: List[Dict[str, Any]] = ()):
+    """評価レポートの全フレーム評価セクションを書き込み（タグの無いビデオはビデオIDに「（タグなし）」を付記）"""
+    f.write("## 🚨 全フレーム評価（誤検知・イベント）\n\n")
+    events_per_hour = timeline['false_positive_events_per_hour']
+    f.write(f"- **誤検知イベント**: {timeline['false_positive_events']:,}件"
+            f"{'' if events_per_hour is None else f' ({events_per_hour:.2f}件/時間)'}\n")
+    f.write(f"- **誤検知フレーム**: {timeline['false_positive_frames']:,} / "
+            f"{timeline['num_frames'] - timeline['ground_truth_frames']:,}フレーム（タグ区間外） "
+            f"(FPR {_format_ratio(timeline['false_positive_rate'])})\n")
+    f.write(f"- **イベント適合率**: {_format_ratio(timeline['event_precision'])} "
+            f"({timeline['alarm_events'] - timeline['false_positive_events']:,}/{timeline['alarm_events']:,}アラーム)\n")
+    f.write(f"- **イベント再現率**: {_format_ratio(timeline['event_recall'])} "
+            f"({timeline['detected_tags']:,}/{timeline['num_tags']:,}タグ)\n")
+    f.write(f"- **検知遅延（タグ開始から）**: 平均 {_format_seconds(timeline['mean_alarm_latency_seconds'])}, "
+            f"最大 {_format_seconds(timeline['max_alarm_latency_seconds'])}\n\n")
+    
+    f.write("| ビデオID | 誤検知イベント | 誤検知フレーム | FPR | イベント適合率 | 平均検知遅延 |\n")
+    f.write("|---------|---------------|---------------|-----|---------------|-------------|\n")
+    rows = [(str(dataset['video_id']), dataset.get('timeline')) for dataset in per_dataset]
+    rows += [(f"{video['video_id']}（タグなし）", video['timeline']) for video in untagged_videos]
+    for video_label, video_timeline in rows:
+        if not video_timeline:
+            continue
+        f.write(f"| {video_label} | {video_timeline['false_positive_events']:,} | "
+                f"{video_timeline['false_positive_frames']:,} | {_format_ratio(video_timeline['false_positive_rate'])} | "
+                f"{_format_ratio(video_timeline['event_precision'])} | "
+                f"{_format_seconds(video_timeline['mean_alarm_latency_seconds'])} |\n")
+    f.write("\n")
+
+
+def _video_status(accuracy_percent: float) -> str:
+    """ビデオ別評価結果のステータス表示"""
+    if accuracy_percent >= 80:
+        return "🟢 優秀"
+    if accuracy_percent >= 60:
+        return "🟡 良好"
+    if accuracy_percent >= 40:
+        return "🟠 要改善"
+    return "🔴 要改善"
+
+
+def _write_task_table(f, video_tasks: List[Dict[str, Any]]):
+    """タスク別評価結果のテーブルを書き込み"""
+    f.write("| タスクID | アルゴリズム出力 | 真値 | 正解 | 詳細 |\n")
+    f.write("|----------|----------|------|------|------|\n")
+    for task in video_tasks:
+        predicted = "✅ 検出" if task['predicted'] else "❌ 未検出"
+        ground_truth = "✅ 検出" if task['ground_truth'] else "❌ 未検出"
+        correct = "✅" if task['correct'] else "❌"
+        f.write(f"| {task['task_id']} | {predicted} | {ground_truth} | {correct} | {task.get('notes', '')} |\n")
+    f.write("\n")
+
+
+def _write_markdown_report(path: Path, summary: Dict[str, Any], evaluation_results: List[Dict[str, Any]],
+                           metrics_lines: List[str], detail: str = 'full', details_dir: Optional[Path] = None):
+    """評価レポート（evaluation_report.md）を1行ずつファイルへ書き込む
+
+    ビデオ単位の集計結果（総フレーム数・検出フレーム数・保持したタスク）のみを使用する。
+    details_dir を指定した場合、詳細結果はビデオ別ファイルに分割し、本文からリンクする。
+    """
+    # 詳細結果に出力するタスク（failed は不正解タスクのみ）とビデオ
+    def detail_tasks(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if detail == 'failed':
+            return [task for task in result['evaluation_result'] if not task['correct']]
+        return result['evaluation_result']
+    
+    detailed_video_ids = set()
+    if detail != 'summary':
+        detailed_video_ids = {result['video_id'] for result in evaluation_results if detail_tasks(result)}
+    if details_dir:
+        details_dir.mkdir(parents=True, exist_ok=True)
+    
+    with open(path, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+        # ヘッダー
+        f.write("# drowsy_detection 評価レポート\n\n")
+        f.write(f"**実行日時**: {summary['created_at']}\n")
+        f.write(f"**実行ID**: `{summary['run_id']}`\n")
+        f.write(f"**アルゴリズムバージョン**: `{summary['algorithm_version']}`\n")
+        f.write(f"**コミットハッシュ**: `{summary['algorithm_commit_hash']}`\n\n")
+        
+        # 評価条件
+        conditions = summary['evaluation_conditions']
+        f.write("## 📋 評価条件\n\n")
+        f.write(f"- **フレームレート**: {conditions['frame_rate']} fps\n")
+        f.write(f"- **グラウンドトゥルース**: {conditions['ground_truth']}\n\n")
+        
+        # 全体結果
+        overall = summary['overall_results']
+        accuracy_percent = overall['accuracy'] * 100
+        f.write("## 🎯 全体評価結果\n\n")
+        f.write(f"- **全体正解率**: **{accuracy_percent:.1f}%** ({overall['total_num_correct']}/{overall['total_num_tasks']})\n")
+        f.write(f"- **評価**: {'🟢 OK' if accuracy_percent >= 100 else '🔴 未検知あり'}\n\n")
+        
+        # 全フレーム評価（タグ区間外の誤検知・イベント単位の評価・検知遅延）
+        if overall.get('timeline'):
+            _write_timeline_section(f, overall['timeline'], summary['per_dataset'], summary.get('untagged_videos') or [])
+        
+        # ビデオ別結果テーブル（詳細はアンカー・ビデオ別ファイル・評価CSVのいずれかへリンク）
+        f.write("## 📊 ビデオ別評価結果\n\n")
+        f.write("| ビデオID | 正解率 | 正解数/総数 | ステータス | 詳細 |\n")
+        f.write("|---------|--------|------------|-----------|------|\n")
+        for dataset in summary['per_dataset']:
+            video_id = dataset['video_id']
+            accuracy = dataset['accuracy'] * 100
+            if video_id not in detailed_video_ids:
+                link = f"[CSV]({dataset['result_file_path']})"
+            elif details_dir:
+                link = f"[詳細]({REPORT_DETAILS_DIR}/{video_id}.md)"
+            else:
+                link = f"[詳細](#ビデオ{video_id}の詳細結果)"
+            f.write(f"| {video_id} | {accuracy:.1f}% | {dataset['num_correct']}/{dataset['num_tasks']} | "
+                    f"{_video_status(accuracy)} | {link} |\n")
+        f.write("\n")
+        
+        # アルゴリズム検出統計
+        f.write("## 🔍 アルゴリズム検出統計\n\n")
+        f.write("| ビデオID | 総フレーム数 | 検出フレーム数 | 検出率 | グラフ |\n")
+        f.write("|---------|-------------|---------------|--------|-------|\n")
+        bar_length = 20
+        for result in evaluation_results:
+            # 総フレーム数が不明なビデオ（レポート再生成で記録が残っていない場合）は省略
+            if result.get('total_frames') is None:
+                continue
+            total_frames = result['total_frames']
+            drowsy_frames = result['drowsy_frames']
+            detection_rate = (drowsy_frames / total_frames) * 100 if total_frames > 0 else 0
+            filled_length = int(bar_length * (detection_rate / 100))
+            bar = "█" * filled_length + "░" * (bar_length - filled_length)
+            f.write(f"| {result['video_id']} | {total_frames:,} | {drowsy_frames:,} | {detection_rate:.2f}% | `{bar}` |\n")
+        f.write("\n")
+        
+        # 詳細結果セクション
+        f.write("## 📖 詳細結果\n\n")
+        if detail == 'summary':
+            f.write("タスク別の結果は各ビデオの評価CSVを参照。\n\n")
+        elif details_dir:
+            scope = "不正解タスク" if detail == 'failed' else "全タスク"
+            f.write(f"ビデオ別の詳細結果（{scope}）は `{REPORT_DETAILS_DIR}/` 配下のファイルを参照。\n\n")
+        elif detail == 'failed':
+            f.write("不正解タスクがあるビデオのみ、不正解タスクを表示。\n\n")
+        for result in evaluation_results:
+            if result['video_id'] not in detailed_video_ids:
+                continue
+            video_id = result['video_id']
+            if details_dir:
+                with open(details_dir / f"{video_id}.md", 'w', encoding='utf-8') as detail_file:
+                    detail_file.write(f"# ビデオ{video_id}の詳細結果\n\n")
+                    detail_file.write(f"[評価レポートへ戻る](../{path.name})\n\n")
+                    _write_task_table(detail_file, detail_tasks(result))
+                continue
+            f.write(f"### ビデオ{video_id}の詳細結果\n\n")
+            _write_task_table(f, detail_tasks(result))
+        
+        # 処理時間（レポート生成時点。評価結果DB登録を含む全体は metrics.json）
+        for line in metrics_lines:
+            f.write(line + "\n")
+        
+        # フッター
+        f.write("---\n")
+        f.write("*このレポートは自動生成されました*")
+
+
+def _read_evaluation_csv(path: Path) -> Optional[List[Dict[str, Any]]]:
+    """ビデオ別評価CSVをタスク結果のリストとして読み込む（評価CSVでない場合は None）"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        if not {'task_id', 'predicted', 'ground_truth', 'correct'} <= set(reader.fieldnames or ()):
+            return None
+        return [
+            {
+                'task_id': row['task_id'],
+                'predicted': int(row['predicted'] in ('1', 'True')),
+                'ground_truth': int(row['ground_truth'] in ('1', 'True')),
+                'correct': int(row['correct'] in ('1', 'True')),
+                'notes': row.get('notes') or '',
+            }
+            for row in reader
+        ]
+
+
+def _load_frame_stats(evaluation_dir: Path, algo_dir: Optional[Path], video_ids: List[Any]) -> Dict[str, Tuple[int, int]]:
+    """ビデオ別の (総フレーム数, 検出フレーム数) を保存済みの記録から取得（キーは str(video_id)）
+
+    シャード実行の部分結果・チェックポイントの集計結果を優先し、無い場合はアルゴ出力を読み込んで数える。
+    いずれも無いビデオは含めない。
+    """
+    records = []
+    for partial_path in sorted((evaluation_dir / "shards").glob("shard_*_of_*.json")):
+        with open(partial_path, 'r', encoding='utf-8') as f:
+            records.extend(json.load(f)['videos'])
+    if algo_dir and algo_dir.is_dir():
+        for journal_path in sorted(algo_dir.glob("checkpoint*.jsonl")):
+            records.extend(CheckpointJournal(journal_path).load()['videos'].values())
+    
+    stats = {}
+    for record in records:
+        stats.setdefault(str(record['video_id']), (record['total_frames'], record['drowsy_frames']))
+    if not algo_dir or not algo_dir.is_dir():
+        return stats
+    for video_id in video_ids:
+        if str(video_id) in stats:
+            continue
+        for suffix in ALGO_OUTPUT_SUFFIXES.values():
+            algo_path = algo_dir / f"{video_id}{suffix}"
+            if algo_path.exists():
+                is_drowsy = _read_algo_output(algo_path)['is_drowsy'].to_numpy()
+                stats[str(video_id)] = (len(is_drowsy), int(np.count_nonzero(is_drowsy)))
+                break
+    return stats
+
+
+def _resolve_evaluation_dir(target: str, config: Dict[str, Any]) -> Path:
+    """評価ディレクトリのパス、または run_id（output.evaluation_dir/v*/{run_id}）から評価ディレクトリを解決"""
+    path = Path(target)
+    if path.is_dir():
+        return path
+    evaluation_dir = (config.get('output') or {}).get('evaluation_dir')
+    candidates = sorted(Path(evaluation_dir).glob(f"v*/{target}")) if evaluation_dir else []
+    candidates = [candidate for candidate in candidates if candidate.is_dir()]
+    if len(candidates) != 1:
+        detail = f"候補が複数あります: {', '.join(map(str, candidates))}" if candidates else "見つかりません"
+        raise FileNotFoundError(f"評価ディレクトリが{detail} ({target})")
+    return candidates[0]
+
+
+def _rebuild_report(evaluation_dir: Path, config: Dict[str, Any], detail: Optional[str] = None,
+                    shard_details: Optional[bool] = None) -> bool:
+    """保存済みのビデオ別評価CSVから evaluation_summary.json と evaluation_report.md を再生成
+
+    推論・DataWareHouseへのアクセスは行わない。実行ID・バージョン・ビデオ別の全フレーム評価は
+    既存の評価サマリから引き継ぎ、ビデオの順序も既存の評価サマリに従う（無いビデオは video_id 順）。総フレーム数・検出フレーム数は
+    既存の評価サマリの per_dataset を優先し、記録の無いビデオのみ _load_frame_stats で取得する。
+    処理時間は metrics.json（評価実行時の計測）から記載する。
+    """
+    config_detail, config_shard_details = _get_report_settings(config)
+    detail = detail or config_detail
+    shard_details = config_shard_details if shard_details is None else shard_details
+    
+    summary_path = evaluation_dir / "evaluation_summary.json"
+    previous = {}
+    if summary_path.exists():
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get('evaluation_summary', {})
+    
+    # 評価CSV（既存サマリの順序を優先）
+    video_ids = {path.stem: path for path in evaluation_dir.glob("*.csv")}
+    previous_datasets = {str(dataset['video_id']): dataset for dataset in previous.get('per_dataset', [])}
+    known_ids = {key: dataset['video_id'] for key, dataset in previous_datasets.items()}
+    order = [key for key in known_ids if key in video_ids]
+    order += sorted((key for key in video_ids if key not in known_ids),
+                    key=lambda key: (not key.isdigit(), int(key) if key.isdigit() else 0, key))
+    
+    evaluation_results = []
+    for key in order:
+        video_tasks = _read_evaluation_csv(video_ids[key])
+        video_id = known_ids.get(key, int(key) if key.isdigit() else key)
+        video_result = _summarize_video_tasks(video_id, video_tasks) if video_tasks is not None else None
+        # 全フレーム評価は評価CSVから再計算できないため既存の評価サマリから引き継ぐ
+        if video_result and previous_datasets.get(key, {}).get('timeline'):
+            video_result['timeline'] = previous_datasets[key]['timeline']
+        if video_result:
+            evaluation_results.append({'video_id': video_id, 'video_result': video_result, 'evaluation_result': video_tasks})
+    if not evaluation_results:
+        print(f"評価CSVが見つかりません: {evaluation_dir}")
+        return False
+    
+    base_dir = (config.get('output') or {}).get('base_dir')
+    algo_dir = Path(base_dir) / evaluation_dir.parent.name / evaluation_dir.name if base_dir else None
+    # 差分評価で再利用したビデオのアルゴ出力は前回の実行ディレクトリにあるため、評価サマリの記録を優先
+    frame_stats = {key: (dataset['total_frames'], dataset['drowsy_frames']) for key, dataset in previous_datasets.items()
+                   if dataset.get('total_frames') is not None}
+    missing_ids = [result['video_id'] for result in evaluation_results if str(result['video_id']) not in frame_stats]
+    if missing_ids:
+        frame_stats.update(_load_frame_stats(evaluation_dir, algo_dir, missing_ids))
+    for result in evaluation_results:
+        result['total_frames'], result['drowsy_frames'] = frame_stats.get(str(result['video_id']), (None, None))
+        if result['total_frames'] is not None:
+            result['video_result'].update(total_frames=result['total_frames'], drowsy_frames=result['drowsy_frames'])
+    
+    per_video_results = [result['video_result'] for result in evaluation_results]
+    version_dir = evaluation_dir.parent.name
+    summary = {
+        'run_id': evaluation_dir.name,
+        'created_at': datetime.now().isoformat(),
+        'algorithm_version': version_dir[1:] if version_dir.startswith('v') else version_dir,
+        'algorithm_commit_hash': None,
+        'evaluation_conditions': {
+            'frame_rate': (config.get('algorithm') or {}).get('frame_rate'),
+            'ground_truth': 'all_tags_continuous_closed_eyes'
+        },
+        **previous,
+        'overall_results': _overall_results(per_video_results, previous.get('untagged_videos')),
+        'per_dataset': per_video_results
+    }
+    
+    metrics_lines = []
+    metrics_path = evaluation_dir / "metrics.json"
+    if metrics_path.exists():
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            metrics_lines = _format_metrics_lines(json.load(f)['metrics'], heading="## ⏱️ 処理時間（評価実行時）")
+    
+    _write_json(summary_path, {'evaluation_summary': summary})
+    markdown_path = evaluation_dir / "evaluation_report.md"
+    details_dir = evaluation_dir / REPORT_DETAILS_DIR if shard_details and detail != 'summary' else None
+    _write_markdown_report(markdown_path, summary, evaluation_results, metrics_lines, detail, details_dir)
+    
+    overall = summary['overall_results']
+    missing = sum(result['total_frames'] is None for result in evaluation_results)
+    print(f"評価ディレクトリ: {evaluation_dir} ({len(evaluation_results)}動画)")
+    print(f"  全体正解率: {overall['accuracy']:.3f} ({overall['total_num_correct']}/{overall['total_num_tasks']})")
+    if missing:
+        print(f"  総フレーム数の記録が無いため検出統計を省略: {missing}動画")
+    print(f"  評価サマリ保存: {summary_path}")
+    print(f"  マークダウンレポート保存: {markdown_path}")
+    return True
+
+
+def _show_summary(evaluation_dir: Path, as_json: bool = False) -> bool:
+    """評価ディレクトリの evaluation_summary.json を表示"""
+    summary_path = evaluation_dir / "evaluation_summary.json"
+    if not summary_path.exists():
+        print(f"評価サマリが見つかりません: {summary_path}")
+        return False
+    with open(summary_path, 'r', encoding='utf-8') as f:
+        evaluation_summary = json.load(f)
+    if as_json:
+        print(json.dumps(evaluation_summary, ensure_ascii=False, indent=2))
+        return True
+    
+    summary = evaluation_summary['evaluation_summary']
+    overall = summary['overall_results']
+    print(f"実行ID: {summary['run_id']} ({summary['created_at']})")
+    print(f"アルゴリズムバージョン: {summary['algorithm_version']} ({summary['algorithm_commit_hash']})")
+    print(f"全体正解率: {overall['accuracy']:.3f} ({overall['total_num_correct']}/{overall['total_num_tasks']})")
+    for dataset in summary['per_dataset']:
+        print(f"  ビデオID={dataset['video_id']}: {dataset['accuracy']:.3f} ({dataset['num_correct']}/{dataset['num_tasks']})")
+    return True
@@ -0,0 +1,202 @@
+"""
+シャード実行
+
+video_id の内容ハッシュで対象データを N 分割して複数ノード・プロセスで評価し（--shard I/N）、
+各シャードの部分結果を統合してサマリ・レポート生成と評価結果登録を1回だけ行う（--merge）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from engine.deps import pd
+from engine.writer import _write_json
+
+
+def _shard_of(video_id: Any, shard_count: int) -> int:
+    """video_id の担当シャード番号（ノード・プロセスによらず同じ値になるよう内容ハッシュで決定）"""
+    digest = hashlib.sha256(str(video_id).encode('utf-8')).hexdigest()
+    return int(digest[:16], 16) % shard_count
+
+
+def _parse_shard(value: str) -> Tuple[int, int]:
+    """--shard の値（I/N、0 <= I < N）を (I, N) に変換"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"I/N 形式で指定してください: {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"0 <= I < N となるよう指定してください: {value}")
+    return index, count
+
+
+class ShardMixin:
+    """EvaluationEngine のシャード実行と部分結果の統合
+
+    部分結果は評価ディレクトリ配下の shards/ に保存し、全シャードで同じ run_id を使用する。
+    shard / run_id / evaluation_output_dir 等の属性は EvaluationEngine が保持する。
+    """
+
+    def _shard_artifact(self, file_name: str) -> str:
+        """シャード実行時は成果物名にシャード番号を付与（複数シャードが同じ出力ディレクトリへ書き込むため）"""
+        if not self.shard:
+            return file_name
+        stem, dot, suffix = file_name.partition('.')
+        return f"{stem}.shard{self.shard[0]}-of-{self.shard[1]}{dot}{suffix}"
+
+    def _select_shard_outputs(self, core_outputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """担当シャードの対象データを選択（video_id のハッシュで分割し、全体での順序を shard_order に記録）"""
+        shard_index, shard_count = self.shard
+        selected = [
+            dict(core_output, shard_order=order) for order, core_output in enumerate(core_outputs)
+            if _shard_of(core_output['video_ID'], shard_count) == shard_index
+        ]
+        self._shard_orders = {core_output['core_lib_output_ID']: core_output['shard_order'] for core_output in selected}
+        print(f"  シャード {shard_index}/{shard_count}: 担当 {len(selected)}件 / 全 {len(core_outputs)}件")
+        return selected
+
+    def _get_shard_dir(self) -> Path:
+        """シャードの部分結果の保存先（評価ディレクトリ配下）"""
+        return self.evaluation_output_dir / "shards"
+
+    def _write_shard_partial(self, video_results: List[Dict[str, Any]]):
+        """シャードの部分結果（ビデオ単位の集計結果・登録ID・推論統計）を保存"""
+        shard_index, shard_count = self.shard
+        videos = []
+        for result in video_results:
+            record = {key: value for key, value in result.items() if key != 'evaluation_result'}
+            record['algo_csv_path'] = str(Path(result['algo_csv_path']).resolve())
+            record['shard_order'] = self._shard_orders.get(result['core_lib_output_id'])
+            videos.append(record)
+        
+        shard_dir = self._get_shard_dir()
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        partial_path = shard_dir / f"shard_{shard_index}_of_{shard_count}.json"
+        tmp_path = partial_path.with_suffix('.tmp')
+        _write_json(tmp_path, {
+            'shard': {
+                'index': shard_index,
+                'count': shard_count,
+                'run_id': self.run_id,
+                'created_at': datetime.now().isoformat(),
+                'algorithm_version': self.algorithm_version,
+                'algorithm_commit_hash': self.algorithm_commit_hash,
+                'algorithm_version_source': self.algorithm_version_source,
+                'algorithm_id': self.algorithm_id,
+                'cache_stats': self.cache_stats if self.inference_cache else None,
+                'replay_stats': self.replay_stats,
+                'chunk_stats': self.chunk_stats,
+                'num_reused_videos': self.num_reused_videos,
+            },
+            'videos': videos
+        })
+        os.replace(tmp_path, partial_path)
+        print(f"[{self.run_id}] シャード部分結果保存: {partial_path} ({len(videos)}件)")
+
+    def run_merge(self) -> bool:
+        """シャード実行（--shard）の部分結果を統合
+
+        全シャードの部分結果が揃っていることと、アルゴリズムバージョンが一致することを確認し、
+        全体順のビデオ単位の集計結果からサマリ・レポートを生成して、評価結果を1回だけ登録する。
+        """
+        try:
+            print(f"\n[{self.run_id}] シャード統合開始")
+            partials = self._load_shard_partials()
+            
+            video_results = []
+            for partial in partials:
+                for record in partial['videos']:
+                    evaluation_result = []
+                    if record.get('video_result'):
+                        evaluation_result = self._retain_report_tasks(pd.read_csv(
+                            self.evaluation_output_dir / record['video_result']['result_file_path'],
+                            dtype={'task_id': str, 'notes': str}, keep_default_na=False
+                        ).to_dict('records'))
+                    video_results.append(dict(record, algo_csv_path=Path(record['algo_csv_path']),
+                                              evaluation_result=evaluation_result))
+                # 推論統計はシャードの合計
+                info = partial['shard']
+                if info.get('cache_stats'):
+                    for key in self.cache_stats:
+                        self.cache_stats[key] += info['cache_stats'][key]
+                for key in self.replay_stats:
+                    self.replay_stats[key] += info['replay_stats'].get(key, 0)
+                for key in self.chunk_stats:
+                    self.chunk_stats[key] += (info.get('chunk_stats') or {}).get(key, 0)
+                self.num_reused_videos += info.get('num_reused_videos', 0)
+            # シャード分割前の全体順に並べ替え（シャード数によらず同じサマリ・レポートにする）
+            video_results.sort(key=lambda result: result['shard_order'])
+            print(f"  統合件数: {len(video_results)}件 ({len(partials)}シャード)")
+            self._merge_shard_metrics()
+            
+            self._finish_evaluation(video_results)
+            
+            print(f"\n[{self.run_id}] シャード統合完了")
+            return True
+        
+        except Exception as e:
+            print(f"\n[{self.run_id}] シャード統合エラー: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def _merge_shard_metrics(self):
+        """各シャードの metrics をステージ・ビデオ別の計測結果として取り込む（ステージの時間は全シャードの合計）"""
+        for metrics_path in sorted(self.evaluation_output_dir.glob("metrics.shard*-of-*.json")):
+            try:
+                with open(metrics_path, 'r', encoding='utf-8') as f:
+                    shard_metrics = json.load(f)['metrics']
+            except (OSError, ValueError, KeyError) as e:
+                print(f"  シャードのメトリクス読み込みエラー ({metrics_path.name}): {e}")
+                continue
+            for name, stage in shard_metrics['stages'].items():
+                if not name.startswith('video_'):
+                    self.metrics.add_stage(name, stage['wall_seconds'], stage['cpu_seconds'], count=stage['count'])
+            for record in shard_metrics['videos']:
+                self.metrics.add_video(record)
+            self.shard_metrics.append({
+                'file': metrics_path.name,
+                'elapsed_seconds': shard_metrics['elapsed_seconds'],
+                'frames': shard_metrics['throughput']['frames'],
+                'peak_rss_mb': shard_metrics['peak_rss_mb']
+            })
+
+    def _load_shard_partials(self) -> List[Dict[str, Any]]:
+        """run_id の全シャードの部分結果を読み込み、揃っていること・バージョンが一致することを確認"""
+        partial_paths = sorted(self.evaluation_dir.glob(f"v*/{self.run_id}/shards/shard_*_of_*.json"))
+        if not partial_paths:
+            raise FileNotFoundError(f"シャードの部分結果が見つかりません: run_id={self.run_id} ({self.evaluation_dir})")
+        partials = []
+        for partial_path in partial_paths:
+            with open(partial_path, 'r', encoding='utf-8') as f:
+                partials.append(json.load(f))
+        
+        infos = [partial['shard'] for partial in partials]
+        shard_counts = {info['count'] for info in infos}
+        if len(shard_counts) != 1:
+            raise ValueError(f"シャード数が一致しません: {sorted(shard_counts)}")
+        shard_count = shard_counts.pop()
+        missing = sorted(set(range(shard_count)) - {info['index'] for info in infos})
+        if missing:
+            raise ValueError(f"未完了のシャードがあります: {', '.join(f'{index}/{shard_count}' for index in missing)}")
+        for key in ('algorithm_version', 'algorithm_commit_hash', 'algorithm_id'):
+            values = {info[key] for info in infos}
+            if len(values) != 1:
+                raise ValueError(f"シャード間で {key} が一致しません: {sorted(map(str, values))}")
+        
+        info = infos[0]
+        self.algorithm_version = info['algorithm_version']
+        self.algorithm_commit_hash = info['algorithm_commit_hash']
+        self.algorithm_version_source = f"シャード統合（{info['algorithm_version_source']}）"
+        self.algorithm_id = info['algorithm_id']
+        self.run_output_dir = self.output_base_dir / f"v{self.algorithm_version}" / self.run_id
+        self.evaluation_output_dir = partial_paths[0].parent.parent
+        print(f"  バージョン: {self.algorithm_version}, シャード数: {shard_count}")
+        print(f"  評価ディレクトリ: {self.evaluation_output_dir}")
+        return sorted(partials, key=lambda partial: partial['shard']['index'])
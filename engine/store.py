@@ -0,0 +1,163 @@
+"""
+コアライブラリ出力（コアCSV）の読み込み
+
+必要列のみを型指定して読み込むCSVローダと、読み込んだ列をメモリマップで再利用する入力ストア（CoreInputStore）。
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from engine.deps import np, pd
+from engine.hashing import _hash_file, _hash_text
+
+
+# コアCSVから読み込む必須列と読み込み時のdtype（アルゴリズム入力に使用する列のみ）
+# 開眼度・信頼度は DrowsyDetector へ渡す値を変えないよう float64 で読み込む
+# （core_csv.float_dtype: float32 はメモリ削減用のオプトイン。閾値付近の判定が変わりうる）
+CORE_CSV_COLUMNS: Dict[str, str] = {
+    'frame': 'int32',
+    'leye_openness': 'float64',
+    'reye_openness': 'float64',
+    'confidence': 'float64',
+}
+# コアCSVの開眼度・信頼度の読み込みdtype（core_csv.float_dtype の既定値）
+DEFAULT_FLOAT_DTYPE = 'float64'
+
+
+class CoreInputStore:
+    """コアCSVの必須列を列ごとの .npy として保持し、メモリマップで読み込む入力ストア
+
+    エントリはコアCSVの絶対パスと float_dtype ごとに作成し、meta.json に元ファイルの
+    mtime・サイズ・内容ハッシュを記録する。mtime・サイズが一致すれば記録済みのハッシュを使い、
+    異なる場合は内容ハッシュを再計算して一致しなければ再取り込みする。
+    ワーカープロセスへ渡せるようパスと文字列のみを保持する。
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, store_dir: Path, float_dtype: str = DEFAULT_FLOAT_DTYPE, csv_engine: str = 'c'):
+        self.store_dir = Path(store_dir)
+        self.float_dtype = float_dtype
+        self.csv_engine = csv_engine
+
+    def _entry_dir(self, core_csv_path: Path) -> Path:
+        return self.store_dir / _hash_text(f"{Path(core_csv_path).resolve()}|{self.float_dtype}")
+
+    def _read_meta(self, entry_dir: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(entry_dir / self.META_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def file_hash(self, core_csv_path: Path) -> str:
+        """コアCSVの内容ハッシュ（mtime・サイズが取り込み時と同一なら記録済みの値を返す）"""
+        stat = Path(core_csv_path).stat()
+        meta = self._read_meta(self._entry_dir(core_csv_path))
+        if meta and meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+            return meta['sha256']
+        return _hash_file(core_csv_path)
+
+    def load(self, core_csv_path: Path, input_hash: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """必須列をメモリマップ（読み取り専用）で返す。未取り込み・内容変更時はCSVから取り込み直す"""
+        core_csv_path = Path(core_csv_path)
+        entry_dir = self._entry_dir(core_csv_path)
+        if input_hash is None:
+            input_hash = self.file_hash(core_csv_path)
+        
+        meta = self._read_meta(entry_dir)
+        if meta and meta.get('sha256') == input_hash:
+            try:
+                columns = {
+                    column: np.load(entry_dir / f"{column}.npy", mmap_mode='r')
+                    for column in CORE_CSV_COLUMNS
+                }
+                stat = core_csv_path.stat()
+                if meta.get('mtime_ns') != stat.st_mtime_ns or meta.get('size') != stat.st_size:
+                    # 内容が同一でmtimeのみ変わった場合は記録を更新し、次回のハッシュ計算を省略する
+                    self._write_meta(entry_dir, core_csv_path, input_hash)
+                return columns
+            except (OSError, ValueError):
+                pass
+        
+        return self._ingest(core_csv_path, entry_dir, input_hash)
+
+    def _ingest(self, core_csv_path: Path, entry_dir: Path, input_hash: str) -> Dict[str, np.ndarray]:
+        """コアCSVを読み込み、列ごとの .npy として保存（meta.json は最後に書き込む）"""
+        df = _load_core_csv(core_csv_path, self.csv_engine, self.float_dtype)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        (entry_dir / self.META_FILE).unlink(missing_ok=True)
+        for column in CORE_CSV_COLUMNS:
+            tmp_path = entry_dir / f"{column}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, df[column].to_numpy())
+            os.replace(tmp_path, entry_dir / f"{column}.npy")
+        self._write_meta(entry_dir, core_csv_path, input_hash)
+        print(f"      コア入力ストアへ取り込み: {entry_dir}")
+        return {column: np.load(entry_dir / f"{column}.npy", mmap_mode='r') for column in CORE_CSV_COLUMNS}
+
+    def _write_meta(self, entry_dir: Path, core_csv_path: Path, input_hash: str):
+        stat = core_csv_path.stat()
+        tmp_path = entry_dir / f"{self.META_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'source': str(core_csv_path.resolve()),
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': input_hash,
+                'float_dtype': self.float_dtype
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, entry_dir / self.META_FILE)
+
+
+def _hash_core_csv(core_csv_path: Path, store: Optional[CoreInputStore] = None) -> str:
+    """コアCSVの内容ハッシュ（入力ストア有効時は mtime・サイズ一致でハッシュ計算を省略）"""
+    if store is not None:
+        return store.file_hash(core_csv_path)
+    return _hash_file(core_csv_path)
+
+
+def _load_core_inputs(core_csv_path: Path, settings: Dict[str, Any], input_hash: Optional[str] = None):
+    """推論入力の読み込み（入力ストア有効時は列ごとのメモリマップ、無効時はCSVを直接読み込む）"""
+    store: Optional[CoreInputStore] = settings.get('core_input_store')
+    if store is not None:
+        return store.load(core_csv_path, input_hash)
+    return _load_core_csv(core_csv_path, settings['csv_engine'], settings['float_dtype'])
+
+
+def _load_core_csv(core_csv_path: Path, engine: str = 'c', float_dtype: str = DEFAULT_FLOAT_DTYPE) -> pd.DataFrame:
+    """コアCSVから必須列のみを型指定で読み込む
+
+    必須列が欠けている場合はフレームループ開始前に ValueError を送出する。
+    engine='pyarrow' は pyarrow がインストールされている場合のみ使用する。
+    """
+    header = pd.read_csv(core_csv_path, nrows=0).columns
+    missing = [column for column in CORE_CSV_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"必須列がありません: {', '.join(missing)} ({core_csv_path})")
+    
+    if engine == 'pyarrow' and importlib.util.find_spec('pyarrow') is None:
+        print("      pyarrowが見つからないため、標準のCSVエンジンを使用します")
+        engine = 'c'
+    
+    dtypes = {
+        column: (float_dtype if dtype.startswith('float') else dtype)
+        for column, dtype in CORE_CSV_COLUMNS.items()
+    }
+    return pd.read_csv(core_csv_path, usecols=list(CORE_CSV_COLUMNS), dtype=dtypes, engine=engine)
+
+
+def _find_core_csv(db_path: str, core_output: Dict[str, Any]) -> Optional[Path]:
+    """コアライブラリ出力ディレクトリ内のCSV（最初の1件）を返す"""
+    core_dir = Path(db_path).parent / core_output['core_lib_output_dir']
+    csv_files = list(core_dir.glob("*.csv"))
+    
+    if not csv_files:
+        print(f"      CSVファイルが見つかりません: {core_dir}")
+        return None
+    
+    return csv_files[0]  # 最初のCSVファイルを使用
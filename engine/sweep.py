@@ -0,0 +1,279 @@
+"""
+パラメータスイープ
+
+config.yaml の sweep.grid から生成した Config バリアントを、各ビデオの入力を1回だけ読み込んで
+全バリアントで推論・評価し、バリアント別ランキング（sweep_report.md）を作成する（--sweep）。
+"""
+
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+
+from engine import deps
+from engine.deps import np, pd
+from engine.detector import REPLAY_MODES, _run_detector
+from engine.evaluation import _evaluate_tags, _evaluate_timeline, _summarize_video_tasks, _timeline_rates, _untagged_timelines
+from engine.inference import _iter_bounded
+from engine.store import _find_core_csv, _load_core_inputs
+
+
+def _sweep_single_video(core_output: Dict[str, Any],
+                        tags: List[Dict[str, Any]],
+                        variants: List[Dict[str, Any]],
+                        settings: Dict[str, Any]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """単一ビデオの入力を1回だけ読み込み、全バリアントで推論・タグ区間評価を行う
+
+    戻り値はバリアント名 -> {video_id, video_result, timeline, evaluation_result, total_frames, drowsy_frames}。
+    """
+    video_id = core_output['video_ID']
+    print(f"    ビデオID={video_id} 推論・評価中 ({len(variants)}バリアント)...")
+    
+    core_csv_path = _find_core_csv(settings['db_path'], core_output)
+    if core_csv_path is None:
+        return None
+    try:
+        df = _load_core_inputs(core_csv_path, settings)
+    except Exception as e:
+        print(f"      コアCSV読み込みエラー: {e}")
+        return None
+    
+    results = {}
+    for variant in variants:
+        variant_settings = dict(settings, frame_rate=variant['frame_rate'], batch_replay=variant.get('batch_replay', False))
+        algo_df, _ = _run_detector(df, variant_settings, variant['config_overrides'])
+        frame_nums = algo_df['frame_num'].to_numpy()
+        is_drowsy = algo_df['is_drowsy'].to_numpy() == 1
+        video_tasks = _evaluate_tags(video_id, frame_nums, is_drowsy, tags)
+        timeline = _evaluate_timeline(frame_nums, is_drowsy, tags, variant['frame_rate'])
+        results[variant['name']] = {
+            'video_id': video_id,
+            'video_result': _summarize_video_tasks(video_id, video_tasks, timeline),
+            'timeline': {**timeline, **_timeline_rates(timeline)},
+            'evaluation_result': video_tasks,
+            'total_frames': len(algo_df),
+            'drowsy_frames': int(np.count_nonzero(algo_df['is_drowsy'].to_numpy()))
+        }
+    return results
+
+
+def _sweep_single_video_job(job: Tuple[Dict[str, Any], List[Dict[str, Any]]],
+                            variants: List[Dict[str, Any]],
+                            settings: Dict[str, Any]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """_iter_bounded 用に (core_output, tags) の組を受け取る _sweep_single_video のラッパー"""
+    core_output, tags = job
+    return _sweep_single_video(core_output, tags, variants, settings)
+
+
+class SweepMixin:
+    """EvaluationEngine のパラメータスイープ
+
+    DataWareHouse への登録は行わず、バリアントごとの評価サマリとランキングのみを出力する。
+    config / run_id / evaluation_output_dir 等の属性は EvaluationEngine が保持する。
+    """
+
+    def run_sweep(self) -> bool:
+        """パラメータスイープの実行
+
+        config.yaml の sweep.grid から Config のバリアントを生成し、各ビデオの入力を1回だけ読み込んで
+        全バリアントで推論・評価する。DataWareHouseへの登録は行わない。
+        """
+        try:
+            print(f"\n[{self.run_id}] パラメータスイープ開始")
+            
+            variants = self._build_sweep_variants()
+            print(f"  バリアント数: {len(variants)}")
+            
+            core_outputs = self._get_target_data()
+            
+            self._resolve_algorithm_version()
+            self.evaluation_output_dir = self.evaluation_dir / f"v{self.algorithm_version}" / f"sweep_{self.run_id}"
+            for variant in variants:
+                (self.evaluation_output_dir / variant['name']).mkdir(parents=True, exist_ok=True)
+            print(f"  スイープ出力ディレクトリ: {self.evaluation_output_dir}")
+            video_tags = self._prefetch_video_tags([core_output['video_ID'] for core_output in core_outputs])
+            
+            per_variant_results = self._run_sweep_inference(core_outputs, video_tags, variants)
+            
+            ranking = []
+            for variant in variants:
+                variant_dir = self.evaluation_output_dir / variant['name']
+                results = per_variant_results[variant['name']]
+                summary = self._build_evaluation_summary(
+                    [result['video_result'] for result in results if result['video_result']],
+                    frame_rate=variant['frame_rate'],
+                    config_overrides=variant['config_overrides'],
+                    untagged_videos=_untagged_timelines(results)
+                )
+                with open(variant_dir / "evaluation_summary.json", 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, ensure_ascii=False, indent=2)
+                overall = summary['evaluation_summary']['overall_results']
+                total_frames = sum(result['total_frames'] for result in results)
+                drowsy_frames = sum(result['drowsy_frames'] for result in results)
+                ranking.append({
+                    'variant': variant['name'],
+                    'params': variant['params'],
+                    'accuracy': overall['accuracy'],
+                    'total_num_correct': overall['total_num_correct'],
+                    'total_num_tasks': overall['total_num_tasks'],
+                    'detection_rate': drowsy_frames / total_frames if total_frames > 0 else 0.0,
+                    'batch_replay': variant.get('batch_replay', False)
+                })
+            
+            ranking.sort(key=lambda item: (-item['accuracy'], item['detection_rate']))
+            report_path = self._write_sweep_report(ranking)
+            print(f"  スイープレポート保存: {report_path}")
+            if ranking:
+                best = ranking[0]
+                print(f"  最良バリアント: {best['variant']} 正解率 {best['accuracy']:.3f} {best['params']}")
+            
+            print(f"\n[{self.run_id}] パラメータスイープ完了")
+            return True
+        
+        except Exception as e:
+            print(f"\n[{self.run_id}] パラメータスイープエラー: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def _build_sweep_variants(self) -> List[Dict[str, Any]]:
+        """sweep.grid の直積から Config バリアントを生成（frame_rate は algorithm.frame_rate を上書き）"""
+        grid = (self.config.get('sweep') or {}).get('grid') or {}
+        if not grid:
+            raise ValueError("sweep.grid が設定されていません")
+        
+        config = deps.drowsy_detection.Config()
+        unknown = [name for name in grid if name != 'frame_rate' and not hasattr(config, name)]
+        if unknown:
+            raise ValueError(f"Config に存在しないパラメータです: {', '.join(unknown)}")
+        
+        names = list(grid)
+        value_lists = [values if isinstance(values, list) else [values] for values in grid.values()]
+        variants = []
+        for index, values in enumerate(product(*value_lists)):
+            params = dict(zip(names, values))
+            variants.append({
+                'name': f"variant_{index:03d}",
+                'params': params,
+                'frame_rate': float(params.get('frame_rate', self.config['algorithm']['frame_rate'])),
+                'config_overrides': {name: value for name, value in params.items() if name != 'frame_rate'}
+            })
+        return variants
+
+    def _run_sweep_inference(self, core_outputs: List[Dict[str, Any]],
+                             video_tags: Dict[Any, List[Dict[str, Any]]],
+                             variants: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """全ビデオ×全バリアントの推論・評価（ビデオ単位でワーカーへ分散し、入力の読み込みは1回のみ）"""
+        print(f"[{self.run_id}] スイープ推論実行中...")
+        settings = dict(self._get_worker_settings(), replay_mode=self._get_sweep_replay_mode())
+        per_variant_results: Dict[str, List[Dict[str, Any]]] = {variant['name']: [] for variant in variants}
+        targets = [core_output for core_output in core_outputs if core_output['video_ID'] in video_tags]
+        # バッチ再生はバリアント（Config）ごとに参照実装と照合し、一致したバリアントのみで使用
+        if settings['replay_mode'] == 'verify':
+            for variant in variants:
+                print(f"  {variant['name']}:")
+                variant['batch_replay'] = self._verify_batch_replay(targets, variant['config_overrides'], variant['frame_rate'])
+        
+        def collect(video_id: Any, variant_results: Optional[Dict[str, Dict[str, Any]]]):
+            if not variant_results:
+                return
+            for name, result in variant_results.items():
+                if result['video_result']:
+                    csv_path = self.evaluation_output_dir / name / result['video_result']['result_file_path']
+                    pd.DataFrame(result['evaluation_result']).to_csv(csv_path, index=False)
+                # 評価CSV保存後はタスク明細を保持しない
+                per_variant_results[name].append({
+                    'video_id': video_id,
+                    'video_result': result['video_result'],
+                    'timeline': result['timeline'],
+                    'total_frames': result['total_frames'],
+                    'drowsy_frames': result['drowsy_frames']
+                })
+        
+        workers = self._get_parallel_workers()
+        if workers <= 1:
+            for core_output in targets:
+                try:
+                    collect(core_output['video_ID'], _sweep_single_video(
+                        core_output, video_tags[core_output['video_ID']], variants, settings))
+                except Exception as e:
+                    print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e}")
+        else:
+            print(f"  並列実行: ワーカー数={workers}")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                jobs = [(core_output, video_tags[core_output['video_ID']]) for core_output in targets]
+                for (core_output, _), future in _iter_bounded(
+                        executor, _sweep_single_video_job, jobs, (variants, settings), workers * 2):
+                    try:
+                        collect(core_output['video_ID'], future.result())
+                    except Exception as e:
+                        print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e}")
+        
+        print(f"  処理完了: {len(targets)}ビデオ × {len(variants)}バリアント")
+        return per_variant_results
+
+    def _get_sweep_replay_mode(self) -> str:
+        """スイープの推論方式（sweep.replay_mode。未設定時は replay.mode）
+
+        照合なしのバッチ再生は使用しないため、batch（旧設定）は verify として扱う。
+        """
+        mode = (self.config.get('sweep') or {}).get('replay_mode')
+        if mode is None:
+            return self._get_worker_settings()['replay_mode']
+        mode = str(mode).lower()
+        if mode == 'batch':
+            return 'verify'
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"sweep.replay_mode が不正です: {mode} ({' / '.join(REPLAY_MODES)})")
+        return mode
+
+    def _write_sweep_report(self, ranking: List[Dict[str, Any]]) -> str:
+        """バリアント比較ランキング（sweep_summary.json / sweep_report.md）の保存"""
+        with open(self.evaluation_output_dir / "sweep_summary.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'sweep_summary': {
+                    'run_id': self.run_id,
+                    'created_at': datetime.now().isoformat(),
+                    'algorithm_version': self.algorithm_version,
+                    'algorithm_commit_hash': self.algorithm_commit_hash,
+                    'grid': (self.config.get('sweep') or {}).get('grid'),
+                    'replay_mode': self._get_sweep_replay_mode(),
+                    'ranking': ranking
+                }
+            }, f, ensure_ascii=False, indent=2)
+        
+        lines = [
+            "# drowsy_detection パラメータスイープレポート",
+            "",
+            f"**実行日時**: {datetime.now().isoformat()}",
+            f"**実行ID**: `{self.run_id}`",
+            f"**アルゴリズムバージョン**: `{self.algorithm_version}`",
+            f"**コミットハッシュ**: `{self.algorithm_commit_hash}`",
+        ]
+        if self._get_sweep_replay_mode() == 'verify':
+            verified = sum(item['batch_replay'] for item in ranking)
+            lines.append(f"**推論方式**: バッチ再生（参照実装と一致したバリアント {verified}/{len(ranking)}件。"
+                         "不一致のバリアントは参照実装で推論）")
+        lines.extend([
+            "",
+            "## 🏆 バリアント別ランキング",
+            "",
+            "| 順位 | バリアント | パラメータ | 正解率 | 正解数/総数 | 検出率 |",
+            "|------|-----------|-----------|--------|------------|--------|",
+        ])
+        for rank, item in enumerate(ranking, start=1):
+            params = ", ".join(f"{name}={value}" for name, value in item['params'].items())
+            lines.append(
+                f"| {rank} | [{item['variant']}]({item['variant']}/evaluation_summary.json) | {params} | "
+                f"{item['accuracy'] * 100:.1f}% | {item['total_num_correct']}/{item['total_num_tasks']} | "
+                f"{item['detection_rate'] * 100:.2f}% |"
+            )
+        lines.extend(["", "---", "*このレポートは自動生成されました*"])
+        
+        report_path = self.evaluation_output_dir / "sweep_report.md"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        return str(report_path)
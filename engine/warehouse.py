@@ -0,0 +1,145 @@
+"""
+DataWareHouse への一括登録・一括取得
+
+登録は1トランザクションの明示的なSQL（DWHBulkWriter）、タグ取得は読み取り専用接続の IN 句で行う。
+DBのスキーマが想定と異なる場合は datawarehouse パッケージのAPI（deps.dwh）へフォールバックする。
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from engine import deps
+
+
+# DataWareHouse のDBに明示的なSQLで一括登録・一括取得するテーブルと必要な列
+DWH_BULK_TABLES: Dict[str, Tuple[str, ...]] = {
+    'tag_table': ('tag_ID', 'video_ID', 'start', 'end'),
+    'algorithm_output_table': ('algorithm_ID', 'core_lib_output_ID', 'algorithm_output_dir'),
+    'evaluation_result_table': ('version', 'algorithm_ID', 'true_positive', 'false_positive',
+                                'evaluation_result_dir', 'evaluation_timestamp'),
+    'evaluation_data_table': ('evaluation_result_ID', 'algorithm_output_ID', 'correct_task_num',
+                              'total_task_num', 'evaluation_data_path'),
+}
+# タグ一括取得の1クエリあたりのビデオ数（SQLiteのプレースホルダ数の上限未満）
+DWH_QUERY_BATCH_SIZE = 900
+
+
+def _dwh_has_columns(connection: sqlite3.Connection, table: str) -> bool:
+    """DataWareHouse のDBに table と DWH_BULK_TABLES の列がすべて存在するか"""
+    columns = {row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')}
+    return set(DWH_BULK_TABLES[table]) <= columns
+
+
+class DWHBulkWriter:
+    """DataWareHouse への一括登録（所有する単一のSQLite接続・単一トランザクション）
+
+    datawarehouse の登録APIは呼び出しごとに接続・commit するため、同じ行を明示的なSQLで登録し、
+    with ブロックを正常に抜けた時点で一括 commit、例外時は全件ロールバックする。
+    DBのスキーマが DWH_BULK_TABLES と異なる場合は datawarehouse のAPIを1件ずつ呼び出す
+    （この場合は呼び出しごとに確定し、一括ロールバックされない）。
+    """
+
+    def __init__(self, db_path: str, tables: Tuple[str, ...]):
+        self.db_path = db_path
+        self.tables = tables
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def __enter__(self) -> 'DWHBulkWriter':
+        connection = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            unsupported = [table for table in self.tables if not _dwh_has_columns(connection, table)]
+        except BaseException:
+            connection.close()
+            raise
+        if unsupported:
+            connection.close()
+            print(f"  DataWareHouseのスキーマが想定と異なるため ({', '.join(unsupported)})、"
+                  f"APIで1件ずつ登録します（失敗時の一括ロールバックなし）")
+            return self
+        connection.execute("BEGIN IMMEDIATE")
+        self.connection = connection
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection, self.connection = self.connection, None
+        if connection is None:
+            return False
+        try:
+            if exc_type is None:
+                connection.execute("COMMIT")
+            else:
+                connection.execute("ROLLBACK")
+        finally:
+            connection.close()
+        return False
+
+    def _insert(self, table: str, values: Dict[str, Any]) -> int:
+        columns = ", ".join(f'"{column}"' for column in values)
+        placeholders = ", ".join("?" for _ in values)
+        cursor = self.connection.execute(
+            f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders})', tuple(values.values()))
+        return cursor.lastrowid
+
+    def create_algorithm_output(self, algorithm_id: int, core_lib_output_id: int, output_dir: str) -> int:
+        if self.connection is None:
+            return deps.dwh.create_algorithm_output(algorithm_id=algorithm_id, core_lib_output_id=core_lib_output_id,
+                                               output_dir=output_dir, db_path=self.db_path)
+        return self._insert('algorithm_output_table', {
+            'algorithm_ID': algorithm_id,
+            'core_lib_output_ID': core_lib_output_id,
+            'algorithm_output_dir': output_dir,
+        })
+
+    def create_evaluation_result(self, version: str, algorithm_id: int, true_positive: Optional[float],
+                                 false_positive: Optional[float], evaluation_result_dir: str,
+                                 evaluation_timestamp: str) -> int:
+        if self.connection is None:
+            return deps.dwh.create_evaluation_result(
+                version=version, algorithm_id=algorithm_id, true_positive=true_positive,
+                false_positive=false_positive, evaluation_result_dir=evaluation_result_dir,
+                evaluation_timestamp=evaluation_timestamp, db_path=self.db_path)
+        return self._insert('evaluation_result_table', {
+            'version': version,
+            'algorithm_ID': algorithm_id,
+            'true_positive': true_positive,
+            'false_positive': false_positive,
+            'evaluation_result_dir': evaluation_result_dir,
+            'evaluation_timestamp': evaluation_timestamp,
+        })
+
+    def create_evaluation_data(self, evaluation_result_id: int, algorithm_output_id: int, correct_task_num: int,
+                               total_task_num: int, evaluation_data_path: str) -> int:
+        if self.connection is None:
+            return deps.dwh.create_evaluation_data(
+                evaluation_result_id=evaluation_result_id, algorithm_output_id=algorithm_output_id,
+                correct_task_num=correct_task_num, total_task_num=total_task_num,
+                evaluation_data_path=evaluation_data_path, db_path=self.db_path)
+        return self._insert('evaluation_data_table', {
+            'evaluation_result_ID': evaluation_result_id,
+            'algorithm_output_ID': algorithm_output_id,
+            'correct_task_num': correct_task_num,
+            'total_task_num': total_task_num,
+            'evaluation_data_path': evaluation_data_path,
+        })
+
+
+def _fetch_video_tags(db_path: str, video_ids: List[Any]) -> Optional[Dict[Any, List[Dict[str, Any]]]]:
+    """tag_table から対象ビデオのタグを読み取り専用の単一接続で一括取得（スキーマが想定と異なる場合は None）"""
+    connection = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        if not _dwh_has_columns(connection, 'tag_table'):
+            return None
+        connection.row_factory = sqlite3.Row
+        video_tags: Dict[Any, List[Dict[str, Any]]] = {video_id: [] for video_id in video_ids}
+        for offset in range(0, len(video_ids), DWH_QUERY_BATCH_SIZE):
+            batch = video_ids[offset:offset + DWH_QUERY_BATCH_SIZE]
+            rows = connection.execute(
+                f'SELECT * FROM tag_table WHERE video_ID IN ({", ".join("?" for _ in batch)}) ORDER BY tag_ID', batch)
+            for row in rows:
+                video_tags[row['video_ID']].append(dict(row))
+        return video_tags
+    finally:
+        connection.close()
@@ -0,0 +1,284 @@
+"""
+監視モード
+
+DataWareHouse を定期的にポーリングし、新しく登録されたコアライブラリ出力を到着順に推論・評価する
+常駐実行（--watch）。失敗したジョブはバックオフ後に再試行する。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import signal
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from engine import deps
+from engine.inference import _infer_single_video
+from engine.metrics import _timed
+
+
+class WatchJobTracker:
+    """監視モードのジョブ状態（完了・処理中・再試行待ち・破棄）
+
+    ジョブ（core_lib_output_ID）は評価とアルゴ出力登録に成功した時点で完了とする。
+    アルゴ出力の登録後に失敗したジョブは登録済みの集計結果を registered に保持し、再試行では登録を繰り返さない。
+    失敗したジョブは retry_backoff_seconds × 2^(失敗回数-1) 秒後のポーリングで再投入し、
+    max_retries 回再試行しても失敗した場合は破棄する。時刻はイベントループの loop.time() を使用する。
+    """
+
+    def __init__(self, max_retries: int, retry_backoff_seconds: float):
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.completed: Set[int] = set()
+        self.active: Set[int] = set()
+        self.abandoned: Set[int] = set()
+        self.failures: Dict[int, int] = {}
+        self.retry_at: Dict[int, float] = {}
+        self.registered: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+    def take_ready(self, core_outputs: List[Dict[str, Any]], now: float) -> List[Dict[str, Any]]:
+        """ポーリング結果のうち投入可能なジョブ（未処理、またはバックオフの経過した再試行）を処理中にして返す"""
+        ready = []
+        for core_output in core_outputs:
+            job_id = core_output['core_lib_output_ID']
+            if job_id in self.completed or job_id in self.active or job_id in self.abandoned:
+                continue
+            if self.retry_at.get(job_id, now) > now:
+                continue
+            self.retry_at.pop(job_id, None)
+            self.active.add(job_id)
+            ready.append(core_output)
+        return ready
+
+    def succeeded(self, job_id: int):
+        self.active.discard(job_id)
+        self.failures.pop(job_id, None)
+        self.registered.pop(job_id, None)
+        self.completed.add(job_id)
+
+    def failed(self, job_id: int, now: float) -> Optional[float]:
+        """失敗を記録し、再試行までの待ち時間（秒）を返す（再試行上限に達した場合 None）"""
+        self.active.discard(job_id)
+        attempts = self.failures[job_id] = self.failures.get(job_id, 0) + 1
+        if attempts > self.max_retries:
+            self.abandoned.add(job_id)
+            return None
+        delay = self.retry_backoff_seconds * 2 ** (attempts - 1)
+        self.retry_at[job_id] = now + delay
+        return delay
+
+
+class WatchMixin:
+    """EvaluationEngine の監視モード
+
+    推論はワーカープロセス、DataWareHouse へのアクセスと評価・ロールアップはそれぞれ専用スレッドで行う。
+    config / run_id / metrics / checkpoint 等の属性は EvaluationEngine が保持する。
+    """
+
+    def run_watch(self) -> bool:
+        """監視モード（デーモン）の実行
+
+        エンジン（インポート・設定・バージョン確定）を常駐させ、DataWareHouseを定期的にポーリングして
+        新しく登録されたコアライブラリ出力を到着順に評価する。評価結果は一定間隔でサマリ・レポートに反映し、
+        終了時（SIGINT / SIGTERM、または watch.max_runtime_minutes 経過）に評価結果を登録する。
+        """
+        try:
+            print(f"\n[{self.run_id}] 監視モード開始")
+            self._prepare_execution()
+            self.output_writer = self._create_output_writer()
+            with self.metrics.stage('inference_loop'):
+                video_results = asyncio.run(self._watch_loop())
+            
+            print(f"[{self.run_id}] 監視終了: 評価 {len(video_results)}件")
+            self._finish_evaluation(video_results)
+            print(f"\n[{self.run_id}] 監視モード完了")
+            return True
+        
+        except Exception as e:
+            print(f"\n[{self.run_id}] 監視モードエラー: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+        
+        finally:
+            if self.output_writer:
+                self.output_writer.close()
+                self.output_writer = None
+
+    def _get_watch_config(self) -> Dict[str, Any]:
+        """監視モード設定（watch）"""
+        watch_config = self.config.get('watch') or {}
+        return {
+            'poll_interval_seconds': float(watch_config.get('poll_interval_seconds', 5)),
+            'max_concurrency': max(1, int(watch_config.get('max_concurrency', 2))),
+            'rollup_interval_seconds': float(watch_config.get('rollup_interval_seconds', 60)),
+            'process_existing': bool(watch_config.get('process_existing', False)),
+            'max_runtime_minutes': watch_config.get('max_runtime_minutes'),
+            'max_retries': max(0, int(watch_config.get('max_retries', 3))),
+            'retry_backoff_seconds': float(watch_config.get('retry_backoff_seconds', 30)),
+        }
+
+    async def _watch_loop(self) -> List[Dict[str, Any]]:
+        """ポーリング・ジョブキュー・定期ロールアップのイベントループ（評価したビデオの集計結果を返す）
+
+        推論はワーカープロセス（最大 max_concurrency 件を同時実行）、DataWareHouseへのアクセスと
+        評価・ロールアップはそれぞれ専用スレッドで直列に行い、イベントループ自体はブロックしない。
+        評価とアルゴ出力登録に失敗したジョブは WatchJobTracker のバックオフ後に再投入する。
+        """
+        watch_config = self._get_watch_config()
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        
+        dwh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dwh")
+        evaluation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="evaluation")
+        inference_executor = ProcessPoolExecutor(max_workers=watch_config['max_concurrency'])
+        jobs: asyncio.Queue = asyncio.Queue()
+        video_results: List[Dict[str, Any]] = []
+        consumers = []
+        try:
+            algorithm_id = await loop.run_in_executor(dwh_executor, self._register_algorithm_version)
+            if algorithm_id is None:
+                raise RuntimeError("アルゴリズムバージョンを登録できません")
+            self.inference_cache = self._create_inference_cache()
+            
+            # 到着するビデオは事前に分からないため、バッチ再生は境界値の検証系列のみで照合
+            if self._get_worker_settings()['replay_mode'] == 'verify':
+                self.batch_replay = self._verify_batch_replay([])
+            
+            tracker = WatchJobTracker(watch_config['max_retries'], watch_config['retry_backoff_seconds'])
+            if not watch_config['process_existing']:
+                existing = await loop.run_in_executor(dwh_executor, self._list_core_lib_outputs)
+                tracker.completed.update(core_output['core_lib_output_ID'] for core_output in existing)
+                print(f"  登録済みのコアライブラリ出力 {len(existing)}件は対象外（watch.process_existing: false）")
+            
+            executors = (dwh_executor, evaluation_executor, inference_executor)
+            consumers = [
+                asyncio.create_task(self._watch_worker(jobs, executors, tracker, algorithm_id, video_results))
+                for _ in range(watch_config['max_concurrency'])
+            ]
+            print(f"  ポーリング間隔: {watch_config['poll_interval_seconds']}秒, 同時実行数: {watch_config['max_concurrency']}, "
+                  f"再試行: 最大{watch_config['max_retries']}回")
+            
+            max_runtime = watch_config['max_runtime_minutes']
+            deadline = loop.time() + float(max_runtime) * 60 if max_runtime is not None else None
+            last_rollup = loop.time()
+            rolled_up = 0
+            while not stop.is_set():
+                try:
+                    core_outputs = await loop.run_in_executor(dwh_executor, self._list_core_lib_outputs)
+                except Exception as e:
+                    print(f"  ポーリングエラー: {e}")
+                    core_outputs = []
+                new_outputs = tracker.take_ready(core_outputs, loop.time())
+                for core_output in new_outputs:
+                    jobs.put_nowait(core_output)
+                if new_outputs:
+                    print(f"[{self.run_id}] 新しいコアライブラリ出力: {len(new_outputs)}件 (待ち {jobs.qsize()}件)")
+                
+                # 新しい結果があれば一定間隔でサマリ・レポートを更新（評価スレッドで実行）
+                if len(video_results) != rolled_up and loop.time() - last_rollup >= watch_config['rollup_interval_seconds']:
+                    rolled_up = len(video_results)
+                    last_rollup = loop.time()
+                    await loop.run_in_executor(evaluation_executor, self._rollup_watch_results,
+                                               self._sort_watch_results(video_results))
+                
+                if deadline is not None and loop.time() >= deadline:
+                    print(f"[{self.run_id}] 最大実行時間に達しました")
+                    break
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=watch_config['poll_interval_seconds'])
+                except asyncio.TimeoutError:
+                    pass
+            
+            # 受け付け済みのジョブを処理してから終了
+            if not jobs.empty():
+                print(f"[{self.run_id}] 終了前に待ち {jobs.qsize()}件を処理中...")
+            await jobs.join()
+            if tracker.retry_at:
+                print(f"[{self.run_id}] 再試行待ちのまま終了: {len(tracker.retry_at)}件（次回の監視モードで処理）")
+            if tracker.abandoned:
+                print(f"[{self.run_id}] 再試行上限に達したジョブ: {len(tracker.abandoned)}件 "
+                      f"(core_lib_output_ID={sorted(tracker.abandoned)})")
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            inference_executor.shutdown(wait=True)
+            evaluation_executor.shutdown(wait=True)
+            dwh_executor.shutdown(wait=True)
+            for signal_number in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.remove_signal_handler(signal_number)
+                except (NotImplementedError, RuntimeError):
+                    pass
+        return self._sort_watch_results(video_results)
+
+    async def _watch_worker(self, jobs: asyncio.Queue, executors: Tuple[Executor, Executor, Executor],
+                            tracker: WatchJobTracker, algorithm_id: int, video_results: List[Dict[str, Any]]):
+        """ジョブキューから1件ずつ取り出し、推論 → タグ取得 → 評価 → アルゴ出力登録を行う
+
+        executors は (DataWareHouse用, 評価用, 推論用)。アルゴ出力の登録後のチェックポイント・メトリクス記録まで
+        成功したジョブのみ完了とし、失敗したジョブ（コアCSV未配置を含む）は tracker に失敗を記録して再試行に回す。
+        登録済みのジョブの再試行は推論・評価・登録を省略し、登録後の処理のみ行う。
+        """
+        loop = asyncio.get_running_loop()
+        dwh_executor, evaluation_executor, inference_executor = executors
+        settings = self._get_worker_settings()
+        while True:
+            core_output = await jobs.get()
+            core_lib_output_id = core_output['core_lib_output_ID']
+            try:
+                if core_lib_output_id in tracker.registered:
+                    aggregate, record = tracker.registered[core_lib_output_id]
+                else:
+                    inferred = await loop.run_in_executor(inference_executor, _infer_single_video, core_output, settings)
+                    if not inferred:
+                        raise RuntimeError("推論結果がありません（コアCSVの未配置・読み込みエラー）")
+                    self._record_inference_stats(inferred)
+                    video_tags = await loop.run_in_executor(dwh_executor, self._prefetch_video_tags, [inferred['video_id']])
+                    record = dict(inferred.get('metrics') or {}, video_id=inferred['video_id'],
+                                  algo_output_path=str(inferred['algo_csv_path']))
+                    aggregate = await loop.run_in_executor(evaluation_executor, self._evaluate_watch_video,
+                                                           inferred, video_tags.get(inferred['video_id']), record)
+                    
+                    await loop.run_in_executor(dwh_executor, self._register_algorithm_outputs, [aggregate], algorithm_id)
+                    tracker.registered[core_lib_output_id] = (aggregate, record)
+                self._checkpoint_video(aggregate)
+                if self.checkpoint:
+                    self.checkpoint.append('algorithm_outputs', ids={str(core_lib_output_id): aggregate['algorithm_output_id']})
+                self.metrics.add_video(record)
+                video_results.append(aggregate)
+                tracker.succeeded(core_lib_output_id)
+            except Exception as e:
+                retry_delay = tracker.failed(core_lib_output_id, loop.time())
+                if retry_delay is None:
+                    print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e} → 再試行上限のため破棄")
+                else:
+                    print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e} → {retry_delay:.0f}秒後に再試行 "
+                          f"({tracker.failures[core_lib_output_id]}/{tracker.max_retries})")
+            finally:
+                jobs.task_done()
+
+    def _evaluate_watch_video(self, inferred: Dict[str, Any], tags: Optional[List[Dict[str, Any]]],
+                              record: Dict[str, Any]) -> Dict[str, Any]:
+        """監視モードのビデオ評価（評価スレッドで実行し、処理時間を record に記録）"""
+        with _timed(record, 'evaluate'):
+            return self._evaluate_video(inferred, tags)
+
+    def _rollup_watch_results(self, video_results: List[Dict[str, Any]]):
+        """監視モードの途中結果でサマリ・レポートを更新（評価スレッドで実行）"""
+        with self.metrics.stage('report_generation'):
+            self._run_evaluation_logic(video_results)
+
+    def _sort_watch_results(self, video_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """監視モードの集計結果を到着順によらず core_lib_output_ID 順に並べる"""
+        return sorted(video_results, key=lambda result: result['core_lib_output_id'])
+
+    def _list_core_lib_outputs(self) -> List[Dict[str, Any]]:
+        """DataWareHouseに登録済みのコアライブラリ出力の一覧（監視モードのポーリング用）"""
+        return deps.dwh.list_core_lib_outputs(db_path=self.db_path)
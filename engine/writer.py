@@ -0,0 +1,137 @@
+"""
+出力ファイルの書き込み
+
+アルゴリズム出力（csv / parquet / feather）の保存・読み込み、JSON・テキストの保存と、
+出力ファイルを専用スレッドで書き込む非同期ライタ（AsyncOutputWriter）。
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+from engine.deps import np, pd
+from engine.metrics import _timed
+
+
+# アルゴリズム出力の保存形式と拡張子（parquet / feather は pyarrow が必要）
+ALGO_OUTPUT_SUFFIXES = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+
+class AsyncOutputWriter:
+    """出力ファイルを専用スレッドで直列に書き込むライタ
+
+    submit() は有界キューが満杯の場合のみ待機し、推論・評価は書き込み完了を待たずに継続する。
+    書き込みエラーは記録しておき、flush() で全件の完了を待った後に送出する。
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self._errors: List[str] = []
+        # 書き込みに要した実時間・CPU時間と件数（実行メトリクス用）
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.num_written = 0
+        self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                description, func, args, kwargs = item
+                timing: Dict[str, float] = {}
+                try:
+                    with _timed(timing, 'write'):
+                        func(*args, **kwargs)
+                    self.num_written += 1
+                except Exception as e:
+                    print(f"      書き込みエラー ({description}): {e}")
+                    self._errors.append(f"{description}: {e}")
+                self.busy_seconds += timing.get('write_seconds', 0.0)
+                self.cpu_seconds += timing.get('write_cpu_seconds', 0.0)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, description: str, func, *args, **kwargs):
+        """書き込みをキューへ投入（description はエラー表示用）"""
+        if not self._thread.is_alive():
+            raise RuntimeError("出力ライタは終了しています")
+        self._queue.put((description, func, args, kwargs))
+
+    @property
+    def has_errors(self) -> bool:
+        """未報告の書き込みエラーがあるか（書き込みスレッドから後続の処理を判断する用途）"""
+        return bool(self._errors)
+
+    def flush(self):
+        """投入済みの書き込みがすべて完了するまで待機し、失敗があれば RuntimeError を送出"""
+        self._queue.join()
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise RuntimeError(f"出力ファイルの書き込みに失敗しました ({len(errors)}件): {errors[0]}")
+
+    def close(self):
+        """未完了の書き込みを待ってスレッドを終了"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+def _write_algo_output(algo_df: pd.DataFrame, path: Path, output_format: str = 'csv'):
+    """アルゴリズム出力の保存
+
+    csv は従来どおりの列・値で保存する。parquet / feather はフラグを bool、continuous_time を float32、
+    error_code をカテゴリ型に変換して保存する（feather はメモリマップで読めるよう非圧縮）。
+    """
+    if output_format == 'csv':
+        algo_df.to_csv(path, index=False)
+        return
+    
+    compact_df = pd.DataFrame({
+        'frame_num': algo_df['frame_num'].to_numpy().astype(np.int32),
+        'is_drowsy': algo_df['is_drowsy'].to_numpy().astype(bool),
+        'left_eye_closed': algo_df['left_eye_closed'].to_numpy().astype(bool),
+        'right_eye_closed': algo_df['right_eye_closed'].to_numpy().astype(bool),
+        'continuous_time': algo_df['continuous_time'].to_numpy().astype(np.float32),
+        'error_code': pd.Categorical(algo_df['error_code'].fillna('').astype(str))
+    })
+    if output_format == 'parquet':
+        compact_df.to_parquet(path, index=False, engine='pyarrow')
+    elif output_format == 'feather':
+        compact_df.to_feather(path, compression='uncompressed')
+    else:
+        raise ValueError(f"未対応の保存形式です: {output_format}")
+
+
+def _write_json(path: Path, data: Any):
+    """JSONファイルの保存"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _write_text(path: Path, text: str):
+    """テキストファイルの保存"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _read_algo_output(path: Path) -> pd.DataFrame:
+    """アルゴリズム出力の読み込み（形式は拡張子で判定。parquet / feather はメモリマップで読み込む）"""
+    path = Path(path)
+    if path.suffix == ALGO_OUTPUT_SUFFIXES['parquet']:
+        return pd.read_parquet(path, engine='pyarrow', memory_map=True)
+    if path.suffix == ALGO_OUTPUT_SUFFIXES['feather']:
+        import pyarrow.feather as feather
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_csv(
+        path,
+        dtype={'error_code': str},
+        keep_default_na=False,
+        float_precision='round_trip'
+    )
@@ -3,52 +3,138 @@
 drowsy_detection 評価エンジン メイン実装
 
 仕様書: docs/EVALUATION_SPEC.md に基づく評価エンジン
+CLI と評価実行の流れ（EvaluationEngine）を定義し、各処理の実装は engine/ パッケージのモジュールに置く。
 """
 
+from __future__ import annotations
+
 import sys
 import os
+import argparse
 import json
-import yaml
-import pandas as pd
-import subprocess
+import runpy
+import shutil
+import time
+import sqlite3
+import pstats
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+import importlib
+import importlib.metadata
+import importlib.util
+
+from engine import deps
+from engine.deps import yaml, np, pd
+from engine.metrics import _timed, RunMetrics, _format_metrics_lines
+from engine.writer import ALGO_OUTPUT_SUFFIXES, _write_json, AsyncOutputWriter
+from engine.hashing import _hash_tags
+from engine.cache import InferenceCache
+from engine.store import DEFAULT_FLOAT_DTYPE, CoreInputStore
+from engine.algorithm import AlgorithmVersionMixin, _get_installed_commit_hash, _get_loaded_algorithm_identity
+from engine.journal import CheckpointJournal, CheckpointMixin
+from engine.warehouse import DWHBulkWriter, _fetch_video_tags
+from engine.detector import _describe_detector_config, _get_replay_mode
+from engine.evaluation import _evaluate_tags, _evaluate_timeline, _timeline_rates, _summarize_video_tasks, _overall_results, _untagged_timelines
+from engine.report import REPORT_DETAIL_LEVELS, REPORT_DETAILS_DIR, _get_report_settings, _format_ratio, _format_timeline_log, _write_markdown_report, _resolve_evaluation_dir, _rebuild_report, _show_summary
+from engine.inference import _infer_single_video, _iter_bounded
+from engine.incremental import IncrementalMixin
+from engine.replay import ReplayVerificationMixin
+from engine.sweep import SweepMixin
+from engine.compare import CompareMixin
+from engine.shard import ShardMixin, _parse_shard
+from engine.watch import WatchMixin
+
+
+# サブコマンド（省略時は run）
+CLI_COMMANDS = ('run', 'report', 'summary', 'bench')
+# bench サブコマンドで実行するベンチマークスクリプト（benchmarks/bench_{name}.py）
+BENCHMARKS_DIR = Path(__file__).resolve().parent / "benchmarks"
 
-# DataWareHouseパッケージのインポート
-import datawarehouse as dwh
-from drowsy_detection import DrowsyDetector, InputData, OutputData, Config
-import drowsy_detection
 
+class EvaluationEngine(AlgorithmVersionMixin, CheckpointMixin, IncrementalMixin, ReplayVerificationMixin, SweepMixin, CompareMixin,
+                       ShardMixin, WatchMixin):
+    """評価エンジンメインクラス
 
-class EvaluationEngine:
-    """評価エンジンメインクラス"""
+    バージョン確認・チェックポイント・差分評価・バッチ再生の照合・スイープ・バージョン比較・シャード実行・監視モードは
+    engine/ の各 Mixin に実装し、このクラスは設定・状態の保持と通常の評価実行の流れを担う。
+    """
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", use_cache: bool = True, incremental: bool = False,
+                 profile: bool = False, resume_run_id: Optional[str] = None, run_id: Optional[str] = None,
+                 shard: Optional[Tuple[int, int]] = None):
         """
         評価エンジンの初期化
         
         Args:
             config_path: 設定ファイルのパス
+            use_cache: 推論キャッシュを使用するか（False で --no-cache 相当）
+            incremental: 差分評価モード（入力・タグが前回から変わっていないビデオは結果を再利用）
+            profile: 推論ループを cProfile で計測し、評価ディレクトリへ pstats を出力
+            resume_run_id: 中断した実行の run_id（チェックポイントから完了済みのビデオを再利用して再開）
+            run_id: 実行IDを指定（シャード実行では全シャードで同じ値を指定。未指定時は日時から生成）
+            shard: (シャード番号, シャード数)。video_id で分割した担当分のみ推論し、部分結果を出力（統合は run_merge）
         """
-        self.config = self._load_config(config_path)
-        self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        # ステージ別・ビデオ別の処理時間等の計測（metrics.json に出力）
+        self.metrics = RunMetrics()
+        with self.metrics.stage('config_load'):
+            self.config = self._load_config(config_path)
+        self.use_cache = use_cache
+        self.incremental = incremental
+        self.profile = profile
+        self.run_id = resume_run_id or run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.shard = shard
+        # シャード実行時の core_lib_output_ID -> シャード分割前の全体での順序
+        self._shard_orders: Dict[Any, int] = {}
+        # シャード統合時に取り込んだ各シャードの実行メトリクスの概要
+        self.shard_metrics: List[Dict[str, Any]] = []
         self.db_path = os.path.abspath(self.config['datawarehouse']['database_path'])
         
         # 出力ディレクトリの設定
         self.output_base_dir = Path(self.config['output']['base_dir'])
         self.evaluation_dir = Path(self.config['output']['evaluation_dir'])
         
-        # アルゴリズム情報の取得
-        self.algorithm_commit_hash = self._get_algorithm_commit_hash()
+        # チェックポイントジャーナル（実行準備で生成）と、再開時に読み込んだ中断前の進捗
+        self.checkpoint: Optional[CheckpointJournal] = None
+        self.resume_state = self._load_resume_state(resume_run_id) if resume_run_id else None
+        # 再開で再利用した完了済みビデオ数
+        self.num_resumed_videos = 0
+        
+        # アルゴリズム情報の取得（リモート確認はバックグラウンドで開始し、実行準備で1つのバージョンに確定する）
+        self.algorithm_version_source: Optional[str] = None
+        self._remote_commit_check = self._start_algorithm_version_check()
+        if self.resume_state:
+            self.algorithm_commit_hash = self.resume_state['run']['algorithm_commit_hash']
+        else:
+            self.algorithm_commit_hash = (
+                _get_installed_commit_hash() or self._load_version_cache().get('remote_commit') or "unknown"
+            )
         # drowsy_detectionのバージョンをコミットハッシュで動的生成
-        self.algorithm_version = self._get_dynamic_version(drowsy_detection.__version__, self.algorithm_commit_hash)
+        self.algorithm_version = self._get_dynamic_version(deps.drowsy_detection.__version__, self.algorithm_commit_hash)
+        # アルゴリズム出力ディレクトリ（実行準備で作成。パラメータスイープでは作成しない）
+        self.run_output_dir: Optional[Path] = None
         # アルゴリズムID（登録後に保持し、評価登録で使用）
         self.algorithm_id: Optional[int] = None
+        # 推論キャッシュ（推論開始時に生成）とヒット/ミス件数
+        self.inference_cache: Optional[InferenceCache] = None
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        # 差分評価で再利用したビデオ数
+        self.num_reused_videos = 0
+        # バッチ再生の使用可否（replay.mode: verify 時に推論開始前の照合で一致した場合のみ真）
+        self.batch_replay = False
+        # 推論方式ごとのビデオ数（バッチ再生 / 照合不一致による参照実装へのフォールバック）
+        self.replay_stats = {'batch': 0, 'fallback': 0}
+        # チャンク分割推論のビデオ数（分割して推論 / 境界の状態不一致・照合不一致による逐次推論へのフォールバック）
+        self.chunk_stats = {'chunked': 0, 'chunk_fallback': 0}
+        # コアCSV入力のメモリマップストア（無効時は None）
+        self.core_input_store = self._create_core_input_store()
+        # 出力ファイルの非同期ライタ（評価実行中のみ。無効時は None で同期書き込み）
+        self.output_writer: Optional[AsyncOutputWriter] = None
         
         print(f"[{self.run_id}] 評価エンジン初期化完了")
         print(f"  Database: {self.db_path}")
-        print(f"  Algorithm version: {self.algorithm_version}")
+        print(f"  Algorithm version: {self.algorithm_version} (実行準備で確定)")
         print(f"  Algorithm commit hash: {self.algorithm_commit_hash}")
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
@@ -60,115 +146,43 @@ class EvaluationEngine:
             print(f"設定ファイルの読み込みに失敗: {e}")
             raise
     
-    def _get_algorithm_commit_hash(self) -> str:
-        """アルゴリズムのGitコミットハッシュを取得"""
-        try:
-            result = subprocess.run(
-                ["git", "ls-remote", self.config['algorithm']['git_repo'], "HEAD"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                return result.stdout.strip().split('\t')[0]
-            else:
-                return "unknown"
-        except Exception:
-            return "unknown"
-
-    def _check_and_update_algorithm(self) -> str:
-        """drowsy_detectionの最新版を確認・更新し、新しいコミットハッシュを返す"""
-        try:
-            print(f"[{self.run_id}] drowsy_detectionの更新チェック中...")
-
-            # リモートリポジトリの最新コミットハッシュを取得
-            result = subprocess.run(
-                ["git", "ls-remote", self.config['algorithm']['git_repo'], "HEAD"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            if result.returncode != 0:
-                print(f"[{self.run_id}] リモートコミット取得失敗、現在のバージョンを使用")
-                return self.algorithm_commit_hash
-
-            remote_commit = result.stdout.strip().split('\t')[0]
-
-            # 現在のコミットハッシュと比較
-            if remote_commit == self.algorithm_commit_hash:
-                print(f"[{self.run_id}] drowsy_detectionは最新版です (commit: {remote_commit[:8]})")
-                return remote_commit
-
-            # 新しいコミットがある場合、更新を試行
-            print(f"[{self.run_id}] 新しいコミットが見つかりました: {remote_commit[:8]} (現在: {self.algorithm_commit_hash[:8]})")
-            print(f"[{self.run_id}] drowsy_detectionを更新中...")
-
-            # pip installで最新版をインストール
-            install_result = subprocess.run(
-                ["uv", "pip", "install", f"git+{self.config['algorithm']['git_repo']}", "--quiet"],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5分タイムアウト
-            )
-
-            if install_result.returncode == 0:
-                print(f"[{self.run_id}] drowsy_detection更新完了")
-                # モジュールをリロードして新しいバージョンを反映
-                import importlib
-                importlib.reload(drowsy_detection)
-
-                # 新しいバージョンを取得してインスタンス変数を更新
-                new_version = drowsy_detection.__version__
-                self.algorithm_version = self._get_dynamic_version(new_version, remote_commit)
-                self.algorithm_commit_hash = remote_commit
-
-                print(f"[{self.run_id}] バージョン更新: {self.algorithm_version}")
-                return remote_commit
-            else:
-                print(f"[{self.run_id}] 更新失敗、使用可能な最新コミットを使用: {remote_commit[:8]}")
-                return remote_commit
-
-        except Exception as e:
-            print(f"[{self.run_id}] drowsy_detection更新チェックエラー: {e}")
-            return self.algorithm_commit_hash
-
-    def _get_dynamic_version(self, base_version: str, commit_hash: str) -> str:
-        """コミットハッシュベースで動的バージョンを生成"""
-        if commit_hash == "unknown" or not commit_hash:
-            return base_version
-        
-        # コミットハッシュの最初の8文字を使用
-        short_hash = commit_hash[:8]
-        
-        # ベースバージョンが0.1.0で、新しいコミットがある場合は0.1.1として扱う
-        if base_version == "0.1.0" and commit_hash != "e3803bb59fc690e096f82af4e7ba4aff235537ac":
-            return f"0.1.1+{short_hash}"
-        
-        return f"{base_version}+{short_hash}"
-    
     def run_evaluation(self) -> bool:
         """評価エンジンのメイン実行"""
         try:
-            print(f"\n[{self.run_id}] 評価開始")
+            if self.resume_state and self.resume_state['completed']:
+                print(f"\n[{self.run_id}] この実行は完了済みのため再開不要です")
+                return True
+            print(f"\n[{self.run_id}] 評価{'再開' if self.resume_state else '開始'}")
             
-            # 1. 実行準備
-            self._prepare_execution()
-            
-            # 2. 対象データ取得
+            # 1. 対象データ取得（アルゴリズムのリモート確認と並行。シャード実行時は担当分のみ）
             core_outputs = self._get_target_data()
+            if self.shard:
+                core_outputs = self._select_shard_outputs(core_outputs)
             
-            # 3. 推論とアルゴCSV出力
-            algorithm_results = self._run_algorithm_inference(core_outputs)
+            # 2. 実行準備（バージョン確定・出力ディレクトリ作成）
+            self._prepare_execution()
+            self.output_writer = self._create_output_writer()
             
-            # 4. 評価
-            evaluation_results = self._run_evaluation_logic(algorithm_results)
+            # 3. 推論・アルゴCSV出力・ビデオ単位の評価（タグ情報は推論と並行して一括取得）
+            with ThreadPoolExecutor(max_workers=1) as tag_loader:
+                tags_future = tag_loader.submit(
+                    self._prefetch_video_tags,
+                    [core_output['video_ID'] for core_output in core_outputs]
+                )
+                video_results = self._run_algorithm_inference(core_outputs, tags_future)
             
-            # 5. 評価結果をDBへ登録（新API対応）
-            register_summary = self._register_evaluation_to_db(algorithm_results, evaluation_results)
+            # シャード実行: 部分結果を保存して終了（サマリ・レポート・評価結果登録は run_merge で全シャード分をまとめて行う）
+            if self.shard:
+                self._flush_outputs()
+                self._write_shard_partial(video_results)
+                self._write_metrics()
+                if self.checkpoint:
+                    self.checkpoint.append('completed')
+                print(f"\n[{self.run_id}] シャード {self.shard[0]}/{self.shard[1]} 完了")
+                return True
             
-            # 6. ログ出力
-            self._write_log(evaluation_results, register_summary)
+            # 4〜6. サマリ・レポート生成、評価結果のDB登録、メトリクス・ログ出力
+            self._finish_evaluation(video_results)
             
             print(f"\n[{self.run_id}] 評価完了")
             return True
@@ -178,13 +192,119 @@ class EvaluationEngine:
             import traceback
             traceback.print_exc()
             return False
+        
+        finally:
+            if self.output_writer:
+                self.output_writer.close()
+                self.output_writer = None
+    
+    def _finish_evaluation(self, video_results: List[Dict[str, Any]]):
+        """ビデオ単位の集計結果からサマリ・レポートを生成し、評価結果の登録・マニフェスト・メトリクス・ログを出力"""
+        # 4. 評価（ビデオ単位の集計結果からサマリ・レポートを生成）
+        with self.metrics.stage('report_generation'):
+            evaluation_results = self._run_evaluation_logic(video_results)
+        
+        # 5. 評価結果をDBへ登録（新API対応。評価CSV・サマリ・レポートの書き込み完了後）
+        self._flush_outputs()
+        registered_evaluation = self.resume_state and self.resume_state['evaluation']
+        if registered_evaluation:
+            # 中断前に登録済み（二重登録しない）
+            register_summary = {key: registered_evaluation[key] for key in ('evaluation_result_id', 'num_evaluation_data')}
+            print(f"[{self.run_id}] 評価結果は登録済み: evaluation_result_ID={register_summary['evaluation_result_id']}")
+        else:
+            with self.metrics.stage('evaluation_registration'):
+                register_summary = self._register_evaluation_to_db(video_results, evaluation_results)
+            if self.checkpoint and register_summary['evaluation_result_id'] is not None:
+                self.checkpoint.append('evaluation', **register_summary)
+        
+        # 差分評価用マニフェストの更新
+        with self.metrics.stage('incremental_manifest'):
+            self._update_incremental_manifest(video_results)
+        
+        # 6. メトリクス・ログ出力
+        metrics_summary = self._write_metrics()
+        self._write_log(evaluation_results, register_summary, metrics_summary)
+        if self.checkpoint:
+            self.checkpoint.append('completed')
+    
+    def _get_profile_dir(self) -> Path:
+        """--profile 時のビデオ別 cProfile 出力先"""
+        return self.evaluation_output_dir / self._shard_artifact("profile")
+
+    def _write_metrics(self) -> Dict[str, Any]:
+        """実行メトリクスを集計して metrics.json に保存（--profile 時は pstats も集約）"""
+        self._flush_outputs()
+        if self.output_writer:
+            self.metrics.add_stage('async_write', self.output_writer.busy_seconds, self.output_writer.cpu_seconds,
+                                   count=self.output_writer.num_written)
+        
+        # 書き込み量は出力ファイルのサイズから算出
+        for record in self.metrics.videos:
+            algo_output_path = Path(record['algo_output_path'])
+            record['bytes_written'] = algo_output_path.stat().st_size if algo_output_path.exists() else 0
+        bytes_written = sum(
+            path.stat().st_size
+            for directory in (self.run_output_dir, self.evaluation_output_dir)
+            for path in directory.rglob('*') if path.is_file()
+        )
+        
+        metrics_summary = {'run_id': self.run_id, **self.metrics.summary(bytes_written)}
+        if self.shard_metrics:
+            metrics_summary['shards'] = self.shard_metrics
+        if self.profile:
+            metrics_summary['profile'] = self._merge_profiles()
+        
+        metrics_path = self.evaluation_output_dir / self._shard_artifact("metrics.json")
+        _write_json(metrics_path, {'metrics': metrics_summary})
+        print(f"[{self.run_id}] メトリクス保存: {metrics_path}")
+        return metrics_summary
+
+    def _merge_profiles(self) -> Optional[Dict[str, str]]:
+        """ビデオ別の cProfile 出力を1つの pstats に集約し、累積時間上位の一覧をテキストで保存"""
+        profile_dir = self._get_profile_dir()
+        profile_files = sorted(profile_dir.glob("*.prof"))
+        if not profile_files:
+            return None
+        
+        stats_path = self.evaluation_output_dir / self._shard_artifact("detector_profile.pstats")
+        text_path = self.evaluation_output_dir / self._shard_artifact("detector_profile.txt")
+        with open(text_path, 'w', encoding='utf-8') as f:
+            stats = pstats.Stats(str(profile_files[0]), stream=f)
+            for profile_file in profile_files[1:]:
+                stats.add(str(profile_file))
+            stats.dump_stats(str(stats_path))
+            stats.sort_stats('cumulative').print_stats(40)
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        print(f"[{self.run_id}] プロファイル保存: {stats_path}")
+        return {'pstats': stats_path.name, 'text': text_path.name}
+
+    def _create_output_writer(self) -> Optional['AsyncOutputWriter']:
+        """出力ファイルの非同期ライタを生成（output.async_write が偽の場合は None）"""
+        output_config = self.config['output']
+        if not output_config.get('async_write', False):
+            return None
+        return AsyncOutputWriter(max_pending=int(output_config.get('write_queue_size', 8)))
+
+    def _write_output(self, description: str, func, *args, **kwargs):
+        """出力ファイルの書き込み（非同期ライタ使用時はキューへ投入し、推論・評価を継続）"""
+        if self.output_writer:
+            self.output_writer.submit(description, func, *args, **kwargs)
+        else:
+            func(*args, **kwargs)
+
+    def _flush_outputs(self):
+        """投入済みの書き込みの完了を待ち、失敗があれば例外を送出（DB登録前に呼び出す）"""
+        if self.output_writer:
+            with self.metrics.stage('output_write_wait'):
+                self.output_writer.flush()
     
     def _prepare_execution(self):
         """実行準備"""
         print(f"[{self.run_id}] 実行準備中...")
 
-        # drowsy_detectionの最新版チェックと更新
-        self._check_and_update_algorithm()
+        # drowsy_detectionのバージョン確定（必要に応じて更新）
+        with self.metrics.stage('version_check'):
+            self._resolve_algorithm_version()
 
         # 出力ディレクトリの作成
         version_dir = self.output_base_dir / f"v{self.algorithm_version}"
@@ -194,6 +314,9 @@ class EvaluationEngine:
         evaluation_version_dir = self.evaluation_dir / f"v{self.algorithm_version}"
         self.evaluation_output_dir = evaluation_version_dir / self.run_id
         self.evaluation_output_dir.mkdir(parents=True, exist_ok=True)
+        if self.profile:
+            self._get_profile_dir().mkdir(parents=True, exist_ok=True)
+        self._open_checkpoint()
         
         print(f"  出力ディレクトリ: {self.run_output_dir}")
         print(f"  評価ディレクトリ: {self.evaluation_output_dir}")
@@ -203,7 +326,8 @@ class EvaluationEngine:
         print(f"[{self.run_id}] 対象データ取得中...")
         
         try:
-            core_outputs = dwh.list_core_lib_outputs(db_path=self.db_path)
+            with self.metrics.stage('list_core_lib_outputs'):
+                core_outputs = deps.dwh.list_core_lib_outputs(db_path=self.db_path)
             print(f"  取得件数: {len(core_outputs)}")
             
             for output in core_outputs[:3]:  # 最初の3件を表示
@@ -217,136 +341,410 @@ class EvaluationEngine:
             print(f"  データ取得エラー: {e}")
             raise
     
-    def _run_algorithm_inference(self, core_outputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """推論とアルゴCSV出力"""
+    def _prefetch_video_tags(self, video_ids: List[Any]) -> Dict[Any, List[Dict[str, Any]]]:
+        """対象ビデオのタグ情報を読み取り専用の単一接続で一括取得し、video_id -> 開始フレーム順のタグ配列を返す
+
+        DBのスキーマが想定と異なる場合や一括取得に失敗した場合は get_video_tags をビデオごとに呼び出す。
+        取得に失敗したビデオは含めない（評価時にスキップ）。
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        video_tags: Dict[Any, List[Dict[str, Any]]] = {}
+        started = time.perf_counter()
+        with self.metrics.stage('tag_fetch'):
+            try:
+                fetched = _fetch_video_tags(self.db_path, video_ids)
+            except sqlite3.Error as e:
+                print(f"  タグ一括取得エラー、ビデオごとに取得します: {e}")
+                fetched = None
+            for video_id in video_ids:
+                if fetched is not None:
+                    tags = fetched[video_id]
+                else:
+                    try:
+                        tags = deps.dwh.get_video_tags(video_id, db_path=self.db_path)
+                    except Exception as e:
+                        print(f"  タグ取得エラー (ビデオID={video_id}): {e}")
+                        continue
+                video_tags[video_id] = sorted(tags, key=lambda tag: tag['start'])
+        print(f"  タグ一括取得: {len(video_tags)}ビデオ ({time.perf_counter() - started:.2f}秒)")
+        return video_tags
+
+    def _run_algorithm_inference(self, core_outputs: List[Dict[str, Any]], tags_future: 'Future') -> List[Dict[str, Any]]:
+        """推論とアルゴCSV出力
+
+        ビデオごとに推論 → タグ区間評価 → 評価CSV保存までを済ませ、フレーム単位の出力は破棄する。
+        後段にはビデオ単位の集計結果（_evaluate_video の戻り値）のみを渡す。
+        """
         print(f"[{self.run_id}] アルゴリズム推論実行中...")
         
-        results = []
+        video_results = []
         
         # アルゴリズムバージョンの登録
+        algorithm_id = self._register_algorithm_version()
+        if algorithm_id is None:
+            return []
+        
+        self.inference_cache = self._create_inference_cache()
+        
+        # 差分評価: 入力・タグ・推論条件が前回と同一のビデオは結果を再利用
+        # 再開: 中断前に完了済みのビデオは記録済みの集計結果と出力を再利用（未登録のため新規分と合わせて登録）
+        if self.resume_state:
+            video_results = self._collect_resumed_results(core_outputs, tags_future.result())
+            self.num_resumed_videos = len(video_results)
+            print(f"  再開: 完了済み {len(video_results)}件を再利用, 残り {len(core_outputs) - len(video_results)}件")
+        resumed_ids = {result['core_lib_output_id'] for result in video_results}
+        remaining_outputs = [o for o in core_outputs if o['core_lib_output_ID'] not in resumed_ids]
+        
+        reused_results: Dict[Any, Dict[str, Any]] = {}
+        if self.incremental:
+            reused_results = self._collect_reusable_results(remaining_outputs, tags_future.result())
+            self.num_reused_videos = len(reused_results)
+            print(f"  差分評価: 再利用 {len(reused_results)}件, 新規・変更 {len(remaining_outputs) - len(reused_results)}件")
+        target_outputs = [o for o in remaining_outputs if o['core_lib_output_ID'] not in reused_results]
+        
+        # バッチ再生は Config・アルゴリズムごとに1回だけ参照実装と照合し、一致した場合のみ全ビデオで使用
+        if self._get_worker_settings()['replay_mode'] == 'verify':
+            with self.metrics.stage('replay_verification'):
+                self.batch_replay = self._verify_batch_replay(target_outputs)
+        
+        video_tags: Optional[Dict[Any, List[Dict[str, Any]]]] = None
+        with self.metrics.stage('inference_loop'):
+            for inferred in self._iter_inferred_videos(target_outputs):
+                if video_tags is None:
+                    video_tags = tags_future.result()
+                record = dict(inferred.get('metrics') or {}, video_id=inferred['video_id'],
+                              algo_output_path=str(inferred['algo_csv_path']))
+                with _timed(record, 'evaluate'):
+                    video_results.append(self._evaluate_video(inferred, video_tags.get(inferred['video_id'])))
+                self._checkpoint_video(video_results[-1])
+                self.metrics.add_video(record)
+        
+        print(f"  処理完了: {len(video_results)}件")
+        if self.inference_cache:
+            print(f"  推論キャッシュ: ヒット {self.cache_stats['hits']}件, ミス {self.cache_stats['misses']}件")
+            cache_config = self.config.get('cache') or {}
+            removed = self.inference_cache.evict(
+                max_size_mb=cache_config.get('max_size_mb'),
+                max_age_days=cache_config.get('max_age_days')
+            )
+            if removed:
+                print(f"  推論キャッシュ削除: {removed}件")
+        if self._get_worker_settings()['replay_mode'] != 'reference':
+            print(f"  バッチ再生: {self.replay_stats['batch']}件, 参照実装（照合不一致）: {self.replay_stats['fallback']}件")
+        if (self.config.get('chunking') or {}).get('enabled', False):
+            print(f"  チャンク分割推論: {self.chunk_stats['chunked']}件, 逐次推論へのフォールバック: {self.chunk_stats['chunk_fallback']}件")
+        
+        # アルゴ出力の書き込み完了を確認してからDataWareHouseへ一括登録（再利用分は登録済みのIDを使用）
+        # 再開時、中断前に登録済みのビデオは記録済みのIDを使用（孤立した登録を残さない）
+        self._flush_outputs()
+        registered_ids = self.resume_state['algorithm_output_ids'] if self.resume_state else {}
+        pending_results = []
+        for result in video_results:
+            algorithm_output_id = registered_ids.get(str(result['core_lib_output_id']))
+            if algorithm_output_id is None:
+                pending_results.append(result)
+            else:
+                result['algorithm_output_id'] = algorithm_output_id
+        with self.metrics.stage('algo_output_registration'):
+            self._register_algorithm_outputs(pending_results, algorithm_id)
+        if self.checkpoint and pending_results:
+            self.checkpoint.append('algorithm_outputs', ids={
+                str(result['core_lib_output_id']): result['algorithm_output_id'] for result in pending_results
+            })
+        if not reused_results and not self.num_resumed_videos:
+            return video_results
+        
+        # 再利用分・再開分と新規分を入力順に統合
+        fresh_results = {result['core_lib_output_id']: result for result in video_results}
+        merged = []
+        for core_output in core_outputs:
+            core_lib_output_id = core_output['core_lib_output_ID']
+            result = reused_results.get(core_lib_output_id) or fresh_results.get(core_lib_output_id)
+            if result:
+                merged.append(result)
+        return merged
+
+    def _register_algorithm_version(self) -> Optional[int]:
+        """アルゴリズムバージョンを登録（登録済みのコミットハッシュは既存のIDを使用）し、algorithm_id を保持して返す"""
         try:
-            algorithm_id = dwh.create_algorithm_version(
+            algorithm_id = deps.dwh.create_algorithm_version(
                 version=self.algorithm_version,
                 update_info=f"評価エンジン実行 run_id={self.run_id}",
                 commit_hash=self.algorithm_commit_hash,
                 db_path=self.db_path
             )
             print(f"  アルゴリズムバージョン登録: ID={algorithm_id}")
-        except dwh.DWHUniqueConstraintError:
+        except deps.dwh.DWHUniqueConstraintError:
             # 既存のコミットハッシュから検索
-            existing = dwh.find_algorithm_by_commit_hash(self.algorithm_commit_hash, db_path=self.db_path)
+            existing = deps.dwh.find_algorithm_by_commit_hash(self.algorithm_commit_hash, db_path=self.db_path)
             if existing:
                 algorithm_id = existing['algorithm_ID']
                 print(f"  既存アルゴリズムバージョン使用: ID={algorithm_id}")
             else:
                 print(f"  エラー: 既存のアルゴリズムが見つかりません")
-                return []
+                return None
         # 後続の評価登録で使用するため保持
         self.algorithm_id = algorithm_id
+        return algorithm_id
+
+    def _iter_inferred_videos(self, core_outputs: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """推論結果を入力順に1件ずつ返す
+
+        並列実行時も先行投入するビデオ数をワーカー数の2倍までに制限し、
+        未処理の推論結果が溜まり続けないようにする。
+        """
+        workers = self._get_parallel_workers()
+        if (self.config.get('chunking') or {}).get('enabled', False):
+            yield from self._iter_chunked_videos(core_outputs, workers)
+            return
+        if workers <= 1:
+            for core_output in core_outputs:
+                try:
+                    inferred = self._process_single_video(core_output)
+                except Exception as e:
+                    print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e}")
+                    continue
+                if inferred:
+                    yield inferred
+            return
         
-        for core_output in core_outputs:
-            try:
-                result = self._process_single_video(core_output, algorithm_id)
-                if result:
-                    results.append(result)
-            except Exception as e:
-                print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e}")
-                continue
-        
-        print(f"  処理完了: {len(results)}件")
-        return results
-    
-    def _process_single_video(self, core_output: Dict[str, Any], algorithm_id: int) -> Optional[Dict[str, Any]]:
-        """単一ビデオの処理"""
-        video_id = core_output['video_ID']
-        core_lib_output_id = core_output['core_lib_output_ID']
-        
-        print(f"    ビデオID={video_id} 処理中...")
-        
-        # コアCSVファイルの読み込み
-        core_dir = Path(self.db_path).parent / core_output['core_lib_output_dir']
-        csv_files = list(core_dir.glob("*.csv"))
-        
-        if not csv_files:
-            print(f"      CSVファイルが見つかりません: {core_dir}")
+        # 推論・アルゴCSV保存はワーカープロセスへ分散し、
+        # DataWareHouse登録は後段で親プロセスから入力順に実行する（SQLiteへの同時書き込みを避ける）
+        print(f"  並列実行: ワーカー数={workers}")
+        settings = self._get_worker_settings()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for core_output, future in _iter_bounded(executor, _infer_single_video, core_outputs, (settings,), workers * 2):
+                try:
+                    inferred = future.result()
+                except Exception as e:
+                    print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e}")
+                    continue
+                if inferred:
+                    self._record_inference_stats(inferred)
+                    yield inferred
+
+    def _iter_chunked_videos(self, core_outputs: List[Dict[str, Any]], workers: int) -> Iterator[Dict[str, Any]]:
+        """チャンク分割推論: 長いビデオをチャンクに分割してワーカープロセスで並列推論し、推論結果を入力順に返す
+
+        ビデオ単位の読み込み・連結・保存は親プロセスのスレッド（ワーカー数まで同時実行）で行い、
+        推論のみをチャンク単位でワーカープロセスへ分散する。
+        """
+        settings = self._get_worker_settings()
+        print(f"  チャンク分割推論: {settings['chunk_frames']}フレーム/チャンク, "
+              f"ウォームアップ {settings['chunk_warmup_frames']}フレーム, ワーカー数={workers}")
+        with ProcessPoolExecutor(max_workers=workers) as chunk_executor, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="video") as video_executor:
+            for core_output, future in _iter_bounded(video_executor, _infer_single_video, core_outputs,
+                                                     (settings, self.output_writer, chunk_executor), workers):
+                try:
+                    inferred = future.result()
+                except Exception as e:
+                    print(f"  ビデオ処理エラー (ID={core_output['video_ID']}): {e}")
+                    continue
+                if inferred:
+                    self._record_inference_stats(inferred)
+                    yield inferred
+
+    def _create_inference_cache(self) -> Optional['InferenceCache']:
+        """推論キャッシュの生成（無効時・コミットハッシュ不明時は None）"""
+        cache_config = self.config.get('cache') or {}
+        if not self.use_cache or not cache_config.get('enabled', False):
             return None
-        
-        core_csv_path = csv_files[0]  # 最初のCSVファイルを使用
-        
-        try:
-            df = pd.read_csv(core_csv_path)
-            print(f"      コアCSV読み込み: {len(df)}行")
-        except Exception as e:
-            print(f"      コアCSV読み込みエラー: {e}")
+        if self.algorithm_commit_hash == "unknown" or not self.algorithm_commit_hash:
+            print("  推論キャッシュ無効: アルゴリズムのコミットハッシュが不明です")
             return None
-        
-        # アルゴリズム実行
-        try:
-            config = Config()
-            detector = DrowsyDetector(config)
-            detector.set_frame_rate(float(self.config['algorithm']['frame_rate']))
-            
-            algo_results = []
-            for _, row in df.iterrows():
-                input_data = InputData(
-                    frame_num=int(row['frame']),
-                    left_eye_open=float(row['leye_openness']),
-                    right_eye_open=float(row['reye_openness']),
-                    face_confidence=float(row['confidence'])
-                )
-                
-                output = detector.update(input_data)
-                algo_results.append({
-                    'frame_num': output.frame_num,
-                    'is_drowsy': int(output.is_drowsy),
-                    'left_eye_closed': output.left_eye_closed,
-                    'right_eye_closed': output.right_eye_closed,
-                    'continuous_time': output.continuous_time,
-                    'error_code': output.error_code or ''
-                })
-            
-            print(f"      アルゴリズム実行完了: {len(algo_results)}フレーム")
-            
-        except Exception as e:
-            print(f"      アルゴリズム実行エラー: {e}")
+        if _get_loaded_algorithm_identity() is None:
+            print("  推論キャッシュ無効: 読み込まれている drowsy_detection のソースを特定できません")
             return None
         
-        # アルゴCSVの保存
-        try:
-            algo_df = pd.DataFrame(algo_results)
-            algo_csv_path = self.run_output_dir / f"{video_id}.csv"
-            algo_df.to_csv(algo_csv_path, index=False)
-            print(f"      アルゴCSV保存: {algo_csv_path}")
-        except Exception as e:
-            print(f"      アルゴCSV保存エラー: {e}")
+        # キャッシュキーにはコアCSVのハッシュに加えて、推論結果に影響する条件をすべて含める
+        # （アルゴリズムはリモートのHEADではなく、実際に読み込まれているパッケージで識別する）
+        cache_dir = Path(cache_config.get('dir', '.inference_cache'))
+        print(f"  推論キャッシュ: {cache_dir}")
+        return InferenceCache(cache_dir, self._inference_conditions(), self._get_output_format())
+
+    def _create_core_input_store(self) -> Optional['CoreInputStore']:
+        """コアCSV入力ストアの生成（core_store.enabled が偽の場合は None）"""
+        store_config = self.config.get('core_store') or {}
+        if not store_config.get('enabled', False):
             return None
+        core_csv_config = self.config.get('core_csv') or {}
+        return CoreInputStore(
+            Path(store_config.get('dir', '.core_input_store')),
+            float_dtype=core_csv_config.get('float_dtype', DEFAULT_FLOAT_DTYPE),
+            csv_engine=core_csv_config.get('engine', 'c')
+        )
+
+    def _inference_conditions(self) -> str:
+        """推論結果に影響する条件（読み込まれているアルゴリズム・フレームレート・入力dtype・Config・推論方式）のJSON表現"""
+        settings = self._get_worker_settings()
+        chunking_enabled = bool((self.config.get('chunking') or {}).get('enabled', False))
+        return json.dumps({
+            'algorithm': _get_loaded_algorithm_identity(),
+            'frame_rate': settings['frame_rate'],
+            'float_dtype': settings['float_dtype'],
+            'config': _describe_detector_config(deps.drowsy_detection.Config()),
+            'replay_mode': settings['replay_mode'],
+            'chunking': {
+                'chunk_frames': settings['chunk_frames'],
+                'warmup_frames': settings['chunk_warmup_frames'],
+                'verify': settings['chunk_verify'],
+            } if chunking_enabled else None,
+        }, sort_keys=True, default=str)
+
+    def _record_inference_stats(self, inferred: Dict[str, Any]):
+        """推論キャッシュのヒット/ミス件数と推論方式を集計"""
+        if inferred.get('cache_hit') is True:
+            self.cache_stats['hits'] += 1
+        elif inferred.get('cache_hit') is False:
+            self.cache_stats['misses'] += 1
+        if inferred.get('replay') in self.replay_stats:
+            self.replay_stats[inferred['replay']] += 1
+        if inferred.get('replay') in self.chunk_stats:
+            self.chunk_stats[inferred['replay']] += 1
+
+    def _get_worker_settings(self) -> Dict[str, Any]:
+        """ビデオ単位の推論処理に渡す設定（ワーカープロセスへ渡せるようpickle可能な値のみ）"""
+        core_csv_config = self.config.get('core_csv') or {}
+        replay_config = self.config.get('replay') or {}
+        chunking_config = self.config.get('chunking') or {}
+        return {
+            'db_path': self.db_path,
+            'run_output_dir': str(self.run_output_dir) if self.run_output_dir else None,
+            'output_format': self._get_output_format(),
+            'profile_dir': str(self._get_profile_dir()) if self.profile else None,
+            'frame_rate': float(self.config['algorithm']['frame_rate']),
+            'csv_engine': core_csv_config.get('engine', 'c'),
+            'float_dtype': core_csv_config.get('float_dtype', DEFAULT_FLOAT_DTYPE),
+            'inference_cache': self.inference_cache,
+            'core_input_store': self.core_input_store,
+            'replay_mode': _get_replay_mode(replay_config),
+            'batch_replay': self.batch_replay,
+            'chunk_frames': max(1, int(chunking_config.get('chunk_frames', 108000))),
+            'chunk_warmup_frames': max(1, int(chunking_config.get('warmup_frames', 9000))),
+            'chunk_verify': bool(chunking_config.get('verify', False)),
+        }
+
+    def _get_output_format(self) -> str:
+        """アルゴリズム出力の保存形式（output.format。parquet / feather は pyarrow 未インストール時 csv）"""
+        output_format = str(self.config['output'].get('format', 'csv')).lower()
+        if output_format not in ALGO_OUTPUT_SUFFIXES:
+            raise ValueError(f"output.format が不正です: {output_format} (csv / parquet / feather)")
+        if output_format != 'csv' and importlib.util.find_spec('pyarrow') is None:
+            print(f"  pyarrowが見つからないため、アルゴリズム出力を {output_format} ではなく csv で保存します")
+            return 'csv'
+        return output_format
+
+    def _get_parallel_workers(self) -> int:
+        """並列ワーカー数を取得（未設定時は1=直列、0以下はCPUコア数）"""
+        workers = (self.config.get('parallel') or {}).get('workers', 1)
+        try:
+            workers = int(workers)
+        except (TypeError, ValueError):
+            print(f"  parallel.workers の値が不正です ({workers})、直列実行します")
+            return 1
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        return workers
+    
+    def _process_single_video(self, core_output: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """単一ビデオの処理（推論・アルゴCSV保存）"""
+        inferred = _infer_single_video(core_output, self._get_worker_settings(), self.output_writer)
+        if inferred:
+            self._record_inference_stats(inferred)
+        return inferred
+
+    def _register_algorithm_outputs(self, video_results: List[Dict[str, Any]], algorithm_id: int) -> List[Dict[str, Any]]:
+        """アルゴ出力をDataWareHouseに一括登録（単一トランザクション、失敗時は全件ロールバック）
+
+        各ビデオの集計結果に algorithm_output_id を付与して返す。
+        """
+        if not video_results:
+            return []
+        
+        # database.dbを基準とした相対パスでDataWareHouseに登録
+        db_dir = Path(self.db_path).parent.resolve()
+        output_dir_relative = str(self.run_output_dir.resolve().relative_to(db_dir))
         
-        # DataWareHouseに登録
+        algorithm_output_ids = []
+        started = time.perf_counter()
         try:
-            # database.dbを基準とした相対パスでDataWareHouseに登録
-            db_dir = Path(self.db_path).parent.resolve()
-            output_dir_relative = str(self.run_output_dir.resolve().relative_to(db_dir))
-            algorithm_output_id = dwh.create_algorithm_output(
-                algorithm_id=algorithm_id,
-                core_lib_output_id=core_lib_output_id,
-                output_dir=output_dir_relative,
-                db_path=self.db_path
-            )
-            print(f"      DataWareHouse登録: algorithm_output_ID={algorithm_output_id}")
+            with DWHBulkWriter(self.db_path, ('algorithm_output_table',)) as writer:
+                for video_result in video_results:
+                    algorithm_output_ids.append(writer.create_algorithm_output(
+                        algorithm_id=algorithm_id,
+                        core_lib_output_id=video_result['core_lib_output_id'],
+                        output_dir=output_dir_relative
+                    ))
         except Exception as e:
-            print(f"      DataWareHouse登録エラー: {e}")
-            return None
+            print(f"  DataWareHouse登録エラー（全件ロールバック）: {e}")
+            raise
         
-        return {
+        # 登録確定後にIDを付与
+        for video_result, algorithm_output_id in zip(video_results, algorithm_output_ids):
+            video_result['algorithm_output_id'] = algorithm_output_id
+        print(f"  DataWareHouse登録: algorithm_output {len(algorithm_output_ids)}件 ({time.perf_counter() - started:.2f}秒)")
+        return video_results
+    
+    def _evaluate_video(self, inferred: Dict[str, Any], tags: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """単一ビデオのタグ区間評価と評価CSV保存
+
+        フレーム単位のアルゴリズム出力（algo_df）は保持せず、ビデオ単位の集計結果のみを返す。
+        video_result / evaluation_result はタグが無い（タスク評価対象外の）場合 None / 空リスト。
+        全フレーム評価（timeline）はタグの有無によらず算出する（タグが無いビデオのアラームはすべて誤検知）。
+        timeline はタグ情報を取得できなかった場合のみ None。
+        """
+        video_id = inferred['video_id']
+        algo_df = inferred['algo_df']
+        frame_nums = algo_df['frame_num'].to_numpy()
+        is_drowsy = algo_df['is_drowsy'].to_numpy() == 1
+        
+        aggregate = {
             'video_id': video_id,
-            'core_lib_output_id': core_lib_output_id,
-            'algorithm_output_id': algorithm_output_id,
-            'algo_csv_path': algo_csv_path,
-            'algo_results': algo_results
+            'core_lib_output_id': inferred['core_lib_output_id'],
+            'algo_csv_path': inferred['algo_csv_path'],
+            'input_hash': inferred['input_hash'],
+            'tags_hash': _hash_tags(tags),
+            'total_frames': len(algo_df),
+            'drowsy_frames': int(np.count_nonzero(algo_df['is_drowsy'].to_numpy())),
+            'video_result': None,
+            'timeline': None,
+            'evaluation_result': []
         }
-    
-    def _run_evaluation_logic(self, algorithm_results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """評価ロジックの実行"""
+        
+        print(f"    ビデオID={video_id} 評価中...")
+        
+        # タグ情報（事前取得済み）
+        if tags is None:
+            print("      タグ情報がないためスキップ")
+            return aggregate
+        print(f"      タグ数: {len(tags)}")
+        
+        # ビデオごとの評価（全フレーム評価はタグの無いビデオも対象）
+        video_tasks = _evaluate_tags(video_id, frame_nums, is_drowsy, tags)
+        timeline = _evaluate_timeline(frame_nums, is_drowsy, tags, self.config['algorithm']['frame_rate'])
+        aggregate['timeline'] = {**timeline, **_timeline_rates(timeline)}
+        video_result = _summarize_video_tasks(video_id, video_tasks, timeline)
+        if not video_result:
+            print(f"      誤検知: {timeline['false_positive_events']}イベント / {timeline['false_positive_frames']}フレーム（タグなし）")
+        
+        # ビデオごとの結果保存
+        if video_result:
+            aggregate['video_result'] = video_result
+            aggregate['evaluation_result'] = self._retain_report_tasks(video_tasks)
+            
+            # 詳細結果の保存
+            tasks_df = pd.DataFrame(video_tasks)
+            csv_path = self.evaluation_output_dir / f"{video_id}.csv"
+            self._write_output(f"評価CSV {csv_path}", tasks_df.to_csv, csv_path, index=False)
+            print(f"      評価結果保存: {csv_path}")
+            print(f"      正解率: {video_result['accuracy']:.3f} ({video_result['num_correct']}/{video_result['num_tasks']})")
+            print(f"      誤検知: {timeline['false_positive_events']}イベント / {timeline['false_positive_frames']}フレーム")
+        
+        return aggregate
+
+    def _run_evaluation_logic(self, video_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """評価ロジックの実行（ビデオ単位の集計結果から全体サマリ・レポートを生成）"""
         print(f"[{self.run_id}] 評価ロジック実行中...")
         
         total_tasks = 0
@@ -354,115 +752,67 @@ class EvaluationEngine:
         per_video_results = []
         detailed_results = []  # マークダウン生成用の詳細結果
         
-        for result in algorithm_results:
-            video_id = result['video_id']
-            algo_results = result['algo_results']
-            
-            print(f"    ビデオID={video_id} 評価中...")
-            
-            # タグ情報の取得
-            try:
-                tags = dwh.get_video_tags(video_id, db_path=self.db_path)
-                print(f"      タグ数: {len(tags)}")
-            except Exception as e:
-                print(f"      タグ取得エラー: {e}")
+        for result in video_results:
+            video_result = result['video_result']
+            if not video_result:
                 continue
-            
-            # ビデオごとの評価
-            video_tasks = []
-            video_correct = 0
-            
-            for tag in tags:
-                task_id = f"{video_id}_{tag['tag_ID']}"
-                start_frame = tag['start']
-                end_frame = tag['end']
-                
-                # 区間内のis_drowsyを集計
-                drowsy_frames = [
-                    r for r in algo_results 
-                    if start_frame <= r['frame_num'] <= end_frame and r['is_drowsy'] == 1
-                ]
-                
-                predicted = 1 if len(drowsy_frames) > 0 else 0
-                ground_truth = 1  # 仕様書に基づき、全タグ区間が「連続閉眼あり」
-                correct = int(predicted == ground_truth)
-                
-                video_tasks.append({
-                    'task_id': task_id,
-                    'predicted': predicted,
-                    'ground_truth': ground_truth,
-                    'correct': correct,
-                    'notes': f"frames {start_frame}-{end_frame}, drowsy_frames={len(drowsy_frames)}"
-                })
-                
-                video_correct += correct
-            
-            # ビデオごとの結果保存
-            if video_tasks:
-                video_accuracy = video_correct / len(video_tasks)
-                video_result = {
-                    'video_id': video_id,
-                    'accuracy': video_accuracy,
-                    'num_correct': video_correct,
-                    'num_tasks': len(video_tasks),
-                    'result_file_path': f"{video_id}.csv"
-                }
-                per_video_results.append(video_result)
-                
-                # 詳細結果の保存
-                tasks_df = pd.DataFrame(video_tasks)
-                csv_path = self.evaluation_output_dir / f"{video_id}.csv"
-                tasks_df.to_csv(csv_path, index=False)
-                print(f"      評価結果保存: {csv_path}")
-                print(f"      正解率: {video_accuracy:.3f} ({video_correct}/{len(video_tasks)})")
-                
-                # マークダウン生成用の詳細結果を追加
-                detailed_results.append({
-                    'video_id': video_id,
-                    'algorithm_results': algo_results,
-                    'evaluation_result': video_tasks
-                })
-                
-                total_tasks += len(video_tasks)
-                total_correct += video_correct
+            # 総フレーム数・検出フレーム数はレポート再生成用に評価サマリへ記録（差分評価の再利用分はアルゴ出力が前回の実行ディレクトリにある）
+            per_video_results.append(dict(video_result, total_frames=result['total_frames'], drowsy_frames=result['drowsy_frames']))
+            detailed_results.append(result)
+            total_tasks += video_result['num_tasks']
+            total_correct += video_result['num_correct']
         
         # 全体サマリの作成
         overall_accuracy = total_correct / total_tasks if total_tasks > 0 else 0.0
-        
-        evaluation_summary = {
-            'evaluation_summary': {
-                'run_id': self.run_id,
-                'created_at': datetime.now().isoformat(),
-                'algorithm_version': self.algorithm_version,
-                'algorithm_commit_hash': self.algorithm_commit_hash,
-                'evaluation_conditions': {
-                    'frame_rate': self.config['algorithm']['frame_rate'],
-                    'ground_truth': 'all_tags_continuous_closed_eyes'
-                },
-                'overall_results': {
-                    'accuracy': overall_accuracy,
-                    'total_num_correct': total_correct,
-                    'total_num_tasks': total_tasks
-                },
-                'per_dataset': per_video_results
-            }
-        }
+        evaluation_summary = self._build_evaluation_summary(per_video_results, untagged_videos=_untagged_timelines(video_results))
         
         # サマリの保存
         summary_path = self.evaluation_output_dir / "evaluation_summary.json"
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(evaluation_summary, f, ensure_ascii=False, indent=2)
+        self._write_output(f"評価サマリ {summary_path}", _write_json, summary_path, evaluation_summary)
         
         # マークダウンレポートの生成
         markdown_path = self._generate_markdown_report(evaluation_summary, detailed_results)
         
         print(f"    全体正解率: {overall_accuracy:.3f} ({total_correct}/{total_tasks})")
+        timeline = evaluation_summary['evaluation_summary']['overall_results'].get('timeline')
+        if timeline:
+            print(f"    誤検知: {timeline['false_positive_events']}イベント / {timeline['false_positive_frames']}フレーム, "
+                  f"イベント適合率: {_format_ratio(timeline['event_precision'])}")
         print(f"    評価サマリ保存: {summary_path}")
         print(f"    マークダウンレポート保存: {markdown_path}")
         
         return evaluation_summary
 
-    def _register_evaluation_to_db(self, algorithm_results: List[Dict[str, Any]], evaluation_summary: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_evaluation_summary(self, per_video_results: List[Dict[str, Any]],
+                                  frame_rate: Optional[float] = None,
+                                  config_overrides: Optional[Dict[str, Any]] = None,
+                                  untagged_videos: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """ビデオ別結果から評価結果サマリ（evaluation_summary.json の内容）を作成
+
+        untagged_videos（タグの無いビデオの {video_id, timeline}）は全フレーム評価の合算に含め、
+        1件以上ある場合は 'untagged_videos' として出力する。
+        """
+        evaluation_conditions = {
+            'frame_rate': self.config['algorithm']['frame_rate'] if frame_rate is None else frame_rate,
+            'ground_truth': 'all_tags_continuous_closed_eyes'
+        }
+        if config_overrides:
+            evaluation_conditions['config_overrides'] = config_overrides
+        
+        summary = {
+            'run_id': self.run_id,
+            'created_at': datetime.now().isoformat(),
+            'algorithm_version': self.algorithm_version,
+            'algorithm_commit_hash': self.algorithm_commit_hash,
+            'evaluation_conditions': evaluation_conditions,
+            'overall_results': _overall_results(per_video_results, untagged_videos),
+            'per_dataset': per_video_results
+        }
+        if untagged_videos:
+            summary['untagged_videos'] = untagged_videos
+        return {'evaluation_summary': summary}
+
+    def _register_evaluation_to_db(self, video_results: List[Dict[str, Any]], evaluation_summary: Dict[str, Any]) -> Dict[str, Any]:
         """評価結果をDataWareHouseに登録（集計＋明細）
         Returns: { 'evaluation_result_id': int or None, 'num_evaluation_data': int }
         """
@@ -482,186 +832,88 @@ class EvaluationEngine:
             # 既に相対の場合など
             eval_dir_relative = str(self.evaluation_output_dir)
 
-        # 集計レコードの登録（false_positive は暫定 None）
-        try:
-            evaluation_result_id = dwh.create_evaluation_result(
-                version=self.algorithm_version,
-                algorithm_id=self.algorithm_id,
-                true_positive=float(overall.get('accuracy', 0.0)),
-                false_positive=None,
-                evaluation_result_dir=eval_dir_relative,
-                evaluation_timestamp=datetime.now().isoformat(),
-                db_path=self.db_path,
-            )
-            print(f"[{self.run_id}] 評価集計登録: evaluation_result_ID={evaluation_result_id}")
-        except Exception as e:
-            print(f"[{self.run_id}] 評価集計登録エラー: {e}")
-            return { 'evaluation_result_id': None, 'num_evaluation_data': 0 }
-
         # 動画ごとの明細登録のために、video_id -> (num_correct, num_tasks, result_file_path) を用意
         dataset_index = { d['video_id']: d for d in per_dataset }
 
+        # 集計レコードと明細を単一トランザクションで登録
+        # false_positive はタグ区間外のフレームのうち is_drowsy となった割合（全フレーム評価が無い場合は None）
+        false_positive = (overall.get('timeline') or {}).get('false_positive_rate')
         created_count = 0
-        for result in algorithm_results:
-            video_id = result['video_id']
-            algorithm_output_id = result['algorithm_output_id']
-            ds = dataset_index.get(video_id)
-            if not ds:
-                # 評価対象外（タグ無し等）の場合スキップ
-                continue
+        started = time.perf_counter()
+        try:
+            with DWHBulkWriter(self.db_path, ('evaluation_result_table', 'evaluation_data_table')) as writer:
+                evaluation_result_id = writer.create_evaluation_result(
+                    version=self.algorithm_version,
+                    algorithm_id=self.algorithm_id,
+                    true_positive=float(overall.get('accuracy', 0.0)),
+                    false_positive=float(false_positive) if false_positive is not None else None,
+                    evaluation_result_dir=eval_dir_relative,
+                    evaluation_timestamp=datetime.now().isoformat(),
+                )
+                print(f"[{self.run_id}] 評価集計登録: evaluation_result_ID={evaluation_result_id}")
 
-            correct = int(ds.get('num_correct', 0))
-            total = int(ds.get('num_tasks', 0))
-            result_file = ds.get('result_file_path', f"{video_id}.csv")
-            evaluation_data_path = str(Path(eval_dir_relative) / result_file)
+                for result in video_results:
+                    video_id = result['video_id']
+                    algorithm_output_id = result['algorithm_output_id']
+                    ds = dataset_index.get(video_id)
+                    if not ds:
+                        # 評価対象外（タグ無し等）の場合スキップ
+                        continue
 
-            try:
-                dwh.create_evaluation_data(
-                    evaluation_result_id=evaluation_result_id,
-                    algorithm_output_id=algorithm_output_id,
-                    correct_task_num=correct,
-                    total_task_num=total,
-                    evaluation_data_path=evaluation_data_path,
-                    db_path=self.db_path,
-                )
-                created_count += 1
-            except Exception as e:
-                print(f"[{self.run_id}] 評価明細登録エラー (video_ID={video_id}): {e}")
+                    correct = int(ds.get('num_correct', 0))
+                    total = int(ds.get('num_tasks', 0))
+                    result_file = ds.get('result_file_path', f"{video_id}.csv")
+                    evaluation_data_path = str(Path(eval_dir_relative) / result_file)
+
+                    writer.create_evaluation_data(
+                        evaluation_result_id=evaluation_result_id,
+                        algorithm_output_id=algorithm_output_id,
+                        correct_task_num=correct,
+                        total_task_num=total,
+                        evaluation_data_path=evaluation_data_path,
+                    )
+                    created_count += 1
+        except Exception as e:
+            print(f"[{self.run_id}] 評価結果登録エラー（全件ロールバック）: {e}")
+            return { 'evaluation_result_id': None, 'num_evaluation_data': 0 }
 
-        print(f"[{self.run_id}] 評価明細登録完了: {created_count}件")
+        print(f"[{self.run_id}] 評価明細登録完了: {created_count}件 ({time.perf_counter() - started:.2f}秒)")
         return { 'evaluation_result_id': evaluation_result_id, 'num_evaluation_data': created_count }
     
     def _generate_markdown_report(self, evaluation_summary: Dict[str, Any], evaluation_results: List[Dict[str, Any]]) -> str:
-        """マークダウン形式の評価レポートを生成"""
-        from datetime import datetime
-        
-        summary = evaluation_summary['evaluation_summary']
-        markdown_lines = []
-        
-        # ヘッダー
-        markdown_lines.append("# drowsy_detection 評価レポート")
-        markdown_lines.append("")
-        markdown_lines.append(f"**実行日時**: {summary['created_at']}")
-        markdown_lines.append(f"**実行ID**: `{summary['run_id']}`")
-        markdown_lines.append(f"**アルゴリズムバージョン**: `{summary['algorithm_version']}`")
-        markdown_lines.append(f"**コミットハッシュ**: `{summary['algorithm_commit_hash']}`")
-        markdown_lines.append("")
-        
-        # 評価条件
-        markdown_lines.append("## 📋 評価条件")
-        markdown_lines.append("")
-        conditions = summary['evaluation_conditions']
-        markdown_lines.append(f"- **フレームレート**: {conditions['frame_rate']} fps")
-        markdown_lines.append(f"- **グラウンドトゥルース**: {conditions['ground_truth']}")
-        markdown_lines.append("")
-        
-        # 全体結果
-        overall = summary['overall_results']
-        accuracy_percent = overall['accuracy'] * 100
-        markdown_lines.append("## 🎯 全体評価結果")
-        markdown_lines.append("")
-        markdown_lines.append(f"- **全体正解率**: **{accuracy_percent:.1f}%** ({overall['total_num_correct']}/{overall['total_num_tasks']})")
-        
-        # 正解率の評価コメント
-        if accuracy_percent >= 100:
-            status_emoji = "🟢"
-            status_text = "OK"
-        else:
-            status_emoji = "🔴"
-            status_text = "未検知あり"
-        
-        markdown_lines.append(f"- **評価**: {status_emoji} {status_text}")
-        markdown_lines.append("")
-        
-        # ビデオ別結果テーブル
-        markdown_lines.append("## 📊 ビデオ別評価結果")
-        markdown_lines.append("")
-        markdown_lines.append("| ビデオID | 正解率 | 正解数/総数 | ステータス | 詳細 |")
-        markdown_lines.append("|---------|--------|------------|-----------|------|")
-        
-        for dataset in summary['per_dataset']:
-            video_id = dataset['video_id']
-            accuracy = dataset['accuracy'] * 100
-            correct = dataset['num_correct']
-            total = dataset['num_tasks']
-            
-            # ステータス決定
-            if accuracy >= 80:
-                status = "🟢 優秀"
-            elif accuracy >= 60:
-                status = "🟡 良好"
-            elif accuracy >= 40:
-                status = "🟠 要改善"
-            else:
-                status = "🔴 要改善"
-            
-            markdown_lines.append(f"| {video_id} | {accuracy:.1f}% | {correct}/{total} | {status} | [詳細](#ビデオ{video_id}の詳細結果) |")
-        
-        markdown_lines.append("")
-        
-        # アルゴリズム検出統計
-        markdown_lines.append("## 🔍 アルゴリズム検出統計")
-        markdown_lines.append("")
-        markdown_lines.append("| ビデオID | 総フレーム数 | 検出フレーム数 | 検出率 | グラフ |")
-        markdown_lines.append("|---------|-------------|---------------|--------|-------|")
-        
-        # 各ビデオの検出統計を取得
-        for result in evaluation_results:
-            video_id = result['video_id']
-            algorithm_results = result['algorithm_results']
-            total_frames = len(algorithm_results)
-            drowsy_frames = sum(1 for r in algorithm_results if r['is_drowsy'])
-            detection_rate = (drowsy_frames / total_frames) * 100 if total_frames > 0 else 0
-            
-            # 簡易グラフ（プログレスバー風）
-            bar_length = 20
-            filled_length = int(bar_length * (detection_rate / 100))
-            bar = "█" * filled_length + "░" * (bar_length - filled_length)
-            
-            markdown_lines.append(f"| {video_id} | {total_frames:,} | {drowsy_frames:,} | {detection_rate:.2f}% | `{bar}` |")
-        
-        markdown_lines.append("")
-        
-        # 詳細結果セクション
-        markdown_lines.append("## 📖 詳細結果")
-        markdown_lines.append("")
-        
-        for result in evaluation_results:
-            video_id = result['video_id']
-            evaluation_result = result['evaluation_result']
-            
-            markdown_lines.append(f"### ビデオ{video_id}の詳細結果")
-            markdown_lines.append("")
-            
-            # タグ別評価結果
-            markdown_lines.append("| タスクID | アルゴリズム出力 | 真値 | 正解 | 詳細 |")
-            markdown_lines.append("|----------|----------|------|------|------|")
-            
-            for eval_result in evaluation_result:
-                task_id = eval_result['task_id']
-                predicted = "✅ 検出" if eval_result['predicted'] else "❌ 未検出"
-                ground_truth = "✅ 検出" if eval_result['ground_truth'] else "❌ 未検出"
-                correct = "✅" if eval_result['correct'] else "❌"
-                notes = eval_result.get('notes', '')
-                
-                markdown_lines.append(f"| {task_id} | {predicted} | {ground_truth} | {correct} | {notes} |")
-            
-            markdown_lines.append("")
-        
-        # フッター
-        markdown_lines.append("---")
-        markdown_lines.append("*このレポートは自動生成されました*")
-        
-        # ファイルに保存
-        markdown_content = "\n".join(markdown_lines)
+        """マークダウン形式の評価レポートを生成
+
+        処理時間セクションのみここで確定し、本文は出力ファイルへ逐次書き込む（非同期ライタ使用時は書き込みスレッドで生成）。
+        詳細結果の出力範囲は report.detail、ビデオ別ファイルへの分割は report.shard_details で指定する。
+        """
+        detail, shard_details = self._get_report_config()
         markdown_path = self.evaluation_output_dir / "evaluation_report.md"
-        
-        with open(markdown_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
-        
+        details_dir = self.evaluation_output_dir / REPORT_DETAILS_DIR if shard_details and detail != 'summary' else None
+        self._write_output(
+            f"マークダウンレポート {markdown_path}", _write_markdown_report, markdown_path,
+            evaluation_summary['evaluation_summary'], evaluation_results, self._format_metrics_section(), detail, details_dir
+        )
         return str(markdown_path)
+
+    def _get_report_config(self) -> Tuple[str, bool]:
+        """レポート設定（report.detail: summary / failed / full、report.shard_details）"""
+        return _get_report_settings(self.config)
+
+    def _retain_report_tasks(self, video_tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """レポートの詳細結果に必要なタスクのみ保持（summary は保持しない、failed は不正解のみ）"""
+        detail, _ = self._get_report_config()
+        if detail == 'summary':
+            return []
+        if detail == 'failed':
+            return [task for task in video_tasks if not task['correct']]
+        return video_tasks
+    
+    def _format_metrics_section(self) -> List[str]:
+        """レポート用の処理時間セクション（レポート生成時点までに計測したステージ）"""
+        return _format_metrics_lines(self.metrics.summary())
     
-    def _write_log(self, evaluation_results: Dict[str, Any], register_summary: Optional[Dict[str, Any]] = None):
+    def _write_log(self, evaluation_results: Dict[str, Any], register_summary: Optional[Dict[str, Any]] = None,
+                   metrics_summary: Optional[Dict[str, Any]] = None):
         """ログファイルの更新"""
         log_file = self.config['logging']['file']
         
@@ -672,14 +924,64 @@ class EvaluationEngine:
 - **実行日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 - **対象件数**: {len(evaluation_results['evaluation_summary']['per_dataset'])}動画
 - **全体正解率**: {overall['accuracy']:.3f} ({overall['total_num_correct']}/{overall['total_num_tasks']})
-- **アルゴリズムバージョン**: {self.algorithm_version}
+{_format_timeline_log(overall.get('timeline'))}- **アルゴリズムバージョン**: {self.algorithm_version}
 - **アルゴリズムハッシュ**: {self.algorithm_commit_hash}
+- **バージョン解決**: {self.algorithm_version_source}
 - **出力先**: 
   - アルゴリズム出力: `{self.run_output_dir}`
   - 評価結果: `{self.evaluation_output_dir}`
 
 """
 
+        # 推論キャッシュのヒット/ミス件数を追記（使用時のみ）
+        if self.inference_cache:
+            log_entry += (
+                f"- **推論キャッシュ**: ヒット {self.cache_stats['hits']}件, "
+                f"ミス {self.cache_stats['misses']}件\n\n"
+            )
+
+        # バッチ再生の適用件数を追記（バッチ再生使用時のみ）
+        if self._get_worker_settings()['replay_mode'] != 'reference':
+            log_entry += (
+                f"- **バッチ再生**: {self.replay_stats['batch']}件, "
+                f"参照実装（照合不一致） {self.replay_stats['fallback']}件\n\n"
+            )
+
+        # チャンク分割推論の適用件数を追記（チャンク分割推論使用時のみ）
+        if (self.config.get('chunking') or {}).get('enabled', False):
+            log_entry += (
+                f"- **チャンク分割推論**: {self.chunk_stats['chunked']}件, "
+                f"逐次推論へのフォールバック {self.chunk_stats['chunk_fallback']}件\n\n"
+            )
+
+        # 差分評価の再利用件数を追記（差分評価時のみ）
+        if self.incremental:
+            log_entry += f"- **差分評価**: 再利用 {self.num_reused_videos}件\n\n"
+
+        # 再開時は中断前の完了済みビデオの再利用件数を追記
+        if self.resume_state:
+            log_entry += f"- **再開**: 完了済み {self.num_resumed_videos}件を再利用\n\n"
+
+        # 処理時間・スループット・I/O・ピークRSSを追記（あれば）
+        if metrics_summary:
+            stages = metrics_summary['stages']
+            def stage_seconds(*names: str) -> float:
+                return sum(stages[name]['wall_seconds'] for name in names if name in stages)
+            log_entry += (
+                f"- **処理時間**: 全体 {metrics_summary['elapsed_seconds']:.1f}秒 "
+                f"(推論・評価 {stage_seconds('inference_loop'):.1f}秒, "
+                f"DB登録 {stage_seconds('algo_output_registration', 'evaluation_registration', 'tag_fetch', 'list_core_lib_outputs'):.1f}秒, "
+                f"書き込み待ち {stage_seconds('output_write_wait'):.1f}秒, "
+                f"バージョン確認 {stage_seconds('version_check'):.1f}秒)\n"
+                f"- **推論スループット**: {metrics_summary['throughput']['detector_frames_per_second']:,.0f} frames/sec\n"
+                f"- **I/O**: 読み込み {metrics_summary['io']['bytes_read'] / 1024 / 1024:.1f} MB, "
+                f"書き込み {metrics_summary['io']['bytes_written'] / 1024 / 1024:.1f} MB\n"
+            )
+            peak_rss = metrics_summary['peak_rss_mb']
+            if peak_rss['parent'] is not None:
+                log_entry += f"- **ピークRSS**: {peak_rss['parent']:.0f} MB (子プロセス最大 {peak_rss['workers']:.0f} MB)\n"
+            log_entry += f"- **メトリクス**: `{self.evaluation_output_dir / self._shard_artifact('metrics.json')}`\n\n"
+
         # 評価結果DB登録サマリを追記（あれば）
         if register_summary and register_summary.get('evaluation_result_id') is not None:
             log_entry += (
@@ -695,14 +997,118 @@ class EvaluationEngine:
             print(f"[{self.run_id}] ログ更新エラー: {e}")
 
 
-def main():
-    """メイン関数"""
+def _load_cli_config(config_path: str) -> Dict[str, Any]:
+    """サブコマンド用の設定読み込み（設定ファイルが無い場合は空の設定）"""
+    if not Path(config_path).exists():
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def _run_benchmark(name: Optional[str], args: List[str]) -> int:
+    """benchmarks/bench_{name}.py をスクリプトとして実行（name 省略時は一覧を表示）"""
+    available = sorted(path.stem[len("bench_"):] for path in BENCHMARKS_DIR.glob("bench_*.py"))
+    if name not in available:
+        if name:
+            print(f"ベンチマークが見つかりません: {name}")
+        print(f"利用可能なベンチマーク: {', '.join(available)}")
+        return 0 if name is None else 1
+    script = BENCHMARKS_DIR / f"bench_{name}.py"
+    sys.argv = [str(script)] + args
+    try:
+        runpy.run_path(str(script), run_name="__main__")
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None):
+    """メイン関数
+
+    サブコマンド: run（評価実行。省略可）/ report（保存済みの評価CSVからレポート再生成）/
+    summary（評価サマリの表示）/ bench（ベンチマーク実行）。
+    pandas・drowsy_detection・datawarehouse は遅延インポートのため、run 以外では読み込まれない。
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # サブコマンド省略時は run（従来のオプションのみの呼び出しと互換）
+    if not argv or (argv[0] not in CLI_COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['run'] + argv
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', default="config.yaml", help="設定ファイルのパス")
+    parser = argparse.ArgumentParser(description="drowsy_detection 評価エンジン")
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    
+    run_parser = subparsers.add_parser('run', parents=[common], help="推論・評価を実行（省略時の既定）")
+    run_parser.add_argument('--no-cache', action='store_true', help="推論キャッシュを使用しない")
+    run_parser.add_argument('--incremental', action='store_true', help="入力・タグが前回から変わっていないビデオの結果を再利用")
+    run_parser.add_argument('--sweep', action='store_true', help="sweep.grid の全パラメータバリアントを評価して比較")
+    run_parser.add_argument('--profile', action='store_true', help="推論ループを cProfile で計測し、評価ディレクトリへ pstats を出力")
+    run_parser.add_argument('--resume', metavar='RUN_ID', help="中断した実行をチェックポイントから再開")
+    run_parser.add_argument('--compare', nargs='+', metavar='REF',
+                            help="複数バージョン（コミット・ブランチ・タグ、または installed）を同じ入力で比較評価（先頭が基準）")
+    run_parser.add_argument('--shard', metavar='I/N', type=_parse_shard,
+                            help="video_id で N 分割した I 番目（0始まり）のみ評価し、部分結果を出力（--run-id 必須）")
+    run_parser.add_argument('--run-id', help="実行IDを指定（シャード実行では全シャードで同じ値を指定）")
+    run_parser.add_argument('--merge', metavar='RUN_ID', help="シャード実行の部分結果を統合し、サマリ・レポート生成と評価結果登録を行う")
+    run_parser.add_argument('--watch', action='store_true',
+                            help="監視モード: DataWareHouseをポーリングし、新しいコアライブラリ出力を到着順に評価（SIGINT / SIGTERM で終了）")
+    
+    report_parser = subparsers.add_parser('report', parents=[common],
+                                          help="保存済みのビデオ別評価CSVから評価サマリ・レポートを再生成（推論・DBアクセスなし）")
+    report_parser.add_argument('evaluation_dir', metavar='EVALUATION_DIR', help="評価ディレクトリのパス、または run_id")
+    report_parser.add_argument('--detail', choices=REPORT_DETAIL_LEVELS, help="詳細結果の出力範囲（省略時は report.detail）")
+    report_parser.add_argument('--shard-details', action='store_true', default=None,
+                               help="詳細結果をビデオ別ファイルに分割（省略時は report.shard_details）")
+    
+    summary_parser = subparsers.add_parser('summary', parents=[common], help="評価サマリ（evaluation_summary.json）を表示")
+    summary_parser.add_argument('evaluation_dir', metavar='EVALUATION_DIR', help="評価ディレクトリのパス、または run_id")
+    summary_parser.add_argument('--json', action='store_true', help="JSONのまま出力")
+    
+    bench_parser = subparsers.add_parser('bench', help="benchmarks/bench_{NAME}.py を実行（NAME 省略時は一覧）")
+    bench_parser.add_argument('name', nargs='?', metavar='NAME', help="ベンチマーク名（engine / frame_loop / dwh_registration 等）")
+    bench_parser.add_argument('bench_args', nargs=argparse.REMAINDER, metavar='ARGS', help="ベンチマークへ渡す引数")
+    
+    args = parser.parse_args(argv)
+    if args.command == 'bench':
+        exit(_run_benchmark(args.name, args.bench_args))
+    if args.command in ('report', 'summary'):
+        try:
+            config = _load_cli_config(args.config)
+            evaluation_dir = _resolve_evaluation_dir(args.evaluation_dir, config)
+            if args.command == 'summary':
+                success = _show_summary(evaluation_dir, as_json=args.json)
+            else:
+                success = _rebuild_report(evaluation_dir, config, detail=args.detail, shard_details=args.shard_details)
+        except Exception as e:
+            print(f"{args.command} エラー: {e}")
+            success = False
+        exit(0 if success else 1)
+    
     print("drowsy_detection 評価エンジン")
     print("=" * 50)
     
+    if sum(bool(mode) for mode in (args.sweep, args.resume, args.compare, args.merge, args.watch)) > 1 and not (args.resume and args.shard):
+        run_parser.error("--sweep / --resume / --compare / --merge / --watch は併用できません（--resume と --shard は併用可）")
+    if args.shard and (args.sweep or args.compare or args.merge or args.watch):
+        run_parser.error("--shard は --sweep / --compare / --merge / --watch と併用できません")
+    if args.shard and not (args.run_id or args.resume):
+        run_parser.error("--shard には全シャードで共通の --run-id が必要です")
+    
     try:
-        engine = EvaluationEngine()
-        success = engine.run_evaluation()
+        engine = EvaluationEngine(args.config, use_cache=not args.no_cache, incremental=args.incremental,
+                                  profile=args.profile, resume_run_id=args.resume,
+                                  run_id=args.merge or args.run_id, shard=args.shard)
+        if args.watch:
+            success = engine.run_watch()
+        elif args.merge:
+            success = engine.run_merge()
+        elif args.compare:
+            success = engine.run_comparison(args.compare)
+        elif args.sweep:
+            success = engine.run_sweep()
+        else:
+            success = engine.run_evaluation()
         exit(0 if success else 1)
     except Exception as e:
         print(f"評価エンジン初期化エラー: {e}")
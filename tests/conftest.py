@@ -0,0 +1,88 @@
+"""テスト共通設定
+
+main と benchmarks の代替モジュール（synthetic_detector / synthetic_dwh）をインポートできるようにし、
+drowsy_detection・datawarehouse の代替モジュールをエンジン（engine.deps）に差し込む fixture を提供する。
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(REPO_DIR / "benchmarks"))
+
+from engine import deps  # noqa: E402
+import synthetic_detector  # noqa: E402
+
+
+@pytest.fixture
+def detector_module(monkeypatch):
+    """deps.drowsy_detection を代替検出器に差し替える（sys.modules は変更しない）"""
+    monkeypatch.setattr(deps, 'drowsy_detection', synthetic_detector)
+    return synthetic_detector
+
+
+def write_core_csv(path: Path, closed_runs, num_frames: int):
+    """closed_runs（[(開始フレーム, フレーム数), ...]）の間だけ両眼を閉じたコアCSVを作成"""
+    closed = set()
+    for start, length in closed_runs:
+        closed.update(range(start, start + length))
+    lines = ["frame,leye_openness,reye_openness,confidence"]
+    for frame in range(1, num_frames + 1):
+        openness = 0.05 if frame in closed else 0.3
+        lines.append(f"{frame},{openness},{openness},1.0")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+@pytest.fixture
+def engine_dataset(tmp_path, monkeypatch, detector_module):
+    """代替DataWareHouse・代替検出器で評価エンジンを実行するためのデータセットと設定を作成する
+
+    videos は {'frames': フレーム数, 'closed': [(開始, 長さ), ...], 'tags': [(開始, 終了), ...]} のリスト。
+    戻り値の関数は設定ファイルのパスを返す（overrides は config.yaml の上書き）。
+    """
+    import synthetic_dwh
+    import yaml
+
+    monkeypatch.setattr(deps, 'dwh', synthetic_dwh)
+    monkeypatch.chdir(tmp_path)
+
+    def build(videos, overrides=None) -> Path:
+        db_path = tmp_path / "database.db"
+        synthetic_dwh.init_database(str(db_path))
+        conn = sqlite3.connect(str(db_path))
+        try:
+            for index, video in enumerate(videos):
+                video_id = conn.execute("INSERT INTO video_table (video_dir) VALUES (?)", (f"video_{index}",)).lastrowid
+                core_dir = Path("02_core_lib_output") / f"{video_id:06d}"
+                write_core_csv(tmp_path / core_dir / "core_lib_output.csv", video.get('closed', []), video['frames'])
+                conn.execute("INSERT INTO core_lib_output_table (core_lib_ID, video_ID, core_lib_output_dir) VALUES (1, ?, ?)",
+                             (video_id, str(core_dir)))
+                for task_id, (start, end) in enumerate(video.get('tags', []), start=1):
+                    conn.execute('INSERT INTO tag_table (video_ID, task_ID, start, "end") VALUES (?, ?, ?, ?)',
+                                 (video_id, task_id, start, end))
+            conn.commit()
+        finally:
+            conn.close()
+
+        with open(REPO_DIR / "config.yaml", 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        config['datawarehouse']['database_path'] = str(db_path)
+        config['output'].update(base_dir=str(tmp_path / "03_algorithm_output"),
+                                evaluation_dir=str(tmp_path / "04_evaluation_output"))
+        config['algorithm']['git_repo'] = "synthetic"
+        config['algorithm']['version_check'] = {'offline': True, 'cache_file': str(tmp_path / "version_cache.json")}
+        config['logging']['file'] = str(tmp_path / "log.md")
+        for section, values in (overrides or {}).items():
+            config.setdefault(section, {}).update(values)
+        config_path = tmp_path / "config.yaml"
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+        return config_path
+
+    return build
+
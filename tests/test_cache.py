@@ -0,0 +1,50 @@
+"""推論キャッシュのキー（推論条件）が読み込まれているアルゴリズムで決まることのテスト"""
+
+import importlib.util
+
+import main
+from engine import deps
+from engine.cache import InferenceCache
+import synthetic_detector
+
+
+def _load_detector_copy(tmp_path, name, extra_source=""):
+    """代替検出器のソースを複製（extra_source を追記）したモジュールを読み込む"""
+    path = tmp_path / f"{name}.py"
+    path.write_text(open(synthetic_detector.__file__, encoding='utf-8').read() + extra_source, encoding='utf-8')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _engine(engine_dataset, overrides=None):
+    config_path = engine_dataset([{'frames': 60}], overrides)
+    return main.EvaluationEngine(str(config_path))
+
+
+def test_conditions_follow_loaded_source_not_remote_commit(engine_dataset, tmp_path, monkeypatch):
+    engine = _engine(engine_dataset)
+    monkeypatch.setattr(deps, 'drowsy_detection', _load_detector_copy(tmp_path, "detector_a"))
+    conditions = engine._inference_conditions()
+
+    # リモートのHEAD（バージョンキャッシュ）が変わっても、読み込まれているコードが同じならキーは同じ
+    engine.algorithm_commit_hash = "0123456789abcdef"
+    assert engine._inference_conditions() == conditions
+    monkeypatch.setattr(deps, 'drowsy_detection', _load_detector_copy(tmp_path, "detector_b"))
+    assert engine._inference_conditions() == conditions
+
+    # __version__ が同じでもソースが異なればキーは異なる
+    changed = _load_detector_copy(tmp_path, "detector_c", "\n# 判定ロジックの変更\n")
+    assert changed.__version__ == synthetic_detector.__version__
+    monkeypatch.setattr(deps, 'drowsy_detection', changed)
+    assert engine._inference_conditions() != conditions
+
+
+def test_cache_disabled_when_commit_unknown(engine_dataset):
+    engine = _engine(engine_dataset, {'cache': {'enabled': True}})
+
+    engine.algorithm_commit_hash = "unknown"
+    assert engine._create_inference_cache() is None
+    engine.algorithm_commit_hash = "0123456789abcdef"
+    assert isinstance(engine._create_inference_cache(), InferenceCache)
@@ -0,0 +1,91 @@
+"""長いビデオのチャンク分割推論（_run_reference_chunked）のテスト
+
+チャンク境界をまたぐ閉眼区間・低信頼度フレームを含む系列で、連結した出力が逐次推論と一致すること、
+ウォームアップ不足はウォームアップ末尾1フレームの境界照合で検出され逐次推論にフォールバックすることを確認する。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from engine import detector
+
+FRAME_RATE = 30.0
+CHUNK_FRAMES = 200
+
+
+def _columns(num_frames, closed_runs, low_confidence=()):
+    frame_nums = np.arange(1, num_frames + 1, dtype=np.int64)
+    openness = np.full(num_frames, 0.3)
+    for start, length in closed_runs:
+        openness[start:start + length] = 0.05
+    confidence = np.ones(num_frames)
+    confidence[list(low_confidence)] = 0.3
+    return frame_nums, openness, openness.copy(), confidence
+
+
+def _settings(warmup_frames, verify=False):
+    return {
+        'frame_rate': FRAME_RATE,
+        'replay_mode': 'reference',
+        'chunk_frames': CHUNK_FRAMES,
+        'chunk_warmup_frames': warmup_frames,
+        'chunk_verify': verify,
+    }
+
+
+def _run_chunked(columns, settings, detector_module):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        return detector._run_reference_chunked(FRAME_RATE, columns, detector_module.Config(), settings, executor)
+
+
+# チャンク境界（200, 400, 600, ...）をまたぐ閉眼区間。アラーム開始（閉眼30フレーム目）が境界の前後にくるものを含む
+STRADDLING_RUNS = [(180, 40), (390, 45), (575, 60), (799, 2), (970, 31)]
+
+
+@pytest.mark.parametrize('verify', [False, True])
+def test_chunked_output_matches_sequential_with_events_straddling_boundaries(detector_module, verify):
+    columns = _columns(1100, STRADDLING_RUNS, low_confidence=[199, 200, 601])
+    expected = detector._run_reference_detector(FRAME_RATE, columns, detector_module.Config())
+    assert expected['is_drowsy'].sum() > 0
+
+    algo_df, method = _run_chunked(columns, _settings(warmup_frames=90, verify=verify), detector_module)
+
+    assert method == 'chunked'
+    assert detector._first_mismatch(expected, algo_df) is None
+
+
+def test_insufficient_warmup_is_caught_by_boundary_frame_check(detector_module):
+    # 境界400の直前から始まる80フレームの閉眼に対し、ウォームアップ20フレームでは連続閉眼時間が揃わない
+    columns = _columns(1000, [(330, 80)])
+    expected = detector._run_reference_detector(FRAME_RATE, columns, detector_module.Config())
+
+    algo_df, method = _run_chunked(columns, _settings(warmup_frames=20), detector_module)
+
+    assert method == 'chunk_fallback'
+    assert detector._first_mismatch(expected, algo_df) is None
+
+
+def test_boundary_frame_check_compares_last_warmup_frame(detector_module):
+    # ウォームアップ開始前からの閉眼がウォームアップ末尾（境界直前の1フレーム）で途切れる場合は状態が揃う
+    columns = _columns(600, [(150, 49)])
+    expected = detector._run_reference_detector(FRAME_RATE, columns, detector_module.Config())
+    algo_df, method = _run_chunked(columns, _settings(warmup_frames=20), detector_module)
+    assert method == 'chunked'
+    assert detector._first_mismatch(expected, algo_df) is None
+
+    # 境界直前の1フレームまで閉眼が続く場合は不一致を検出する
+    columns = _columns(600, [(150, 50)])
+    algo_df, method = _run_chunked(columns, _settings(warmup_frames=20), detector_module)
+    assert method == 'chunk_fallback'
+    assert detector._first_mismatch(detector._run_reference_detector(FRAME_RATE, columns, detector_module.Config()), algo_df) is None
+
+
+def test_short_video_is_not_chunked(detector_module):
+    columns = _columns(CHUNK_FRAMES, [(10, 40)])
+    df = dict(zip(('frame', 'leye_openness', 'reye_openness', 'confidence'), columns))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        algo_df, method = detector._run_detector(df, _settings(warmup_frames=20), chunk_executor=executor)
+    assert method == 'reference'
+    assert detector._first_mismatch(detector._run_reference_detector(FRAME_RATE, columns, detector_module.Config()), algo_df) is None
@@ -0,0 +1,95 @@
+"""バージョン比較（--compare）の共有入力での評価とバージョン間の差分のテスト"""
+
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import main
+from engine import deps
+
+RUN_ID = "20990101-000000"
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 40)], 'tags': [(100, 200)]},
+    {'frames': 450, 'closed': [(150, 90)], 'tags': [(140, 260)]},
+    {'frames': 300, 'closed': [(50, 20)], 'tags': [(40, 120)]},
+    {'frames': 200, 'closed': [(0, 45)]},
+]
+# コミット -> 分離インストールする代替検出器の continuous_close_time の既定値
+COMMITS = {
+    'a' * 40: 2.0,
+    'b' * 40: 0.5,
+    'c' * 40: 5.0,
+}
+SYNTHETIC_DETECTOR = Path(__file__).resolve().parent.parent / "benchmarks" / "synthetic_detector.py"
+
+
+@pytest.fixture
+def compare_dataset(engine_dataset, tmp_path):
+    """コミットごとに判定パラメータの異なる代替検出器を compare.install_dir へインストール済みとして配置"""
+    install_dir = tmp_path / "algorithm_versions"
+    source = SYNTHETIC_DETECTOR.read_text(encoding='utf-8')
+    for commit, close_time in COMMITS.items():
+        package_dir = install_dir / commit / "drowsy_detection"
+        package_dir.mkdir(parents=True)
+        package_source = source.replace("continuous_close_time: float = 1.0", f"continuous_close_time: float = {close_time}")
+        assert package_source != source
+        (package_dir / "__init__.py").write_text(package_source, encoding='utf-8')
+        (install_dir / commit / ".installed").write_text("", encoding='utf-8')
+    return engine_dataset(VIDEOS, {'compare': {'install_dir': str(install_dir)}})
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_compare_evaluates_each_version_on_shared_inputs(compare_dataset, detector_module):
+    engine = main.EvaluationEngine(str(compare_dataset), use_cache=False, run_id=RUN_ID)
+    assert engine.run_comparison(list(COMMITS))
+    # 各バージョンはワーカープロセスでのみ読み込み、親プロセスの drowsy_detection は差し替えない
+    assert deps.drowsy_detection is detector_module
+
+    compare_dir = engine.evaluation_output_dir
+    assert compare_dir.name == f"compare_{RUN_ID}"
+    comparison = _read_json(compare_dir / "comparison_summary.json")['comparison_summary']
+    names = [f"v0.0.0+synthetic+{commit[:8]}" for commit in COMMITS]
+    assert [item['name'] for item in comparison['versions']] == names
+    assert [item['commit'] for item in comparison['versions']] == list(COMMITS)
+    assert comparison['baseline'] == names[0]
+
+    # 全バージョンで同じ入力を評価（タグの無いビデオは誤検知の集計のみ）
+    for name in names:
+        summary = _read_json(compare_dir / name / "evaluation_summary.json")['evaluation_summary']
+        assert sorted(dataset['video_id'] for dataset in summary['per_dataset']) == [1, 2, 3]
+        assert sorted(path.name for path in (compare_dir / name).glob("*.csv")) == ["1.csv", "2.csv", "3.csv"]
+    assert [entry['video_id'] for entry in comparison['per_video']] == [1, 2, 3, 4]
+    # 比較中のみ使用した入力の一時ストアは削除
+    assert not (compare_dir / ".core_input_store").exists()
+
+    # 2.0秒: 90フレーム閉眼のビデオ2のみ検知 / 0.5秒: 全ビデオ検知 / 5.0秒: 検知なし
+    accuracy = {item['name']: (item['total_num_correct'], item['total_num_tasks']) for item in comparison['versions']}
+    assert accuracy == {names[0]: (1, 3), names[1]: (3, 3), names[2]: (0, 3)}
+    assert [(item['num_improved'], item['num_regressed']) for item in comparison['versions']] == [(0, 0), (2, 0), (0, 1)]
+    per_video = {entry['video_id']: entry for entry in comparison['per_video']}
+    assert per_video[1]['delta'] == {names[1]: 1.0, names[2]: 0.0}
+    assert per_video[2]['delta'] == {names[1]: 0.0, names[2]: -1.0}
+    assert per_video[4] == {'video_id': 4, 'accuracy': {}, 'delta': {}}
+
+    # タスクIDは {ビデオID}_{タグID}（各ビデオのタグは1件）
+    flips = pd.read_csv(compare_dir / "task_flips.csv")
+    assert flips[['version', 'video_id', 'task_id', 'change']].values.tolist() == [
+        [names[1], 1, '1_1', 'improved'],
+        [names[1], 3, '3_3', 'improved'],
+        [names[2], 2, '2_2', 'regressed'],
+    ]
+    report = (compare_dir / "comparison_report.md").read_text(encoding='utf-8')
+    assert f"**基準バージョン**: `{names[0]}`" in report
+    assert "全 3件（一覧は [task_flips.csv](task_flips.csv)）" in report
+
+
+def test_compare_requires_two_distinct_versions(compare_dataset):
+    commit = next(iter(COMMITS))
+    # 同一コミットは除外され、比較対象が1つになる
+    assert not main.EvaluationEngine(str(compare_dataset), use_cache=False, run_id=RUN_ID).run_comparison([commit, commit])
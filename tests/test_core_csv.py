@@ -0,0 +1,89 @@
+"""コアCSV読み込み（_load_core_csv / CoreInputStore）のアルゴリズム出力固定テスト
+
+閾値ちょうどの値を含むコアCSVから生成したアルゴリズム出力CSVが、CSVの文字列を float() で
+そのまま DrowsyDetector に渡した従来の出力と一致することを確認する。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import detector as engine_detector, store as core_store, writer
+
+# 閾値（0.105 / 0.75）ちょうど・前後の値。単精度で読み込むと 0.105 は閾値未満になる
+EYE_VALUES = ["0.105", "0.1049999999", "0.1050000001", "0.104999997", "0.3", "0.02"]
+CONFIDENCE_VALUES = ["0.75", "0.7499999999", "0.7500000001", "1.0"]
+
+
+def _write_core_csv(path):
+    """各値が continuous_close_time をまたいで連続する系列のコアCSV"""
+    lines = ["frame,leye_openness,reye_openness,confidence,sunglasses_detected"]
+    frame = 1
+    for confidence in CONFIDENCE_VALUES:
+        for eye in EYE_VALUES:
+            for _ in range(35):
+                lines.append(f"{frame},{eye},{eye},{confidence},False")
+                frame += 1
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+def _expected_algo_csv(detector, core_csv_path, frame_rate):
+    """コアCSVの文字列を float() で DrowsyDetector へ渡した出力（従来の iterrows 経路と同じ列・値）"""
+    detector_instance = detector.DrowsyDetector(detector.Config())
+    detector_instance.set_frame_rate(frame_rate)
+    rows = []
+    with open(core_csv_path, 'r', encoding='utf-8') as f:
+        next(f)
+        for line in f:
+            frame, left, right, confidence = line.strip().split(',')[:4]
+            output = detector_instance.update(detector.InputData(
+                frame_num=int(frame),
+                left_eye_open=float(left),
+                right_eye_open=float(right),
+                face_confidence=float(confidence)
+            ))
+            rows.append({
+                'frame_num': output.frame_num,
+                'is_drowsy': int(output.is_drowsy),
+                'left_eye_closed': output.left_eye_closed,
+                'right_eye_closed': output.right_eye_closed,
+                'continuous_time': output.continuous_time,
+                'error_code': output.error_code or ''
+            })
+    return pd.DataFrame(rows).to_csv(index=False)
+
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+@pytest.mark.parametrize('use_store', [False, True])
+def test_algo_csv_at_threshold_values_matches_text_input(detector_module, tmp_path, engine, use_store):
+    if engine == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    core_csv_path = tmp_path / "core_lib_output.csv"
+    _write_core_csv(core_csv_path)
+    store = core_store.CoreInputStore(tmp_path / "store", csv_engine=engine) if use_store else None
+    settings = {
+        'core_input_store': store,
+        'csv_engine': engine,
+        'float_dtype': core_store.DEFAULT_FLOAT_DTYPE,
+        'frame_rate': 30.0,
+        'replay_mode': 'reference',
+    }
+
+    # 入力ストアは2回目（メモリマップ読み込み）の出力も確認する
+    for _ in range(2 if use_store else 1):
+        df = core_store._load_core_inputs(core_csv_path, settings)
+        algo_df, _ = engine_detector._run_detector(df, settings)
+        algo_csv_path = tmp_path / "algo.csv"
+        writer._write_algo_output(algo_df, algo_csv_path, 'csv')
+        assert algo_csv_path.read_text(encoding='utf-8') == _expected_algo_csv(detector_module, core_csv_path, 30.0)
+
+
+def test_default_dtype_keeps_text_values(tmp_path):
+    core_csv_path = tmp_path / "core_lib_output.csv"
+    _write_core_csv(core_csv_path)
+
+    df = core_store._load_core_csv(core_csv_path)
+
+    for column in ('leye_openness', 'reye_openness', 'confidence'):
+        assert df[column].dtype == np.float64
+    assert float(df['leye_openness'].iloc[0]) == float("0.105")
@@ -0,0 +1,116 @@
+"""DataWareHouse 一括登録（DWHBulkWriter）とタグ一括取得（_fetch_video_tags）のテスト
+
+代替DataWareHouse（benchmarks/synthetic_dwh.py）のSQLite DBを使用する。
+"""
+
+import sqlite3
+import types
+
+import pytest
+
+from engine import deps, warehouse
+import synthetic_dwh
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "database.db")
+    synthetic_dwh.init_database(path)
+    monkeypatch.setattr(deps, 'dwh', synthetic_dwh)
+    return path
+
+
+def _count(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_bulk_writer_commits_rows_readable_by_api(db_path):
+    with warehouse.DWHBulkWriter(db_path, ('evaluation_result_table', 'evaluation_data_table')) as writer:
+        result_id = writer.create_evaluation_result("1.0.0", 1, 0.5, 0.1, "04_evaluation_output/run", "2026-01-01T00:00:00")
+        data_ids = [writer.create_evaluation_data(result_id, output_id, 3, 4, f"04_evaluation_output/run/{output_id}.csv")
+                    for output_id in (1, 2)]
+        # コミット前は他の接続から見えない
+        assert _count(db_path, 'evaluation_data_table') == 0
+
+    assert data_ids == [1, 2]
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        result = dict(conn.execute("SELECT * FROM evaluation_result_table").fetchone())
+        rows = [dict(row) for row in conn.execute("SELECT * FROM evaluation_data_table ORDER BY evaluation_data_ID")]
+    finally:
+        conn.close()
+    assert result['evaluation_result_ID'] == result_id
+    assert (result['true_positive'], result['false_positive']) == (0.5, 0.1)
+    assert [row['algorithm_output_ID'] for row in rows] == [1, 2]
+    assert all(row['evaluation_result_ID'] == result_id for row in rows)
+
+
+def test_bulk_writer_rolls_back_whole_stage(db_path):
+    with pytest.raises(RuntimeError):
+        with warehouse.DWHBulkWriter(db_path, ('algorithm_output_table',)) as writer:
+            for index in range(5):
+                writer.create_algorithm_output(1, index + 1, "03_algorithm_output/run")
+            raise RuntimeError("登録途中の失敗")
+
+    assert _count(db_path, 'algorithm_output_table') == 0
+    # ロールバック後も接続を保持せず、再度登録できる
+    with warehouse.DWHBulkWriter(db_path, ('algorithm_output_table',)) as writer:
+        writer.create_algorithm_output(1, 1, "03_algorithm_output/run")
+    assert _count(db_path, 'algorithm_output_table') == 1
+
+
+def test_bulk_writer_does_not_patch_sqlite_connect(db_path):
+    connect = sqlite3.connect
+    with warehouse.DWHBulkWriter(db_path, ('algorithm_output_table',)):
+        assert sqlite3.connect is connect
+    assert sqlite3.connect is connect
+
+
+def test_bulk_writer_falls_back_to_api_for_unknown_schema(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "database.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE algorithm_output_table (id INTEGER PRIMARY KEY, path TEXT)")
+    conn.close()
+    calls = []
+    monkeypatch.setattr(deps, 'dwh', types.SimpleNamespace(
+        create_algorithm_output=lambda **kwargs: calls.append(kwargs) or len(calls)))
+
+    with warehouse.DWHBulkWriter(db_path, ('algorithm_output_table',)) as writer:
+        ids = [writer.create_algorithm_output(1, index + 1, "03_algorithm_output/run") for index in range(3)]
+
+    assert ids == [1, 2, 3]
+    assert [call['core_lib_output_id'] for call in calls] == [1, 2, 3]
+    assert all(call['db_path'] == db_path for call in calls)
+
+
+def test_fetch_video_tags_matches_per_video_api(db_path):
+    conn = sqlite3.connect(db_path)
+    for video_id, start, end in [(1, 100, 200), (2, 50, 60), (1, 10, 20), (3, 5, 1), (1, 300, 400)]:
+        conn.execute('INSERT INTO tag_table (video_ID, task_ID, start, "end") VALUES (?, 1, ?, ?)', (video_id, start, end))
+    conn.commit()
+    conn.close()
+    video_ids = [1, 2, 3, 4]
+
+    fetched = warehouse._fetch_video_tags(db_path, video_ids)
+
+    assert fetched == {video_id: synthetic_dwh.get_video_tags(video_id, db_path=db_path) for video_id in video_ids}
+
+
+def test_fetch_video_tags_reads_while_writer_holds_transaction(db_path):
+    with warehouse.DWHBulkWriter(db_path, ('algorithm_output_table',)) as writer:
+        writer.create_algorithm_output(1, 1, "03_algorithm_output/run")
+        assert warehouse._fetch_video_tags(db_path, [1]) == {1: []}
+
+
+def test_fetch_video_tags_returns_none_for_unknown_schema(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE tag_table (id INTEGER PRIMARY KEY)")
+    conn.close()
+
+    assert warehouse._fetch_video_tags(db_path, [1]) is None
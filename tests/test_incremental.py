@@ -0,0 +1,30 @@
+"""差分評価（--incremental）の結果再利用のテスト"""
+
+import json
+
+import main
+
+
+def _run(config_path, run_id=None):
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, incremental=True, run_id=run_id)
+    assert engine.run_evaluation()
+    return engine
+
+
+def test_rerun_with_same_run_id_reuses_results_in_place(engine_dataset):
+    config_path = engine_dataset([
+        {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+        {'frames': 300, 'tags': [(50, 80)]},
+    ])
+
+    evaluation_dir = _run(config_path, run_id="20990101-000000").evaluation_output_dir
+    csv_before = (evaluation_dir / "1.csv").read_text(encoding='utf-8')
+
+    # 前回と同じ評価ディレクトリへの再実行でも、評価CSVを自身へコピーせずに再利用する
+    engine = _run(config_path, run_id="20990101-000000")
+
+    assert engine.num_reused_videos == 2
+    assert (evaluation_dir / "1.csv").read_text(encoding='utf-8') == csv_before
+    with open(evaluation_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+        summary = json.load(f)['evaluation_summary']
+    assert [dataset['video_id'] for dataset in summary['per_dataset']] == [1, 2]
@@ -0,0 +1,72 @@
+"""タグ区間の検出フレーム数（_count_drowsy_frames_in_intervals / _evaluate_tags）のテスト
+
+累積和と searchsorted による一括集計が、従来のタグごとの全フレーム走査と一致することを確認する。
+"""
+
+import numpy as np
+import pytest
+
+from engine import evaluation
+
+
+def _scan_per_tag(frame_nums, is_drowsy, starts, ends):
+    """従来実装（タグごとに全フレームを走査）"""
+    return np.array([
+        int(np.count_nonzero(is_drowsy & (frame_nums >= start) & (frame_nums <= end)))
+        for start, end in zip(starts, ends)
+    ], dtype=np.int64)
+
+
+def _random_case(rng, num_frames, num_tags):
+    frame_nums = np.arange(1, num_frames + 1)
+    # 重複・欠番のあるフレーム番号
+    frame_nums = np.concatenate([frame_nums, rng.choice(frame_nums, num_frames // 10)])
+    frame_nums = np.delete(frame_nums, rng.choice(len(frame_nums), num_frames // 10, replace=False))
+    is_drowsy = rng.random(len(frame_nums)) < 0.3
+    starts = rng.integers(-10, num_frames + 10, num_tags)
+    ends = starts + rng.integers(-20, num_frames // 2, num_tags)
+    return frame_nums, is_drowsy, starts, ends
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_prefix_sum_matches_per_tag_scan(seed):
+    rng = np.random.default_rng(seed)
+    frame_nums, is_drowsy, starts, ends = _random_case(rng, int(rng.integers(1, 500)), int(rng.integers(0, 30)))
+    # フレーム順を入れ替えた入力でも同じ結果になる
+    order = rng.permutation(len(frame_nums))
+
+    for frames, drowsy in ((frame_nums, is_drowsy), (frame_nums[order], is_drowsy[order])):
+        counts = evaluation._count_drowsy_frames_in_intervals(frames, drowsy, starts.tolist(), ends.tolist())
+        np.testing.assert_array_equal(counts, _scan_per_tag(frames, drowsy, starts, ends))
+
+
+def test_overlapping_reversed_and_out_of_range_tags():
+    frame_nums = np.array([5, 3, 1, 2, 4, 6, 8, 7, 10, 9])
+    is_drowsy = np.isin(frame_nums, [2, 3, 4, 8, 9])
+    starts = [1, 3, 2, 8, 6, 11, -5, 4]
+    ends = [4, 9, 2, 3, 6, 20, 0, 4]
+
+    counts = evaluation._count_drowsy_frames_in_intervals(frame_nums, is_drowsy, starts, ends)
+
+    np.testing.assert_array_equal(counts, [3, 4, 1, 0, 0, 0, 0, 1])
+    np.testing.assert_array_equal(counts, _scan_per_tag(frame_nums, is_drowsy, np.array(starts), np.array(ends)))
+
+
+def test_no_tags_and_no_frames():
+    assert len(evaluation._count_drowsy_frames_in_intervals(np.arange(1, 10), np.ones(9, dtype=bool), [], [])) == 0
+    np.testing.assert_array_equal(
+        evaluation._count_drowsy_frames_in_intervals(np.array([], dtype=np.int64), np.array([], dtype=bool), [1, 5], [3, 2]),
+        [0, 0])
+
+
+def test_evaluate_tags_predicted_matches_per_tag_scan():
+    rng = np.random.default_rng(0)
+    frame_nums, is_drowsy, starts, ends = _random_case(rng, 300, 25)
+    tags = [{'tag_ID': index + 1, 'start': int(start), 'end': int(end)} for index, (start, end) in enumerate(zip(starts, ends))]
+
+    tasks = evaluation._evaluate_tags(7, frame_nums, is_drowsy, tags)
+
+    expected = _scan_per_tag(frame_nums, is_drowsy, starts, ends)
+    assert [task['task_id'] for task in tasks] == [f"7_{tag['tag_ID']}" for tag in tags]
+    assert [task['predicted'] for task in tasks] == [int(count > 0) for count in expected]
+    assert [task['correct'] for task in tasks] == [int(count > 0) for count in expected]
@@ -0,0 +1,89 @@
+"""実行メトリクス（metrics.json）の形式と --profile の pstats 出力のテスト"""
+
+import json
+import pstats
+from pathlib import Path
+
+import pytest
+
+import main
+from engine.metrics import METRIC_STAGE_LABELS
+
+RUN_ID = "20990101-000000"
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+    {'frames': 450, 'closed': [(20, 29), (150, 31), (300, 90)], 'tags': [(140, 200), (290, 400)]},
+    {'frames': 200, 'closed': [(0, 45)]},
+]
+STAGE_KEYS = {'wall_seconds', 'cpu_seconds', 'count'}
+
+
+def _run_cli(config_path, *options):
+    """run サブコマンドを実行し、評価ディレクトリを返す"""
+    with pytest.raises(SystemExit) as exit_info:
+        main.main(['run', '--config', str(config_path), '--no-cache', '--run-id', RUN_ID, *options])
+    assert exit_info.value.code == 0
+    evaluation_dirs = list(config_path.parent.glob(f"04_evaluation_output/*/{RUN_ID}"))
+    assert len(evaluation_dirs) == 1
+    return evaluation_dirs[0]
+
+
+def _read_metrics(evaluation_dir):
+    with open(evaluation_dir / "metrics.json", 'r', encoding='utf-8') as f:
+        return json.load(f)['metrics']
+
+
+def test_metrics_json_schema(engine_dataset, tmp_path):
+    config_path = engine_dataset(VIDEOS)
+    evaluation_dir = _run_cli(config_path)
+    metrics = _read_metrics(evaluation_dir)
+
+    assert set(metrics) == {'run_id', 'created_at', 'elapsed_seconds', 'cpu_seconds', 'peak_rss_mb',
+                            'stages', 'throughput', 'io', 'videos'}
+    assert metrics['run_id'] == RUN_ID
+    assert set(metrics['cpu_seconds']) == set(metrics['peak_rss_mb']) == {'parent', 'workers'}
+    # ステージは表示名の定義があるもののみで、直列実行の各段階とビデオ別の合計を含む
+    assert set(metrics['stages']) <= set(METRIC_STAGE_LABELS)
+    assert {'config_load', 'list_core_lib_outputs', 'version_check', 'tag_fetch', 'inference_loop',
+            'algo_output_registration', 'report_generation', 'evaluation_registration',
+            'video_read', 'video_detector', 'video_write', 'video_evaluate'} <= set(metrics['stages'])
+    for name, stage in metrics['stages'].items():
+        assert set(stage) == STAGE_KEYS
+        assert stage['wall_seconds'] >= 0 and stage['cpu_seconds'] >= 0
+        assert stage['count'] == (len(VIDEOS) if name.startswith('video_') else 1)
+
+    # ビデオ別の記録（フレーム数・書き込み量は出力ファイルと一致）
+    videos = sorted(metrics['videos'], key=lambda record: record['video_id'])
+    assert [record['video_id'] for record in videos] == [1, 2, 3]
+    assert [record['frames'] for record in videos] == [video['frames'] for video in VIDEOS]
+    for record in videos:
+        assert record['replay'] == 'reference' and record['cache_hit'] is None
+        assert record['bytes_written'] == Path(record['algo_output_path']).stat().st_size > 0
+        assert record['bytes_read'] > 0
+    assert metrics['throughput']['frames'] == sum(video['frames'] for video in VIDEOS)
+    assert metrics['throughput']['detector_frames_per_second'] > 0
+    assert metrics['io']['bytes_read'] == sum(record['bytes_read'] for record in videos)
+    assert metrics['io']['bytes_written'] > sum(record['bytes_written'] for record in videos)
+
+    # レポートの処理時間セクションとログから参照される
+    report = (evaluation_dir / "evaluation_report.md").read_text(encoding='utf-8')
+    assert "## ⏱️ 処理時間（レポート生成時点）" in report
+    assert f"| {METRIC_STAGE_LABELS['inference_loop']} |" in report
+    assert f"`{evaluation_dir / 'metrics.json'}`" in (tmp_path / "log.md").read_text(encoding='utf-8')
+    assert not (evaluation_dir / "detector_profile.pstats").exists()
+
+
+def test_profile_writes_merged_pstats(engine_dataset):
+    config_path = engine_dataset(VIDEOS)
+    evaluation_dir = _run_cli(config_path, '--profile')
+    metrics = _read_metrics(evaluation_dir)
+
+    assert metrics['profile'] == {'pstats': "detector_profile.pstats", 'text': "detector_profile.txt"}
+    # ビデオ別の cProfile 出力は1つの pstats に集約して削除
+    assert not (evaluation_dir / "profile").exists()
+    stats = pstats.Stats(str(evaluation_dir / metrics['profile']['pstats']))
+    detector_calls = [(function, stat[0]) for (filename, _, function), stat in stats.stats.items()
+                      if filename.endswith("synthetic_detector.py") and function == 'update']
+    # 全ビデオの全フレーム分の検出器の呼び出しを含む
+    assert detector_calls == [('update', sum(video['frames'] for video in VIDEOS))]
+    assert "cumulative" in (evaluation_dir / metrics['profile']['text']).read_text(encoding='utf-8')
@@ -0,0 +1,86 @@
+"""アルゴリズム出力の保存形式（output.format: csv / parquet / feather）の読み書き一致のテスト"""
+
+import json
+
+import numpy as np
+import pytest
+import yaml
+
+import main
+from engine import detector as engine_detector
+from engine.writer import ALGO_OUTPUT_SUFFIXES, _read_algo_output, _write_algo_output
+
+pytest.importorskip('pyarrow')
+
+BINARY_FORMATS = ['parquet', 'feather']
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+    {'frames': 450, 'closed': [(20, 29), (150, 31), (300, 90)], 'tags': [(140, 200), (290, 400)]},
+    {'frames': 200, 'closed': [(0, 45)]},
+]
+
+
+def _algo_df(detector_module):
+    """閉眼区間・低信頼度フレーム（エラーコード付き）を含むアルゴリズム出力"""
+    num_frames = 400
+    closed = (np.arange(num_frames) // 50) % 2 == 1
+    eye_open = np.where(closed, 0.05, 0.3)
+    confidence = np.where(np.arange(num_frames) % 97 == 0, 0.1, 0.95)
+    columns = (np.arange(1, num_frames + 1), eye_open, eye_open, confidence)
+    return engine_detector._run_reference_detector(30.0, columns, detector_module.Config())
+
+
+def _assert_same_as_csv(actual, expected):
+    """バイナリ形式の読み込み結果が CSV の読み込み結果と同じ値であること（continuous_time は float32 で保存）"""
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+    for column in ('frame_num', 'is_drowsy', 'left_eye_closed', 'right_eye_closed'):
+        np.testing.assert_array_equal(actual[column].to_numpy().astype(np.int64), expected[column].to_numpy().astype(np.int64))
+    np.testing.assert_array_equal(actual['continuous_time'].to_numpy(), expected['continuous_time'].to_numpy().astype(np.float32))
+    assert actual['error_code'].astype(str).tolist() == expected['error_code'].tolist()
+
+
+@pytest.mark.parametrize('output_format', BINARY_FORMATS)
+def test_binary_output_reads_back_equal_to_csv(detector_module, tmp_path, output_format):
+    algo_df = _algo_df(detector_module)
+    assert (algo_df['error_code'] != '').any() and algo_df['is_drowsy'].any()
+    csv_path = tmp_path / "1.csv"
+    binary_path = tmp_path / f"1{ALGO_OUTPUT_SUFFIXES[output_format]}"
+
+    _write_algo_output(algo_df, csv_path, 'csv')
+    _write_algo_output(algo_df, binary_path, output_format)
+
+    _assert_same_as_csv(_read_algo_output(binary_path), _read_algo_output(csv_path))
+
+
+def _run(config_path, run_id, output_format):
+    """output.format を書き換えて評価を実行"""
+    config = yaml.safe_load(config_path.read_text(encoding='utf-8'))
+    config['output']['format'] = output_format
+    config_path.write_text(yaml.safe_dump(config, allow_unicode=True, sort_keys=False), encoding='utf-8')
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=run_id)
+    assert engine.run_evaluation()
+    return engine
+
+
+@pytest.mark.parametrize('output_format', BINARY_FORMATS)
+def test_evaluation_with_binary_output_matches_csv_run(engine_dataset, output_format):
+    config_path = engine_dataset(VIDEOS)
+    csv_run = _run(config_path, "20990101-000000", 'csv')
+    binary_run = _run(config_path, "20990101-000001", output_format)
+
+    suffix = ALGO_OUTPUT_SUFFIXES[output_format]
+    assert sorted(path.name for path in binary_run.run_output_dir.glob(f"*{suffix}")) == [f"{index}{suffix}" for index in (1, 2, 3)]
+    for index in (1, 2, 3):
+        _assert_same_as_csv(_read_algo_output(binary_run.run_output_dir / f"{index}{suffix}"),
+                            _read_algo_output(csv_run.run_output_dir / f"{index}.csv"))
+        if index != 3:
+            assert (binary_run.evaluation_output_dir / f"{index}.csv").read_bytes() == \
+                (csv_run.evaluation_output_dir / f"{index}.csv").read_bytes()
+
+    def summary(engine):
+        with open(engine.evaluation_output_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+            evaluation_summary = json.load(f)['evaluation_summary']
+        return evaluation_summary['overall_results'], evaluation_summary['per_dataset']
+
+    assert summary(binary_run) == summary(csv_run)
@@ -0,0 +1,77 @@
+"""ビデオ単位の並列推論（parallel.workers > 1）と直列実行の結果一致のテスト"""
+
+import json
+import sqlite3
+
+import pytest
+import yaml
+
+import main
+
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+    {'frames': 450, 'closed': [(20, 29), (150, 31), (300, 90)], 'tags': [(140, 200), (290, 400)]},
+    {'frames': 300, 'tags': [(50, 80)]},
+    {'frames': 200, 'closed': [(0, 45)]},
+    {'frames': 600, 'closed': [(400, 120)], 'tags': [(380, 540), (100, 150)]},
+]
+
+
+def _run(config_path, run_id, workers):
+    """parallel.workers を書き換えて評価を実行"""
+    config = yaml.safe_load(config_path.read_text(encoding='utf-8'))
+    config['parallel']['workers'] = workers
+    config_path.write_text(yaml.safe_dump(config, allow_unicode=True, sort_keys=False), encoding='utf-8')
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=run_id)
+    assert engine.run_evaluation()
+    return engine
+
+
+def _read_files(directory, pattern):
+    return {path.name: path.read_bytes() for path in sorted(directory.glob(pattern))}
+
+
+def _summary(engine):
+    with open(engine.evaluation_output_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+        summary = json.load(f)['evaluation_summary']
+    return summary['overall_results'], summary['per_dataset']
+
+
+def _registered_rows(db_path, run_id):
+    """実行IDの登録内容を登録順に返す（IDと実行IDを含むパスは実行ごとに異なるため、コアライブラリ出力IDと実行IDを除いたパスで比較）"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        outputs = [(core_lib_output_id, path.replace(run_id, '{run_id}')) for core_lib_output_id, path in conn.execute(
+            "SELECT core_lib_output_ID, algorithm_output_dir FROM algorithm_output_table "
+            "WHERE algorithm_output_dir LIKE ? ORDER BY algorithm_output_ID", (f"%{run_id}%",))]
+        results = conn.execute(
+            "SELECT version, true_positive, false_positive FROM evaluation_result_table "
+            "WHERE evaluation_result_dir LIKE ? ORDER BY evaluation_result_ID", (f"%{run_id}%",)).fetchall()
+        data = [(core_lib_output_id, correct, total, path.replace(run_id, '{run_id}'))
+                for core_lib_output_id, correct, total, path in conn.execute(
+                    "SELECT o.core_lib_output_ID, d.correct_task_num, d.total_task_num, d.evaluation_data_path "
+                    "FROM evaluation_data_table d "
+                    "JOIN algorithm_output_table o ON o.algorithm_output_ID = d.algorithm_output_ID "
+                    "JOIN evaluation_result_table r ON r.evaluation_result_ID = d.evaluation_result_ID "
+                    "WHERE r.evaluation_result_dir LIKE ? ORDER BY d.evaluation_data_ID", (f"%{run_id}%",))]
+        return outputs, results, data
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_parallel_run_matches_serial_run(engine_dataset, tmp_path, workers):
+    config_path = engine_dataset(VIDEOS)
+    serial = _run(config_path, "20990101-000000", 1)
+    parallel = _run(config_path, "20990101-000001", workers)
+
+    assert _read_files(parallel.run_output_dir, "*.csv") == _read_files(serial.run_output_dir, "*.csv")
+    # 評価CSV（ビデオ別）と評価サマリのビデオ別結果
+    evaluation_csvs = _read_files(serial.evaluation_output_dir, "*.csv")
+    assert len(evaluation_csvs) == 4
+    assert _read_files(parallel.evaluation_output_dir, "*.csv") == evaluation_csvs
+    assert _summary(parallel) == _summary(serial)
+
+    serial_rows = _registered_rows(tmp_path / "database.db", "20990101-000000")
+    assert len(serial_rows[0]) == len(VIDEOS) and len(serial_rows[1]) == 1 and len(serial_rows[2]) == 4
+    assert _registered_rows(tmp_path / "database.db", "20990101-000001") == serial_rows
@@ -0,0 +1,258 @@
+"""バッチ再生（_replay_detector_batch）と参照実装（DrowsyDetector.update）のフレーム単位一致テスト
+
+閾値ちょうどの値、低信頼度フレームによる中断、continuous_close_time をまたぐ閉眼区間など、
+比較演算子（< / >=）やリセット条件の取り違えで差が出る系列を検証する。
+実パッケージの drowsy_detection がインストールされている場合はそれに対しても検証する
+（環境変数 DROWSY_DETECTION_REQUIRED=1 の CI ではスキップせず失敗とする）。
+バッチ再生と異なる判定をする検出器では、実行前の照合が不一致を検出して参照実装で推論することを検証する。
+"""
+
+import json
+import math
+import operator
+import os
+import types
+
+import numpy as np
+import pytest
+import yaml
+
+import main
+from engine import deps, detector as engine_detector, replay as engine_replay
+import synthetic_detector
+
+FRAME_RATES = [30.0, 29.97, 10.0]
+
+
+@pytest.fixture(params=['synthetic', 'drowsy_detection'])
+def detector(request, monkeypatch):
+    """検証対象の検出器モジュール（実パッケージが無い場合はスキップ）"""
+    if request.param == 'synthetic':
+        module = synthetic_detector
+    else:
+        try:
+            import drowsy_detection as module
+        except ImportError:
+            if os.environ.get('DROWSY_DETECTION_REQUIRED') == '1':
+                pytest.fail("DROWSY_DETECTION_REQUIRED=1 ですが drowsy_detection をインポートできません")
+            pytest.skip("drowsy_detection がインストールされていません")
+        if module is synthetic_detector:
+            pytest.skip("drowsy_detection が代替検出器に差し替えられています")
+    monkeypatch.setattr(deps, 'drowsy_detection', module)
+    return module
+
+
+def _columns(left, right, confidence):
+    left = np.asarray(left, dtype=np.float64)
+    return (
+        np.arange(1, len(left) + 1, dtype=np.int64),
+        left,
+        np.asarray(right, dtype=np.float64),
+        np.asarray(confidence, dtype=np.float64),
+    )
+
+
+def _adversarial_sequences(config, frame_rate):
+    """閾値・リセット条件の境界を突く入力系列（名前 -> 列配列）"""
+    eye = config.left_eye_close_threshold
+    face = config.face_conf_threshold
+    below, above = np.nextafter(eye, -np.inf), np.nextafter(eye, np.inf)
+    face_below, face_above = np.nextafter(face, -np.inf), np.nextafter(face, np.inf)
+    closed, opened = eye / 2, eye * 2
+    needed = max(1, math.ceil(config.continuous_close_time * frame_rate))
+    sequences = {}
+
+    # 閾値ちょうど・前後の値（単精度から拡張した値を含む）
+    values = [eye, below, above, float(np.float32(eye)), closed, opened]
+    left = [a for a in values for _ in values] * 4
+    right = [b for _ in values for b in values] * 4
+    sequences['exact_eye_threshold'] = _columns(left, right, [1.0] * len(left))
+
+    confidences = [face, face_below, face_above, float(np.float32(face)), 0.0, 1.0]
+    conf = [c for c in confidences for _ in range(needed + 2)]
+    sequences['exact_face_threshold'] = _columns([closed] * len(conf), [closed] * len(conf), conf)
+
+    # 閉眼区間の途中に低信頼度フレームを挟む（リセットされるか）
+    gap_conf = ([1.0] * (needed - 1) + [face_below] + [1.0] * (needed + 1) + [0.0] * 3 + [1.0] * (needed * 2))
+    sequences['low_confidence_gap'] = _columns([closed] * len(gap_conf), [closed] * len(gap_conf), gap_conf)
+
+    # 片目のみ閉眼のフレームで区間が途切れる
+    one_eye = [closed] * (needed + 1) + [opened] + [closed] * (needed + 1)
+    sequences['one_eye_open'] = _columns([closed] * len(one_eye), one_eye, [1.0] * len(one_eye))
+
+    # continuous_close_time をまたぐ閉眼区間（必要フレーム数の前後）
+    left = []
+    for length in (needed - 1, needed, needed + 1, 2 * needed):
+        left += [closed] * length + [opened] * 3
+    sequences['straddle_close_time'] = _columns(left, left, [1.0] * len(left))
+
+    # 閾値近傍の値をランダムに並べた長い系列
+    rng = np.random.default_rng(0)
+    num_frames = 20 * needed
+    eye_choices = np.array([eye, below, above, closed, opened])
+    face_choices = np.array([face, face_below, face_above, 0.0, 1.0])
+    closed_run = (np.arange(num_frames) // needed) % 2 == 0
+    left = np.where(closed_run, rng.choice(eye_choices[:4], num_frames, p=[0.05, 0.05, 0.05, 0.85]),
+                    rng.choice(eye_choices, num_frames))
+    right = np.where(closed_run, rng.choice(eye_choices[:4], num_frames, p=[0.05, 0.05, 0.05, 0.85]),
+                     rng.choice(eye_choices, num_frames))
+    conf = rng.choice(face_choices, num_frames, p=[0.02, 0.02, 0.02, 0.02, 0.92])
+    sequences['random_near_threshold'] = _columns(left, right, conf)
+    return sequences
+
+
+@pytest.mark.parametrize('frame_rate', FRAME_RATES)
+def test_batch_replay_matches_reference_frame_by_frame(detector, frame_rate):
+    config = detector.Config()
+    for name, columns in _adversarial_sequences(config, frame_rate).items():
+        expected = engine_detector._run_reference_detector(frame_rate, columns, detector.Config())
+        actual = engine_detector._replay_detector_batch(detector.Config(), frame_rate, *columns)
+        assert actual is not None, "Config にバッチ再生に必要な属性がありません"
+        assert list(actual.columns) == list(expected.columns), name
+        mismatch = engine_detector._first_mismatch(expected, actual)
+        assert mismatch is None, (
+            f"{name}: {mismatch}行目が不一致\n"
+            f"reference: {expected.iloc[mismatch].to_dict()}\nbatch: {actual.iloc[mismatch].to_dict()}"
+        )
+
+
+@pytest.mark.parametrize('frame_rate', FRAME_RATES)
+def test_verification_accepts_matching_detector(detector, frame_rate):
+    config = detector.Config()
+    samples = _adversarial_sequences(config, frame_rate)
+
+    assert engine_detector._find_batch_replay_mismatch(config, frame_rate, samples) is None
+
+
+def _update_with(eye_closed=operator.lt, drowsy=operator.ge, reset_on_low_confidence=True, error_code='E001'):
+    """判定の一部をバッチ再生の前提と変えた DrowsyDetector.update"""
+    def update(self, input_data):
+        if input_data.face_confidence < self.config.face_conf_threshold:
+            if reset_on_low_confidence:
+                self.closed_frames = 0
+            return synthetic_detector.OutputData(False, input_data.frame_num, False, False, 0.0, error_code)
+        left_closed = eye_closed(input_data.left_eye_open, self.config.left_eye_close_threshold)
+        right_closed = eye_closed(input_data.right_eye_open, self.config.right_eye_close_threshold)
+        self.closed_frames = self.closed_frames + 1 if (left_closed and right_closed) else 0
+        continuous_time = self.closed_frames / self.frame_rate
+        return synthetic_detector.OutputData(drowsy(continuous_time, self.config.continuous_close_time),
+                                             input_data.frame_num, left_closed, right_closed, continuous_time)
+    return update
+
+
+DEVIATIONS = {
+    'inclusive_eye_threshold': _update_with(eye_closed=operator.le),
+    'strict_close_time': _update_with(drowsy=operator.gt),
+    'no_reset_on_low_confidence': _update_with(reset_on_low_confidence=False),
+    'other_error_code': _update_with(error_code='E101'),
+}
+
+
+def _deviating_module(name):
+    """バッチ再生と一部の判定が異なる検出器モジュール（ソースを特定できないため照合結果は記録されない）"""
+    module = types.ModuleType(f"deviating_{name}")
+    for attribute in ('Config', 'InputData', 'OutputData', '__version__'):
+        setattr(module, attribute, getattr(synthetic_detector, attribute))
+    module.DrowsyDetector = type('DrowsyDetector', (synthetic_detector.DrowsyDetector,), {'update': DEVIATIONS[name]})
+    return module
+
+
+@pytest.mark.parametrize('name', sorted(DEVIATIONS))
+def test_verification_detects_deviating_detector_without_samples(name, monkeypatch):
+    module = _deviating_module(name)
+    monkeypatch.setattr(deps, 'drowsy_detection', module)
+
+    assert engine_detector._find_batch_replay_mismatch(module.Config(), 30.0) is not None
+
+
+def test_verify_mode_uses_batch_replay_only_after_verification(detector_module):
+    config = detector_module.Config()
+    columns = _adversarial_sequences(config, 30.0)['random_near_threshold']
+    df = dict(zip(('frame', 'leye_openness', 'reye_openness', 'confidence'), columns))
+    reference_df = engine_detector._run_reference_detector(30.0, columns, config)
+    settings = {'frame_rate': 30.0, 'replay_mode': 'verify', 'chunk_frames': 108000}
+
+    algo_df, replay = engine_detector._run_detector(df, dict(settings, batch_replay=True))
+    assert replay == 'batch'
+    assert engine_detector._first_mismatch(reference_df, algo_df) is None
+
+    algo_df, replay = engine_detector._run_detector(df, dict(settings, batch_replay=False))
+    assert replay == 'fallback'
+    assert engine_detector._first_mismatch(reference_df, algo_df) is None
+
+
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+    {'frames': 300, 'closed': [(20, 29), (150, 31)], 'tags': [(140, 200)]},
+    {'frames': 300, 'tags': [(50, 80)]},
+]
+
+
+def _run(config_path, run_id, replay_mode):
+    """replay.mode を書き換えて評価を実行"""
+    config = yaml.safe_load(config_path.read_text(encoding='utf-8'))
+    config['replay']['mode'] = replay_mode
+    config_path.write_text(yaml.safe_dump(config, allow_unicode=True, sort_keys=False), encoding='utf-8')
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=run_id)
+    assert engine.run_evaluation()
+    return engine
+
+
+def _algo_outputs(engine):
+    return {path.name: path.read_text(encoding='utf-8') for path in sorted(engine.run_output_dir.glob("*.csv"))}
+
+
+def _per_dataset(engine):
+    with open(engine.evaluation_output_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+        return json.load(f)['evaluation_summary']['per_dataset']
+
+
+def test_verify_run_verifies_once_and_matches_reference_run(engine_dataset, monkeypatch):
+    config_path = engine_dataset(VIDEOS)
+    reference = _run(config_path, "20990101-000000", 'reference')
+
+    verifications = []
+    find_mismatch = engine_replay._find_batch_replay_mismatch
+    monkeypatch.setattr(engine_replay, '_find_batch_replay_mismatch',
+                        lambda *args: verifications.append(args[2]) or find_mismatch(*args))
+    for run_id in ("20990101-000001", "20990101-000002"):
+        engine = _run(config_path, run_id, 'verify')
+
+        assert engine.replay_stats == {'batch': 3, 'fallback': 0}
+        assert _algo_outputs(engine) == _algo_outputs(reference)
+        assert _per_dataset(engine) == _per_dataset(reference)
+    # 照合は先頭のビデオ（replay.verify_samples 件）で1回のみ。2回目の実行は照合結果を再利用
+    assert [list(samples) for samples in verifications] == [["ビデオID=1"]]
+
+
+def test_verify_run_falls_back_to_reference_on_mismatch(engine_dataset, monkeypatch):
+    config_path = engine_dataset(VIDEOS)
+    monkeypatch.setattr(deps, 'drowsy_detection', _deviating_module('no_reset_on_low_confidence'))
+    reference = _run(config_path, "20990101-000000", 'reference')
+
+    engine = _run(config_path, "20990101-000001", 'verify')
+
+    assert engine.batch_replay is False
+    assert engine.replay_stats == {'batch': 0, 'fallback': 3}
+    assert _algo_outputs(engine) == _algo_outputs(reference)
+
+
+def test_sweep_batch_mode_verifies_each_variant(engine_dataset, monkeypatch):
+    config_path = engine_dataset(VIDEOS, {'sweep': {'grid': {'continuous_close_time': [0.5, 1.0]}, 'replay_mode': 'batch'}})
+    monkeypatch.setattr(deps, 'drowsy_detection', _deviating_module('inclusive_eye_threshold'))
+    engine = main.EvaluationEngine(str(config_path), use_cache=False)
+    assert engine.run_sweep()
+
+    with open(engine.evaluation_output_dir / "sweep_summary.json", 'r', encoding='utf-8') as f:
+        sweep_summary = json.load(f)['sweep_summary']
+    assert sweep_summary['replay_mode'] == 'verify'
+    assert [item['batch_replay'] for item in sweep_summary['ranking']] == [False, False]
+
+
+def test_batch_mode_is_rejected_for_production_runs():
+    with pytest.raises(ValueError, match='replay.mode: verify'):
+        engine_detector._get_replay_mode({'mode': 'batch'})
+    with pytest.raises(ValueError):
+        engine_detector._get_replay_mode({'mode': 'fast'})
+    assert engine_detector._get_replay_mode({}) == 'reference'
+    assert engine_detector._get_replay_mode({'mode': 'verify'}) == 'verify'
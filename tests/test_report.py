@@ -0,0 +1,139 @@
+"""保存済みの評価結果からのレポート再生成（report）と評価サマリ表示（summary）のテスト"""
+
+import json
+import shutil
+
+import pytest
+
+import main
+
+RUN_ID = "20990101-000000"
+# ビデオ1は2件目のタグを未検知（不正解）、ビデオ2は全タスク正解
+VIDEOS = [
+    {'frames': 600, 'closed': [(100, 60)], 'tags': [(100, 200), (400, 500)]},
+    {'frames': 300, 'closed': [(50, 60)], 'tags': [(50, 150)]},
+]
+
+
+def _cli(*argv):
+    with pytest.raises(SystemExit) as exit_info:
+        main.main(list(argv))
+    return exit_info.value.code
+
+
+def _read_summary(evaluation_dir):
+    with open(evaluation_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+        return json.load(f)['evaluation_summary']
+
+
+def _frame_stats(evaluation_dir):
+    return {dataset['video_id']: (dataset.get('total_frames'), dataset.get('drowsy_frames'))
+            for dataset in _read_summary(evaluation_dir)['per_dataset']}
+
+
+def _stats_rows(evaluation_dir):
+    """評価レポートのアルゴリズム検出統計の行"""
+    report = (evaluation_dir / "evaluation_report.md").read_text(encoding='utf-8')
+    section = report.split("## 🔍 アルゴリズム検出統計")[1].split("## 📖 詳細結果")[0]
+    return [line for line in section.splitlines() if line.startswith("| ") and not line.startswith("| ビデオID")]
+
+
+def test_report_after_incremental_keeps_detection_stats(engine_dataset):
+    config_path = engine_dataset(VIDEOS)
+    first = main.EvaluationEngine(str(config_path), use_cache=False, incremental=True, run_id=RUN_ID)
+    assert first.run_evaluation()
+    second = main.EvaluationEngine(str(config_path), use_cache=False, incremental=True, run_id="20990101-000001")
+    assert second.run_evaluation()
+    assert second.num_reused_videos == 2
+    evaluation_dir = second.evaluation_output_dir
+    stats_rows = _stats_rows(evaluation_dir)
+
+    # 再利用したビデオのアルゴ出力は前回の実行ディレクトリにのみある
+    assert _cli('report', "20990101-000001", '--config', str(config_path)) == 0
+
+    frame_stats = _frame_stats(evaluation_dir)
+    assert frame_stats == _frame_stats(first.evaluation_output_dir)
+    assert [total_frames for total_frames, _ in frame_stats.values()] == [600, 300]
+    assert _stats_rows(evaluation_dir) == stats_rows
+    assert len(stats_rows) == 2
+
+
+@pytest.mark.parametrize('detail, detailed_videos', [('summary', []), ('failed', [1]), ('full', [1, 2])])
+def test_report_detail_levels(engine_dataset, detail, detailed_videos):
+    config_path = engine_dataset(VIDEOS)
+    engine = main.EvaluationEngine(str(config_path), use_cache=False)
+    assert engine.run_evaluation()
+    evaluation_dir = engine.evaluation_output_dir
+    summary = _read_summary(evaluation_dir)
+
+    assert _cli('report', str(evaluation_dir), '--config', str(config_path), '--detail', detail) == 0
+
+    report = (evaluation_dir / "evaluation_report.md").read_text(encoding='utf-8')
+    assert [video_id for video_id in (1, 2) if f"### ビデオ{video_id}の詳細結果" in report] == detailed_videos
+    if detail == 'failed':
+        # 不正解タスクのみ
+        details = report.split("### ビデオ1の詳細結果")[1]
+        assert details.count("| ❌ |") == 1 and "| ✅ |" not in details
+    rebuilt = _read_summary(evaluation_dir)
+    assert rebuilt['overall_results'] == summary['overall_results']
+    assert rebuilt['per_dataset'] == summary['per_dataset']
+
+
+def test_report_shard_details_writes_per_video_files(engine_dataset):
+    config_path = engine_dataset(VIDEOS)
+    engine = main.EvaluationEngine(str(config_path), use_cache=False)
+    assert engine.run_evaluation()
+    evaluation_dir = engine.evaluation_output_dir
+
+    assert _cli('report', str(evaluation_dir), '--config', str(config_path), '--detail', 'full', '--shard-details') == 0
+
+    report = (evaluation_dir / "evaluation_report.md").read_text(encoding='utf-8')
+    assert "### ビデオ1の詳細結果" not in report
+    for video_id in (1, 2):
+        assert f"[詳細](details/{video_id}.md)" in report
+        assert (evaluation_dir / "details" / f"{video_id}.md").read_text(encoding='utf-8').startswith(
+            f"# ビデオ{video_id}の詳細結果")
+
+
+def test_report_of_merged_shards_takes_frame_stats_from_partials(engine_dataset, tmp_path):
+    config_path = engine_dataset(VIDEOS)
+    for index in range(2):
+        engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=RUN_ID, shard=(index, 2))
+        assert engine.run_evaluation()
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=RUN_ID)
+    assert engine.run_merge()
+    evaluation_dir = engine.evaluation_output_dir
+    frame_stats = _frame_stats(evaluation_dir)
+    stats_rows = _stats_rows(evaluation_dir)
+
+    # アルゴ出力・評価サマリの記録が無くても、シャードの部分結果から検出統計を復元する
+    shutil.rmtree(tmp_path / "03_algorithm_output")
+    summary_path = evaluation_dir / "evaluation_summary.json"
+    evaluation_summary = json.loads(summary_path.read_text(encoding='utf-8'))
+    for dataset in evaluation_summary['evaluation_summary']['per_dataset']:
+        del dataset['total_frames'], dataset['drowsy_frames']
+    summary_path.write_text(json.dumps(evaluation_summary), encoding='utf-8')
+
+    assert _cli('report', RUN_ID, '--config', str(config_path)) == 0
+
+    assert _frame_stats(evaluation_dir) == frame_stats
+    assert _stats_rows(evaluation_dir) == stats_rows
+
+
+def test_summary_text_and_json(engine_dataset, capsys):
+    config_path = engine_dataset(VIDEOS)
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=RUN_ID)
+    assert engine.run_evaluation()
+    summary = _read_summary(engine.evaluation_output_dir)
+    capsys.readouterr()
+
+    assert _cli('summary', RUN_ID, '--config', str(config_path)) == 0
+    text = capsys.readouterr().out
+    assert f"実行ID: {RUN_ID}" in text
+    assert "全体正解率: 0.667 (2/3)" in text
+    assert "ビデオID=1: 0.500 (1/2)" in text and "ビデオID=2: 1.000 (1/1)" in text
+
+    assert _cli('summary', RUN_ID, '--config', str(config_path), '--json') == 0
+    assert json.loads(capsys.readouterr().out)['evaluation_summary'] == summary
+
+    assert _cli('summary', "20990101-999999", '--config', str(config_path)) == 1
@@ -0,0 +1,100 @@
+"""中断した実行のチェックポイントからの再開（--resume）のテスト"""
+
+import json
+import sqlite3
+
+import pytest
+
+import main
+from engine.warehouse import DWHBulkWriter
+
+RUN_ID = "20990101-000000"
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+    {'frames': 450, 'closed': [(20, 29), (150, 31), (300, 90)], 'tags': [(140, 200), (290, 400)]},
+    {'frames': 300, 'tags': [(50, 80)]},
+    {'frames': 200, 'closed': [(0, 45)]},
+    {'frames': 600, 'closed': [(400, 120)], 'tags': [(380, 540), (100, 150)]},
+]
+CHECKPOINT = {'checkpoint': {'enabled': True}}
+
+
+def _fail_after(calls, original):
+    """calls 回目の呼び出しから例外を送出するラッパー（それまでは original を呼び出す）"""
+    count = []
+
+    def wrapper(*args, **kwargs):
+        count.append(1)
+        if len(count) >= calls:
+            raise RuntimeError("injected crash")
+        return original(*args, **kwargs)
+    return wrapper
+
+
+# 中断箇所 -> (差し替える属性, 失敗させる呼び出し回数, 再開時に再利用されるビデオ数, 中断時点で登録済みのアルゴ出力数)
+CRASH_POINTS = {
+    # 2ビデオの評価後（3ビデオ目の評価中）
+    'inference_loop': (main.EvaluationEngine, '_evaluate_video', 3, 2, 0),
+    # 全ビデオの推論後、アルゴ出力の一括登録の3件目（登録はロールバックされる）
+    'algorithm_output_registration': (DWHBulkWriter, 'create_algorithm_output', 3, 5, 0),
+    # アルゴ出力の登録後、評価結果の登録中（登録済みのアルゴ出力IDはチェックポイントに記録済み）
+    'evaluation_registration': (main.EvaluationEngine, '_register_evaluation_to_db', 1, 5, 5),
+}
+
+
+def _summary(engine):
+    with open(engine.evaluation_output_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+        summary = json.load(f)['evaluation_summary']
+    return summary['overall_results'], summary['per_dataset']
+
+
+def _registered_rows(db_path, run_id):
+    """実行IDのアルゴ出力（ID, コアライブラリ出力ID）・評価結果ID・評価明細（アルゴ出力ID）を返す"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        outputs = conn.execute(
+            "SELECT algorithm_output_ID, core_lib_output_ID FROM algorithm_output_table "
+            "WHERE algorithm_output_dir LIKE ? ORDER BY algorithm_output_ID", (f"%{run_id}%",)).fetchall()
+        results = [row[0] for row in conn.execute(
+            "SELECT evaluation_result_ID FROM evaluation_result_table WHERE evaluation_result_dir LIKE ?", (f"%{run_id}%",))]
+        data = [row[0] for row in conn.execute(
+            "SELECT d.algorithm_output_ID FROM evaluation_data_table d "
+            "JOIN evaluation_result_table r ON r.evaluation_result_ID = d.evaluation_result_ID "
+            "WHERE r.evaluation_result_dir LIKE ? ORDER BY d.evaluation_data_ID", (f"%{run_id}%",))]
+        return outputs, results, data
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('crash_point', sorted(CRASH_POINTS))
+def test_resume_after_crash_reuses_journal_without_duplicate_rows(engine_dataset, tmp_path, monkeypatch, crash_point):
+    config_path = engine_dataset(VIDEOS, CHECKPOINT)
+    db_path = tmp_path / "database.db"
+    reference = main.EvaluationEngine(str(config_path), use_cache=False, run_id="20990101-000001")
+    assert reference.run_evaluation()
+
+    owner, name, calls, num_resumed, num_registered = CRASH_POINTS[crash_point]
+    with monkeypatch.context() as patch:
+        patch.setattr(owner, name, _fail_after(calls, getattr(owner, name)))
+        assert not main.EvaluationEngine(str(config_path), use_cache=False, run_id=RUN_ID).run_evaluation()
+    outputs_before_resume, results_before_resume, _ = _registered_rows(db_path, RUN_ID)
+    assert len(outputs_before_resume) == num_registered and results_before_resume == []
+
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, resume_run_id=RUN_ID)
+    assert engine.run_evaluation()
+
+    assert engine.num_resumed_videos == num_resumed
+    assert _summary(engine) == _summary(reference)
+    outputs, results, data = _registered_rows(db_path, RUN_ID)
+    # アルゴ出力はビデオごとに1件のみ（中断前に登録済みの分は同じIDを再利用）、評価結果は1件
+    assert sorted(core_lib_output_id for _, core_lib_output_id in outputs) == [1, 2, 3, 4, 5]
+    assert outputs[:len(outputs_before_resume)] == outputs_before_resume
+    assert len(results) == 1
+    # 評価明細はタグのあるビデオのアルゴ出力をそれぞれ1回だけ参照し、参照先の無い行を残さない
+    output_ids = {algorithm_output_id for algorithm_output_id, _ in outputs}
+    assert len(data) == len(set(data)) == len(_registered_rows(db_path, "20990101-000001")[2])
+    assert set(data) <= output_ids
+
+    # 完了済みの実行は再開しても何も登録しない
+    assert main.EvaluationEngine(str(config_path), use_cache=False, resume_run_id=RUN_ID).run_evaluation()
+    assert _registered_rows(db_path, RUN_ID) == (outputs, results, data)
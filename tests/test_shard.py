@@ -0,0 +1,50 @@
+"""シャード実行（--shard）と部分結果の統合（--merge）のテスト"""
+
+import json
+import sqlite3
+
+import main
+
+RUN_ID = "20990101-000000"
+VIDEOS = [{'frames': 600, 'closed': [(180, 60), (400, 45)], 'tags': [(180, 260)]} for _ in range(4)]
+CHUNKING = {'chunking': {'enabled': True, 'chunk_frames': 200, 'warmup_frames': 60}}
+
+
+def _run_shards(config_path, shard_count):
+    for index in range(shard_count):
+        engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=RUN_ID, shard=(index, shard_count))
+        assert engine.run_evaluation()
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=RUN_ID)
+    assert engine.run_merge()
+    return engine
+
+
+def test_merge_sums_chunk_stats_of_all_shards(engine_dataset):
+    config_path = engine_dataset(VIDEOS, CHUNKING)
+
+    engine = _run_shards(config_path, 2)
+
+    assert engine.chunk_stats == {'chunked': 4, 'chunk_fallback': 0}
+    with open(engine.config['logging']['file'], 'r', encoding='utf-8') as f:
+        assert "チャンク分割推論**: 4件" in f.read()
+
+
+def test_merged_summary_matches_unsharded_run(engine_dataset, tmp_path):
+    config_path = engine_dataset(VIDEOS, CHUNKING)
+    serial = main.EvaluationEngine(str(config_path), use_cache=False)
+    assert serial.run_evaluation()
+
+    merged = _run_shards(config_path, 3)
+
+    def overall(engine):
+        with open(engine.evaluation_output_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+            summary = json.load(f)['evaluation_summary']
+        return summary['overall_results'], summary['per_dataset']
+
+    assert overall(merged) == overall(serial)
+    conn = sqlite3.connect(str(tmp_path / "database.db"))
+    try:
+        # 評価結果は統合時に1回のみ登録
+        assert conn.execute("SELECT COUNT(*) FROM evaluation_result_table").fetchone()[0] == 2
+    finally:
+        conn.close()
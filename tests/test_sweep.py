@@ -0,0 +1,80 @@
+"""パラメータスイープ（--sweep）のバリアント別出力とランキングのテスト"""
+
+import json
+import sqlite3
+
+import main
+
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 20)], 'tags': [(100, 200)]},
+    {'frames': 300, 'closed': [(50, 40)], 'tags': [(40, 120)]},
+    {'frames': 300, 'closed': [(150, 90)], 'tags': [(140, 260)]},
+]
+GRID = {'continuous_close_time': [0.5, 1.0, 2.0], 'frame_rate': [30.0, 15.0]}
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_sweep_writes_every_grid_variant_and_ranks_them(engine_dataset, tmp_path):
+    config_path = engine_dataset(VIDEOS, {'sweep': {'grid': GRID}})
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id="20990101-000000")
+    assert engine.run_sweep()
+
+    sweep_dir = engine.evaluation_output_dir
+    assert sweep_dir.name == "sweep_20990101-000000"
+    ranking = _read_json(sweep_dir / "sweep_summary.json")['sweep_summary']['ranking']
+    # 直積の全組み合わせ（grid のキー順に展開）
+    expected_params = [{'continuous_close_time': close_time, 'frame_rate': frame_rate}
+                       for close_time in GRID['continuous_close_time'] for frame_rate in GRID['frame_rate']]
+    assert [item['params'] for item in sorted(ranking, key=lambda item: item['variant'])] == expected_params
+    assert [(-item['accuracy'], item['detection_rate']) for item in ranking] == sorted(
+        (-item['accuracy'], item['detection_rate']) for item in ranking)
+
+    for index, params in enumerate(expected_params):
+        variant_dir = sweep_dir / f"variant_{index:03d}"
+        summary = _read_json(variant_dir / "evaluation_summary.json")['evaluation_summary']
+        assert summary['evaluation_conditions']['frame_rate'] == params['frame_rate']
+        assert summary['evaluation_conditions']['config_overrides'] == {'continuous_close_time': params['continuous_close_time']}
+        assert sorted(path.name for path in variant_dir.glob("*.csv")) == ["1.csv", "2.csv", "3.csv"]
+        item = next(item for item in ranking if item['variant'] == variant_dir.name)
+        assert item['accuracy'] == summary['overall_results']['accuracy']
+
+    # 30fps では 0.5秒（15フレーム）で全タグを検知し、2.0秒（60フレーム）では90フレーム閉眼のビデオのみ検知
+    accuracy = {(item['params']['continuous_close_time'], item['params']['frame_rate']): item['accuracy'] for item in ranking}
+    assert accuracy[(0.5, 30.0)] == 1.0
+    assert accuracy[(2.0, 30.0)] == 1 / 3
+    report = (sweep_dir / "sweep_report.md").read_text(encoding='utf-8')
+    assert all(f"[{item['variant']}]({item['variant']}/evaluation_summary.json)" in report for item in ranking)
+
+    # DataWareHouse へは登録しない
+    conn = sqlite3.connect(str(tmp_path / "database.db"))
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM algorithm_output_table").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM evaluation_result_table").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_sweep_variant_with_default_config_matches_evaluation_run(engine_dataset):
+    config_path = engine_dataset(VIDEOS, {'sweep': {'grid': {'continuous_close_time': [0.5, 1.0]}}})
+    evaluation = main.EvaluationEngine(str(config_path), use_cache=False, run_id="20990101-000000")
+    assert evaluation.run_evaluation()
+    sweep = main.EvaluationEngine(str(config_path), use_cache=False, run_id="20990101-000001")
+    assert sweep.run_sweep()
+
+    # continuous_close_time: 1.0 は Config の既定値
+    expected = _read_json(evaluation.evaluation_output_dir / "evaluation_summary.json")['evaluation_summary']
+    actual = _read_json(sweep.evaluation_output_dir / "variant_001" / "evaluation_summary.json")['evaluation_summary']
+    assert actual['overall_results'] == expected['overall_results']
+    for name in ("1.csv", "2.csv", "3.csv"):
+        assert (sweep.evaluation_output_dir / "variant_001" / name).read_text(encoding='utf-8') == \
+            (evaluation.evaluation_output_dir / name).read_text(encoding='utf-8')
+
+
+def test_sweep_rejects_unknown_config_parameter(engine_dataset):
+    config_path = engine_dataset(VIDEOS, {'sweep': {'grid': {'no_such_threshold': [1, 2]}}})
+
+    assert not main.EvaluationEngine(str(config_path), use_cache=False).run_sweep()
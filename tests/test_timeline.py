@@ -0,0 +1,59 @@
+"""全フレーム評価（誤検知・イベント単位の評価）のテスト"""
+
+import json
+import sqlite3
+
+import numpy as np
+
+import main
+from engine import evaluation
+
+
+def test_untagged_video_timeline_counts_all_alarms_as_false_positives():
+    frame_nums = np.arange(1, 301)
+    is_drowsy = np.zeros(300, dtype=bool)
+    is_drowsy[50:100] = True
+    is_drowsy[200:210] = True
+
+    timeline = evaluation._evaluate_timeline(frame_nums, is_drowsy, [], 30.0)
+
+    assert timeline['alarm_events'] == timeline['false_positive_events'] == 2
+    assert timeline['false_positive_frames'] == 60
+    assert timeline['ground_truth_frames'] == 0
+    assert evaluation._timeline_rates(timeline)['false_positive_rate'] == 60 / 300
+
+
+def test_untagged_video_is_included_in_overall_timeline_and_registration(engine_dataset):
+    config_path = engine_dataset([
+        # タグ区間内の閉眼（正検知）のみ
+        {'frames': 900, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+        # タグの無いビデオで2回の閉眼アラーム（誤検知）
+        {'frames': 900, 'closed': [(300, 60), (600, 45)]},
+    ])
+
+    engine = main.EvaluationEngine(str(config_path), use_cache=False)
+    assert engine.run_evaluation()
+
+    evaluation_dir = engine.evaluation_output_dir
+    with open(evaluation_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+        summary = json.load(f)['evaluation_summary']
+    assert [dataset['video_id'] for dataset in summary['per_dataset']] == [1]
+    assert [video['video_id'] for video in summary['untagged_videos']] == [2]
+    untagged = summary['untagged_videos'][0]['timeline']
+    assert untagged['false_positive_events'] == 2
+    # 閉眼1秒（30フレーム）到達後のフレームがアラーム
+    assert untagged['false_positive_frames'] == (60 - 29) + (45 - 29)
+
+    overall = summary['overall_results']['timeline']
+    assert overall['num_videos'] == 2
+    assert overall['false_positive_events'] == 2
+    assert overall['false_positive_frames'] == untagged['false_positive_frames']
+    assert overall['num_frames'] == 1800
+    assert "2（タグなし）" in (evaluation_dir / "evaluation_report.md").read_text(encoding='utf-8')
+
+    conn = sqlite3.connect(engine.db_path)
+    try:
+        registered = conn.execute("SELECT false_positive FROM evaluation_result_table").fetchone()[0]
+    finally:
+        conn.close()
+    assert registered == overall['false_positive_rate'] > 0
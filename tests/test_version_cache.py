@@ -0,0 +1,57 @@
+"""バージョン解決キャッシュ（algorithm.version_check.cache_file）のテスト"""
+
+import json
+
+import main
+from engine import algorithm
+
+REMOTE_COMMIT = "0123456789abcdef0123456789abcdef01234567"
+
+
+def _engine_factory(engine_dataset, tmp_path, monkeypatch):
+    """リモート確認の回数を記録する EvaluationEngine の生成関数と、インストール済みの状態を返す"""
+    cache_file = tmp_path / "version_cache.json"
+    config_path = engine_dataset([{'frames': 60}], {'algorithm': {'version_check': {
+        'offline': False, 'ttl_minutes': 60, 'auto_update': False, 'cache_file': str(cache_file)}}})
+    installed = {'commit': REMOTE_COMMIT, 'version': "0.1.0"}
+    remote_checks = []
+    monkeypatch.setattr(algorithm, '_get_installed_commit_hash', lambda: installed['commit'])
+    monkeypatch.setattr(algorithm, '_get_installed_version', lambda: installed['version'])
+    monkeypatch.setattr(algorithm.AlgorithmVersionMixin, '_get_algorithm_commit_hash',
+                        lambda self: remote_checks.append(1) or REMOTE_COMMIT)
+
+    def create():
+        engine = main.EvaluationEngine(str(config_path), use_cache=False)
+        engine._resolve_algorithm_version()
+        return engine
+
+    return create, installed, remote_checks, cache_file
+
+
+def test_cache_stores_installed_version_and_skips_remote_check(engine_dataset, tmp_path, monkeypatch):
+    create, _, remote_checks, cache_file = _engine_factory(engine_dataset, tmp_path, monkeypatch)
+
+    assert create().algorithm_version_source == "リモート確認"
+    entry = next(iter(json.loads(cache_file.read_text(encoding='utf-8')).values()))
+    assert (entry['remote_commit'], entry['installed_commit'], entry['installed_version']) == (
+        REMOTE_COMMIT, REMOTE_COMMIT, "0.1.0")
+
+    assert create().algorithm_version_source == "キャッシュ"
+    assert len(remote_checks) == 1
+
+
+def test_cache_is_stale_when_installed_version_changes(engine_dataset, tmp_path, monkeypatch):
+    create, installed, remote_checks, cache_file = _engine_factory(engine_dataset, tmp_path, monkeypatch)
+    create()
+
+    installed['version'] = "0.2.0"
+    assert create().algorithm_version_source == "リモート確認"
+    assert len(remote_checks) == 2
+    entry = next(iter(json.loads(cache_file.read_text(encoding='utf-8')).values()))
+    assert entry['installed_version'] == "0.2.0"
+
+    # インストール済みのバージョンを記録していない（旧形式の）エントリも再確認する
+    entry.pop('installed_version')
+    cache_file.write_text(json.dumps({'synthetic': entry}), encoding='utf-8')
+    create()
+    assert len(remote_checks) == 3
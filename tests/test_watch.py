@@ -0,0 +1,120 @@
+"""監視モード（--watch）のジョブ再試行（WatchJobTracker）のテスト"""
+
+import sqlite3
+
+import main
+from engine.watch import WatchJobTracker
+
+
+def _outputs(*job_ids):
+    return [{'core_lib_output_ID': job_id, 'video_ID': job_id} for job_id in job_ids]
+
+
+def test_tracker_marks_job_done_only_on_success():
+    tracker = WatchJobTracker(max_retries=2, retry_backoff_seconds=10)
+
+    assert [o['core_lib_output_ID'] for o in tracker.take_ready(_outputs(1, 2), now=0)] == [1, 2]
+    # 処理中のジョブは再投入しない
+    assert tracker.take_ready(_outputs(1, 2), now=1) == []
+
+    tracker.succeeded(1)
+    assert tracker.failed(2, now=1) == 10
+    assert tracker.take_ready(_outputs(1, 2), now=10) == []
+    assert [o['core_lib_output_ID'] for o in tracker.take_ready(_outputs(1, 2), now=11)] == [2]
+
+    # バックオフは失敗ごとに倍増し、上限を超えると破棄
+    assert tracker.failed(2, now=11) == 20
+    assert tracker.take_ready(_outputs(2), now=30) == []
+    assert len(tracker.take_ready(_outputs(2), now=31)) == 1
+    assert tracker.failed(2, now=31) is None
+    assert tracker.take_ready(_outputs(2), now=1000) == []
+    assert tracker.completed == {1} and tracker.abandoned == {2}
+
+
+def _watch_overrides(**watch):
+    return {'watch': {'process_existing': True, 'poll_interval_seconds': 0.05, 'rollup_interval_seconds': 0,
+                      'retry_backoff_seconds': 0.05, 'max_runtime_minutes': 0.02, 'max_concurrency': 1, **watch}}
+
+
+def _registered_outputs(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT core_lib_output_ID FROM algorithm_output_table ORDER BY 1")]
+    finally:
+        conn.close()
+
+
+def _fail_first_registrations(engine, monkeypatch, failures):
+    register = engine._register_algorithm_outputs
+    calls = []
+
+    def flaky_register(aggregates, algorithm_id):
+        calls.append(aggregates[0]['core_lib_output_id'])
+        if calls.count(aggregates[0]['core_lib_output_id']) <= failures:
+            raise RuntimeError("一時的な登録エラー")
+        return register(aggregates, algorithm_id)
+
+    monkeypatch.setattr(engine, '_register_algorithm_outputs', flaky_register)
+    return calls
+
+
+def test_watch_retries_failed_job_until_registered(engine_dataset, monkeypatch):
+    config_path = engine_dataset([
+        {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+        {'frames': 300, 'tags': [(10, 20)]},
+    ], _watch_overrides(max_retries=3))
+    engine = main.EvaluationEngine(str(config_path), use_cache=False)
+    calls = _fail_first_registrations(engine, monkeypatch, failures=1)
+
+    video_results = []
+    monkeypatch.setattr(engine, '_finish_evaluation', video_results.extend)
+    assert engine.run_watch()
+
+    assert sorted(calls) == [1, 1, 2, 2]
+    assert [result['core_lib_output_id'] for result in video_results] == [1, 2]
+    assert _registered_outputs(engine.db_path) == [1, 2]
+
+
+def test_watch_abandons_job_after_max_retries(engine_dataset, monkeypatch):
+    config_path = engine_dataset([
+        {'frames': 300, 'tags': [(10, 20)]},
+    ], _watch_overrides(max_retries=1))
+    engine = main.EvaluationEngine(str(config_path), use_cache=False)
+    calls = _fail_first_registrations(engine, monkeypatch, failures=10)
+
+    video_results = []
+    monkeypatch.setattr(engine, '_finish_evaluation', video_results.extend)
+    assert engine.run_watch()
+
+    assert calls == [1, 1]
+    assert video_results == []
+    assert _registered_outputs(engine.db_path) == []
+
+
+def test_watch_retry_after_registration_does_not_register_again(engine_dataset, monkeypatch):
+    config_path = engine_dataset([
+        {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+        {'frames': 300, 'tags': [(10, 20)]},
+    ], _watch_overrides(max_retries=3))
+    engine = main.EvaluationEngine(str(config_path), use_cache=False)
+    calls = _fail_first_registrations(engine, monkeypatch, failures=0)
+    # アルゴ出力の登録後（メトリクス記録）に各ジョブ1回ずつ失敗させる
+    add_video = engine.metrics.add_video
+    failed_videos = []
+
+    def flaky_add_video(record):
+        if record['video_id'] not in failed_videos:
+            failed_videos.append(record['video_id'])
+            raise RuntimeError("登録後の一時的なエラー")
+        add_video(record)
+
+    monkeypatch.setattr(engine.metrics, 'add_video', flaky_add_video)
+
+    video_results = []
+    monkeypatch.setattr(engine, '_finish_evaluation', video_results.extend)
+    assert engine.run_watch()
+
+    assert failed_videos == [1, 2]
+    assert sorted(calls) == [1, 2]
+    assert [result['core_lib_output_id'] for result in video_results] == [1, 2]
+    assert _registered_outputs(engine.db_path) == [1, 2]
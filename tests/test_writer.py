@@ -0,0 +1,142 @@
+"""非同期出力ライタ（output.async_write）の書き込みエラーの伝播と有界キューのテスト"""
+
+import json
+import sqlite3
+import threading
+
+import pytest
+import yaml
+
+import main
+from engine import inference as engine_inference
+from engine.writer import AsyncOutputWriter
+
+VIDEOS = [
+    {'frames': 300, 'closed': [(100, 60)], 'tags': [(100, 200)]},
+    {'frames': 450, 'closed': [(20, 29), (150, 31), (300, 90)], 'tags': [(140, 200), (290, 400)]},
+    {'frames': 300, 'tags': [(50, 80)]},
+]
+ASYNC_WRITE = {'output': {'async_write': True, 'write_queue_size': 2}}
+
+
+def _fail(message):
+    raise OSError(message)
+
+
+def test_writer_error_is_raised_on_flush_after_remaining_writes(tmp_path):
+    writer = AsyncOutputWriter(max_pending=4)
+    try:
+        writer.submit("first", (tmp_path / "1.txt").write_text, "1")
+        writer.submit("broken", _fail, "disk full")
+        writer.submit("last", (tmp_path / "2.txt").write_text, "2")
+        with pytest.raises(RuntimeError, match="broken: disk full"):
+            writer.flush()
+        # 失敗した書き込みの後続も実行し、報告済みのエラーは再送出しない
+        assert (tmp_path / "1.txt").read_text() == "1" and (tmp_path / "2.txt").read_text() == "2"
+        assert writer.num_written == 2 and not writer.has_errors
+        writer.flush()
+    finally:
+        writer.close()
+
+    with pytest.raises(RuntimeError):
+        writer.submit("closed", (tmp_path / "3.txt").write_text, "3")
+
+
+def test_writer_has_errors_before_flush(tmp_path):
+    writer = AsyncOutputWriter()
+    try:
+        checked = []
+        writer.submit("broken", _fail, "disk full")
+        # 書き込みスレッド上で先行する書き込みの失敗を参照できる（チェックポイントの記録判断に使用）
+        writer.submit("check", lambda: checked.append(writer.has_errors))
+        with pytest.raises(RuntimeError):
+            writer.flush()
+        assert checked == [True]
+    finally:
+        writer.close()
+
+
+def test_writer_submit_waits_while_queue_is_full():
+    writer = AsyncOutputWriter(max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+    try:
+        def blocked_write():
+            started.set()
+            release.wait(10)
+        writer.submit("blocked", blocked_write)
+        assert started.wait(10)
+        # 書き込み中の1件とは別にキューに1件まで投入でき、それ以降は空きが出るまで待機
+        writer.submit("queued", lambda: None)
+        submitter = threading.Thread(target=writer.submit, args=("waiting", lambda: None))
+        submitter.start()
+        submitter.join(0.3)
+        assert submitter.is_alive()
+
+        release.set()
+        submitter.join(10)
+        assert not submitter.is_alive()
+        writer.flush()
+        assert writer.num_written == 3
+    finally:
+        release.set()
+        writer.close()
+
+
+def _summary(engine):
+    with open(engine.evaluation_output_dir / "evaluation_summary.json", 'r', encoding='utf-8') as f:
+        summary = json.load(f)['evaluation_summary']
+    return summary['overall_results'], summary['per_dataset']
+
+
+def _run(config_path, run_id, async_write):
+    """output.async_write を書き換えて評価を実行"""
+    config = yaml.safe_load(config_path.read_text(encoding='utf-8'))
+    config['output']['async_write'] = async_write
+    config_path.write_text(yaml.safe_dump(config, allow_unicode=True, sort_keys=False), encoding='utf-8')
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, run_id=run_id)
+    assert engine.run_evaluation()
+    return engine
+
+
+def test_async_write_run_matches_sync_run(engine_dataset):
+    config_path = engine_dataset(VIDEOS, ASYNC_WRITE)
+    sync_run = _run(config_path, "20990101-000000", False)
+    async_run = _run(config_path, "20990101-000001", True)
+
+    for name in ("1.csv", "2.csv", "3.csv"):
+        assert (async_run.run_output_dir / name).read_bytes() == (sync_run.run_output_dir / name).read_bytes()
+    assert _summary(async_run) == _summary(sync_run)
+    assert (async_run.evaluation_output_dir / "evaluation_report.md").exists()
+    with open(async_run.evaluation_output_dir / "metrics.json", 'r', encoding='utf-8') as f:
+        stages = json.load(f)['metrics']['stages']
+    assert stages['async_write']['count'] > len(VIDEOS)
+
+
+def test_async_write_error_fails_run_before_registration(engine_dataset, tmp_path, monkeypatch):
+    config_path = engine_dataset(VIDEOS, dict(ASYNC_WRITE, checkpoint={'enabled': True}))
+    run_id = "20990101-000000"
+    original = engine_inference._save_algo_output
+
+    def save_algo_output(algo_df, path, *args):
+        if path.stem == "2":
+            raise OSError("disk full")
+        return original(algo_df, path, *args)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(engine_inference, '_save_algo_output', save_algo_output)
+        assert not main.EvaluationEngine(str(config_path), use_cache=False, run_id=run_id).run_evaluation()
+
+    # 書き込み失敗はDB登録前に検出し、アルゴ出力・評価結果を登録しない
+    conn = sqlite3.connect(str(tmp_path / "database.db"))
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM algorithm_output_table").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM evaluation_result_table").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+    # 失敗以降のビデオはチェックポイントに記録せず、再開時に再処理する
+    engine = main.EvaluationEngine(str(config_path), use_cache=False, resume_run_id=run_id)
+    assert engine.run_evaluation()
+    assert engine.num_resumed_videos == 1
+    assert (engine.run_output_dir / "2.csv").exists()